@@ -1,13 +1,165 @@
 from __future__ import annotations
 
-from PySide6.QtCore import QObject, Signal
+import contextvars
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional
+
+from PySide6.QtCore import QObject, Qt, Signal, Slot
+from PySide6.QtWidgets import QWidget
+
+
+@dataclass
+class EventStats:
+    notified: int = 0
+    coalesced: int = 0
+    delivered: int = 0
+    handled: int = 0
+    deferred: int = 0
+    deferred_merged: int = 0
+    replayed: int = 0
+    applied_locally: int = 0
+
+
+# Page that already applied the write being announced (see AppEvents.applied_locally)
+_applied_by: contextvars.ContextVar[Optional[QObject]] = contextvars.ContextVar("hrdocs_applied_by", default=None)
+
+
+class _Subscription(QObject):
+    """Child of the page it refreshes, so Qt drops the connection with the page."""
+
+    def __init__(self, bus: "AppEvents", name: str, handler: Callable[[], None], owner: QWidget) -> None:
+        super().__init__(owner)
+        self.bus = bus
+        self.name = name
+        self.handler = handler
+        self.owner = owner
+        self.dirty = False
+
+    @Slot()
+    def deliver(self) -> None:
+        self.bus._deliver(self)
 
 
 class AppEvents(QObject):
+    """
+    App-wide change notifications.
+    - Publishers call notify(name) from any thread; repeats of the same event
+      before the next event-loop turn are delivered once (on the GUI thread).
+    - Pages subscribe() with themselves as owner: while hidden they are only
+      marked dirty, and deliver_deferred() runs their handlers (once each)
+      when MainWindow shows them again.
+    - A page that applied its own write to its model wraps the repo call in
+      applied_locally(self); the echo of that write then skips the page.
+    """
+
     company_clients_changed = Signal()
     workers_changed = Signal()
     incidents_changed = Signal()
     templates_changed = Signal()
+    incident_types_changed = Signal()
+    outbox_changed = Signal()
+
+    _flush_requested = Signal()
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        # event -> owners that already applied every notification merged into it
+        self._pending: Dict[str, FrozenSet[QObject]] = {}
+        self._skip: FrozenSet[QObject] = frozenset()
+        self.stats: Dict[str, EventStats] = {}
+        # Always queued: the flush runs on this object's (GUI) thread, one loop turn later
+        self._flush_requested.connect(self._flush, Qt.ConnectionType.QueuedConnection)
+
+    def _signal(self, name: str) -> Signal:
+        signal = getattr(self, name, None)
+        if not name.endswith("_changed") or signal is None:
+            raise ValueError(f"Unknown event: {name}")
+        return signal
+
+    def _stats(self, name: str) -> EventStats:
+        return self.stats.setdefault(name, EventStats())
+
+    # -------------------------
+    # publish
+    # -------------------------
+    def notify(self, name: str) -> None:
+        self._signal(name)
+        owner = _applied_by.get()
+        applied: FrozenSet[QObject] = frozenset((owner,)) if owner is not None else frozenset()
+        with self._lock:
+            st = self._stats(name)
+            st.notified += 1
+            if name in self._pending:
+                st.coalesced += 1
+                self._pending[name] &= applied
+                return
+            first = not self._pending
+            self._pending[name] = applied
+        if first:
+            self._flush_requested.emit()
+
+    @contextmanager
+    def applied_locally(self, owner: QObject) -> Iterator[None]:
+        token = _applied_by.set(owner)
+        try:
+            yield
+        finally:
+            _applied_by.reset(token)
+
+    @Slot()
+    def _flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for name in pending:
+                self._stats(name).delivered += 1
+        for name, applied in pending.items():
+            self._skip = applied
+            try:
+                self._signal(name).emit()
+            finally:
+                self._skip = frozenset()
+
+    # -------------------------
+    # subscribe
+    # -------------------------
+    def subscribe(self, name: str, handler: Callable[[], None], owner: QWidget) -> None:
+        sub = _Subscription(self, name, handler, owner)
+        self._signal(name).connect(sub.deliver)
+
+    def _deliver(self, sub: _Subscription) -> None:
+        st = self._stats(sub.name)
+        if sub.owner in self._skip:
+            st.applied_locally += 1
+        elif sub.owner.isVisible():
+            st.handled += 1
+            sub.handler()
+        elif sub.dirty:
+            st.deferred_merged += 1
+        else:
+            st.deferred += 1
+            sub.dirty = True
+
+    def deliver_deferred(self, owner: QWidget) -> None:
+        """Runs what `owner` missed while hidden; a handler dirtied by several events runs once."""
+        subs = owner.findChildren(_Subscription, options=Qt.FindChildOption.FindDirectChildrenOnly)
+        ran: List[Callable[[], None]] = []
+        for sub in subs:
+            if not sub.dirty:
+                continue
+            sub.dirty = False
+            if sub.handler in ran:
+                self._stats(sub.name).deferred_merged += 1
+                continue
+            ran.append(sub.handler)
+            self._stats(sub.name).replayed += 1
+            sub.handler()
+
+    def stats_snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {k: asdict(v) for k, v in self.stats.items()}
 
 
 _singleton: AppEvents | None = None
@@ -17,4 +169,4 @@ def events() -> AppEvents:
     global _singleton
     if _singleton is None:
         _singleton = AppEvents()
-    return _singleton
\ No newline at end of file
+    return _singleton
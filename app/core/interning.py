@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+class StringPool:
+    """
+    Dictionary-encodes repeating strings (client names, type codes, worker names...)
+    so that equal values decoded from separate JSON rows share a single object.
+    One pool per fetch keeps it bounded to that result set.
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self) -> None:
+        self._values: Dict[str, str] = {}
+
+    def __call__(self, value: str) -> str:
+        return self._values.setdefault(value, value)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+@dataclass(frozen=True, slots=True)
+class WorkerInfo:
+    full_name: str
+    national_id: str
+    company_client_id: str
+    company_client_name: str
+
+
+@dataclass(frozen=True, slots=True)
+class IncidentTypeInfo:
+    code: str
+    name: str
+
+
+class IncidentRefs:
+    """
+    Dictionary-encodes the worker and incident type of incident rows: one shared
+    WorkerInfo / IncidentTypeInfo per id, so each row holds two references
+    instead of six strings. One per fetch, like StringPool.
+    """
+
+    __slots__ = ("_pool", "_workers", "_types")
+
+    def __init__(self) -> None:
+        self._pool = StringPool()
+        self._workers: Dict[Any, WorkerInfo] = {}
+        self._types: Dict[Any, IncidentTypeInfo] = {}
+
+    def worker(self, key: Any, full_name: str, national_id: str, client_id: str, client_name: str) -> WorkerInfo:
+        # key None (id not selected): pooled strings, but no sharing
+        w = self._workers.get(key)
+        if w is None:
+            pool = self._pool
+            w = WorkerInfo(pool(full_name), pool(national_id), pool(client_id), pool(client_name))
+            if key is not None:
+                self._workers[key] = w
+        return w
+
+    def incident_type(self, key: Any, code: str, name: str) -> IncidentTypeInfo:
+        t = self._types.get(key)
+        if t is None:
+            t = IncidentTypeInfo(self._pool(code), self._pool(name))
+            if key is not None:
+                self._types[key] = t
+        return t
+
+    def worker_json(self, obj: Any) -> Optional[WorkerInfo]:
+        """From an embedded `workers(id, full_name, national_id, company_client_id, company_client:...(name))`."""
+        if not isinstance(obj, dict):
+            return None
+        w = self._workers.get(obj.get("id"))
+        if w is not None:
+            return w
+        cc = obj.get("company_client")
+        if not isinstance(cc, dict):
+            return None
+        return self.worker(
+            obj.get("id"),
+            str(obj.get("full_name", "")),
+            str(obj.get("national_id", "")),
+            str(obj.get("company_client_id", "")),
+            str(cc.get("name", "")),
+        )
+
+    def incident_type_json(self, obj: Any) -> Optional[IncidentTypeInfo]:
+        """From an embedded `incident_types(id, code, name)`."""
+        if not isinstance(obj, dict):
+            return None
+        t = self._types.get(obj.get("id"))
+        if t is not None:
+            return t
+        return self.incident_type(obj.get("id"), str(obj.get("code", "")), str(obj.get("name", "")))
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+
+APP_DIR_NAME = "HRDocs"
+
+
+def local_data_dir() -> Path:
+    """
+    Per-user folder for local caches (rollups, catalogs, mirrors...).
+    HRDOCS_DATA_DIR overrides the platform default.
+    """
+    override = os.getenv("HRDOCS_DATA_DIR", "").strip()
+    if override:
+        base = Path(override)
+    elif sys.platform.startswith("win"):
+        base = Path(os.getenv("LOCALAPPDATA") or Path.home() / "AppData" / "Local") / APP_DIR_NAME
+    else:
+        xdg = os.getenv("XDG_DATA_HOME", "").strip()
+        base = (Path(xdg) if xdg else Path.home() / ".local" / "share") / APP_DIR_NAME.lower()
+
+    base.mkdir(parents=True, exist_ok=True)
+    return base
@@ -11,6 +11,7 @@ class SessionState:
     access_token: str
     refresh_token: str
     firm_id: str  # required tenant scope
+    expires_at: int = 0  # epoch seconds; 0 = unknown
 
     @staticmethod
     def from_supabase(session: Any) -> "SessionState":
@@ -24,8 +25,14 @@ class SessionState:
             access_token=getattr(session, "access_token", "") or "",
             refresh_token=getattr(session, "refresh_token", "") or "",
             firm_id="",
+            expires_at=int(getattr(session, "expires_at", 0) or 0),
         )
 
+    def update_tokens(self, session: Any) -> None:
+        self.access_token = getattr(session, "access_token", "") or self.access_token
+        self.refresh_token = getattr(session, "refresh_token", "") or self.refresh_token
+        self.expires_at = int(getattr(session, "expires_at", 0) or 0)
+
 
 class AppSession:
     current: Optional[SessionState] = None
@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Optional
 
 from app.core.session import AppSession, SessionState
-from app.db.supabase_client import get_supabase
+from app.db.supabase_client import client_manager, get_supabase
 
 
 class AuthError(Exception):
@@ -71,6 +71,7 @@ def sign_out() -> None:
         sb.auth.sign_out()
     finally:
         AppSession.clear()
+        client_manager().reset_auth()
 
 
 def send_password_reset(email: str, redirect_to: Optional[str] = None) -> None:
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+import httpx
+
+from app.core.session import AppSession
+
+
+# A finished read is shared with identical calls for this long (unless a write happens)
+COALESCE_WINDOW_SECONDS = 1.0
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_READ_METHODS = {"GET", "HEAD"}
+
+
+@dataclass
+class CoalesceStats:
+    calls: int = 0
+    executed: int = 0
+    joined_in_flight: int = 0
+    reused_recent: int = 0
+    invalidations: int = 0
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "generation", "finished_at")
+
+    def __init__(self, generation: int) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.generation = generation
+        self.finished_at = 0.0
+
+
+class ReadCoalescer:
+    """
+    Single-flight for repository reads keyed by (method, args, firm).
+    - Identical calls while one is running wait for it and share its result.
+    - A result stays shareable for COALESCE_WINDOW_SECONDS.
+    - Any write going through the shared HTTP client bumps the generation,
+      so reads started before it are never handed out afterwards.
+    """
+
+    def __init__(self, window: float = COALESCE_WINDOW_SECONDS) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._generation = 0
+        self.window = window
+        self.stats: Dict[str, CoalesceStats] = {}
+
+    def call(self, name: str, fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        session = AppSession.current
+        try:
+            key: Hashable = (name, session.firm_id if session else "", args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            st = self.stats.setdefault(name, CoalesceStats())
+            st.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None and flight.generation == self._generation:
+                if not flight.done.is_set():
+                    st.joined_in_flight += 1
+                    owner = False
+                elif flight.error is None and time.monotonic() - flight.finished_at < self.window:
+                    st.reused_recent += 1
+                    owner = False
+                else:
+                    flight, owner = None, True
+            else:
+                flight, owner = None, True
+
+            if owner:
+                flight = _Flight(self._generation)
+                self._flights[key] = flight
+                st.executed += 1
+
+        assert flight is not None
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy(flight.result)
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return _copy(flight.result)
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight.finished_at = time.monotonic()
+            flight.done.set()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._flights.clear()
+            self.stats.setdefault("*", CoalesceStats()).invalidations += 1
+
+    def on_response(self, response: httpx.Response) -> None:
+        """httpx hook: any successful write makes earlier reads unshareable."""
+        if response.request.method not in _READ_METHODS and response.status_code < 400:
+            self.invalidate()
+
+    def stats_snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {k: asdict(v) for k, v in self.stats.items()}
+
+
+def _copy(result: Any) -> Any:
+    # Callers get their own list; the rows themselves are shared read-only
+    return list(result) if isinstance(result, list) else result
+
+
+_coalescer = ReadCoalescer()
+
+
+def read_coalescer() -> ReadCoalescer:
+    return _coalescer
+
+
+def coalesced(fn: F) -> F:
+    """Repo read decorator: identical concurrent / back-to-back calls share one request."""
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return _coalescer.call(name, fn, args, kwargs)
+
+    return wrapper  # type: ignore[return-value]
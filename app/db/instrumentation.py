@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this end up in the slow-query log
+SLOW_REQUEST_MS = 500.0
+SLOW_LOG_SIZE = 200
+
+
+def _slow_ms_from_env() -> float:
+    raw = os.getenv("HRDOCS_SLOW_REQUEST_MS", "").strip()
+    if not raw:
+        return SLOW_REQUEST_MS
+    try:
+        value = float(raw)
+    except ValueError:
+        value = -1.0
+    # Also rejects nan / inf
+    if not 0 < value < float("inf"):
+        logger.warning("HRDOCS_SLOW_REQUEST_MS=%r is not a positive number of ms; using %g", raw, SLOW_REQUEST_MS)
+        return SLOW_REQUEST_MS
+    return value
+
+
+# Query-string keys that shape the result rather than filter it
+_NON_FILTER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_MAX_FILTER_VALUE = 80
+
+_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+
+_T0_KEY = "hrdocs_t0"
+
+_page: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("hrdocs_page", default=None)
+_action: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("hrdocs_action", default=None)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(frozen=True, slots=True)
+class RequestRecord:
+    at: float
+    page: str
+    action: str
+    table: str
+    operation: str
+    filters: Tuple[str, ...]
+    status: int
+    rows: Optional[int]
+    request_bytes: int
+    response_bytes: int
+    latency_ms: float
+
+
+@dataclass
+class Counter:
+    requests: int = 0
+    rows: int = 0
+    bytes: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    errors: int = 0
+
+    def add(self, rec: RequestRecord) -> None:
+        self.requests += 1
+        self.rows += rec.rows or 0
+        self.bytes += rec.request_bytes + rec.response_bytes
+        self.total_ms += rec.latency_ms
+        self.max_ms = max(self.max_ms, rec.latency_ms)
+        if rec.status >= 400:
+            self.errors += 1
+
+
+@dataclass
+class _Counters:
+    by_page: Dict[str, Counter] = field(default_factory=dict)
+    by_action: Dict[str, Counter] = field(default_factory=dict)
+    by_table: Dict[str, Counter] = field(default_factory=dict)
+
+
+def _describe(url: httpx.URL, method: str) -> Tuple[str, str]:
+    """(table, operation) from a Supabase URL."""
+    parts = [p for p in url.path.split("/") if p]
+    operation = _OPERATIONS.get(method, method.lower())
+
+    if len(parts) >= 3 and parts[0] == "rest":
+        if parts[2] == "rpc" and len(parts) >= 4:
+            return parts[3], "rpc"
+        return parts[2], operation
+    if len(parts) >= 3 and parts[0] == "storage":
+        # /storage/v1/object/<bucket>/<path...>
+        bucket = parts[3] if len(parts) >= 4 else parts[2]
+        storage_ops = {"GET": "download", "POST": "upload", "PUT": "upload", "DELETE": "remove"}
+        return f"storage:{bucket}", storage_ops.get(method, operation)
+    if len(parts) >= 3 and parts[0] == "auth":
+        return f"auth:{parts[2]}", method.lower()
+    return url.path, operation
+
+
+def _filters(url: httpx.URL) -> Tuple[str, ...]:
+    out: List[str] = []
+    for key, value in url.params.multi_items():
+        if key in _NON_FILTER_PARAMS:
+            continue
+        if len(value) > _MAX_FILTER_VALUE:
+            value = value[:_MAX_FILTER_VALUE] + "…"
+        out.append(f"{key}={value}")
+    return tuple(out)
+
+
+def _row_count(response: httpx.Response) -> Optional[int]:
+    # PostgREST: "0-24/*", "0-24/310" or "*/0"
+    content_range = response.headers.get("content-range", "")
+    span = content_range.split("/", 1)[0]
+    if span == "*":
+        return 0
+    if "-" in span:
+        start, end = span.split("-", 1)
+        try:
+            return int(end) - int(start) + 1
+        except ValueError:
+            return None
+    return None
+
+
+class RequestMetrics:
+    """
+    Per-request accounting for everything going through the shared HTTP client.
+    Counters are kept per page, per action (repo method) and per table/operation;
+    slow requests are kept in a bounded log.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+        self._slow: Deque[RequestRecord] = deque(maxlen=SLOW_LOG_SIZE)
+        self._active_page = ""
+        self.slow_ms = _slow_ms_from_env()
+
+    # -------------------------
+    # httpx event hooks
+    # -------------------------
+    def on_request(self, request: httpx.Request) -> None:
+        request.extensions[_T0_KEY] = time.perf_counter()
+
+    def on_response(self, response: httpx.Response) -> None:
+        request = response.request
+        t0 = request.extensions.get(_T0_KEY)
+        if t0 is None:
+            return
+
+        # Hooks run before the body is read; read it so latency covers the full payload
+        response.read()
+        latency_ms = (time.perf_counter() - t0) * 1000.0
+
+        table, operation = _describe(request.url, request.method)
+        self.record(
+            RequestRecord(
+                at=time.time(),
+                page=_page.get() or self._active_page or "-",
+                action=_action.get() or "-",
+                table=table,
+                operation=operation,
+                filters=_filters(request.url),
+                status=response.status_code,
+                rows=_row_count(response),
+                request_bytes=len(request.content) if request.content else 0,
+                # Wire bytes (compressed); falls back to the decoded size for preloaded bodies
+                response_bytes=response.num_bytes_downloaded or len(response.content),
+                latency_ms=latency_ms,
+            )
+        )
+
+    # -------------------------
+    # accounting
+    # -------------------------
+    def set_active_page(self, page: str) -> None:
+        self._active_page = page
+
+    def active_page(self) -> str:
+        return self._active_page
+
+    def record(self, rec: RequestRecord) -> None:
+        with self._lock:
+            c = self._counters
+            c.by_page.setdefault(rec.page, Counter()).add(rec)
+            c.by_action.setdefault(f"{rec.page} / {rec.action}", Counter()).add(rec)
+            c.by_table.setdefault(f"{rec.table} {rec.operation}", Counter()).add(rec)
+            if rec.latency_ms >= self.slow_ms:
+                self._slow.append(rec)
+
+        if rec.latency_ms >= self.slow_ms:
+            logger.warning(
+                "slow request %.0f ms: %s %s %s (page=%s action=%s rows=%s bytes=%s)",
+                rec.latency_ms, rec.operation, rec.table, ",".join(rec.filters),
+                rec.page, rec.action, rec.rows, rec.response_bytes,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            c = self._counters
+            return {
+                "by_page": {k: asdict(v) for k, v in c.by_page.items()},
+                "by_action": {k: asdict(v) for k, v in c.by_action.items()},
+                "by_table": {k: asdict(v) for k, v in c.by_table.items()},
+                "slow": [asdict(r) for r in self._slow],
+                "slow_ms": self.slow_ms,
+            }
+
+    def dump_json(self, path: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> str:
+        """Returns the snapshot (plus `extra` sections) as JSON; also writes it to `path` when given."""
+        text = json.dumps({**self.snapshot(), **(extra or {})}, indent=2, ensure_ascii=False)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = _Counters()
+            self._slow.clear()
+
+
+_metrics = RequestMetrics()
+
+
+def request_metrics() -> RequestMetrics:
+    return _metrics
+
+
+# -------------------------
+# attribution
+# -------------------------
+@contextmanager
+def request_scope(*, page: Optional[str] = None, action: Optional[str] = None) -> Iterator[None]:
+    """Attributes the requests made inside the block to a page and/or action."""
+    page_token = _page.set(page) if page is not None else None
+    action_token = _action.set(action) if action is not None else None
+    try:
+        yield
+    finally:
+        if action_token is not None:
+            _action.reset(action_token)
+        if page_token is not None:
+            _page.reset(page_token)
+
+
+def tracked(fn: F) -> F:
+    """Repo-method decorator: requests made inside count under "<Repo>.<method>"."""
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with request_scope(action=name):
+            return fn(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def bind_scope(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Carries the caller's page/action into worker threads (thread pools don't copy contextvars)."""
+    page, action = _page.get(), _action.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with request_scope(page=page, action=action):
+            return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.events import events
+from app.core.paths import local_data_dir
+from app.core.session import AppSession
+from app.db.coalescing import read_coalescer
+from app.db.instrumentation import request_scope
+from app.db.supabase_client import get_supabase
+
+
+logger = logging.getLogger(__name__)
+
+# Set HRDOCS_LOCAL_MIRROR=1 to serve repository reads from the local replica
+MIRROR_ENV = "HRDOCS_LOCAL_MIRROR"
+
+# Reads older than this trigger a background delta sync (the read itself is served locally)
+SYNC_INTERVAL_SECONDS = 30.0
+# PostgREST caps responses (Supabase default max_rows = 1000)
+SYNC_PAGE_SIZE = 1000
+# Re-read this much before the watermark: rows committed late by concurrent transactions
+SYNC_OVERLAP_SECONDS = 10
+
+_EPOCH = "1970-01-01T00:00:00+00:00"
+
+
+@dataclass(frozen=True, slots=True)
+class MirrorTable:
+    name: str
+    columns: Tuple[str, ...]
+    # Global tables (incident_types) are small, have no firm_id / updated_at and are replaced wholesale
+    firm_scoped: bool = True
+    changed_event: str = ""
+
+
+TABLES: Dict[str, MirrorTable] = {
+    t.name: t
+    for t in (
+        MirrorTable(
+            "company_clients",
+            ("id", "name", "legal_id", "description", "is_active", "created_at", "updated_at"),
+            changed_event="company_clients_changed",
+        ),
+        MirrorTable(
+            "workers",
+            ("id", "company_client_id", "full_name", "national_id", "is_active", "created_at", "updated_at"),
+            changed_event="workers_changed",
+        ),
+        MirrorTable(
+            "incidents",
+            (
+                "id", "worker_id", "incident_type_id", "code", "incident_date", "received_day",
+                "observations", "manual_handling", "created_at", "updated_at",
+            ),
+            changed_event="incidents_changed",
+        ),
+        MirrorTable(
+            "document_templates",
+            ("id", "company_client_id", "template_key", "storage_path", "version", "is_active", "created_at", "updated_at"),
+            changed_event="templates_changed",
+        ),
+        MirrorTable(
+            "generated_documents",
+            ("id", "company_client_id", "incident_id", "template_key", "template_version", "output_path", "created_at", "updated_at"),
+        ),
+        MirrorTable("incident_types", ("id", "code", "name"), firm_scoped=False),
+    )
+}
+
+_SCHEMA = """
+create table if not exists company_clients (
+  firm_id text not null, id text primary key, name text not null, legal_id text not null,
+  description text, is_active integer not null, created_at text not null, updated_at text not null
+);
+create index if not exists idx_m_clients_firm_active_name on company_clients(firm_id, is_active, name);
+create index if not exists idx_m_clients_firm_active_created on company_clients(firm_id, is_active, created_at);
+
+create table if not exists workers (
+  firm_id text not null, id text primary key, company_client_id text not null, full_name text not null,
+  national_id text not null, is_active integer not null, created_at text not null, updated_at text not null
+);
+create index if not exists idx_m_workers_firm_active_created on workers(firm_id, is_active, created_at);
+create index if not exists idx_m_workers_firm_client on workers(firm_id, company_client_id, is_active);
+create index if not exists idx_m_workers_firm_name on workers(firm_id, is_active, full_name);
+
+create table if not exists incidents (
+  firm_id text not null, id text primary key, worker_id text not null, incident_type_id integer not null,
+  code text, incident_date text not null, received_day text not null, observations text,
+  manual_handling integer not null, created_at text not null, updated_at text not null
+);
+create index if not exists idx_m_incidents_firm_created on incidents(firm_id, created_at);
+create index if not exists idx_m_incidents_firm_worker_created on incidents(firm_id, worker_id, created_at);
+create index if not exists idx_m_incidents_firm_incident_date on incidents(firm_id, incident_date);
+create index if not exists idx_m_incidents_firm_received_day on incidents(firm_id, received_day);
+
+create table if not exists document_templates (
+  firm_id text not null, id text primary key, company_client_id text not null, template_key text not null,
+  storage_path text not null, version integer not null, is_active integer not null,
+  created_at text not null, updated_at text not null
+);
+create index if not exists idx_m_templates_firm_created on document_templates(firm_id, created_at);
+create index if not exists idx_m_templates_lookup on document_templates(firm_id, company_client_id, template_key, is_active, version);
+
+create table if not exists generated_documents (
+  firm_id text not null, id text primary key, company_client_id text not null, incident_id text not null,
+  template_key text not null, template_version integer not null, output_path text,
+  created_at text not null, updated_at text not null
+);
+create index if not exists idx_m_generated_lookup on generated_documents(firm_id, incident_id, template_key, template_version);
+
+create table if not exists incident_types (
+  firm_id text not null, id integer primary key, code text not null, name text not null
+);
+
+create table if not exists sync_state (
+  firm_id text not null,
+  table_name text not null,
+  updated_wm text not null,
+  deleted_wm text not null,
+  synced_at real not null,
+  primary key (firm_id, table_name)
+);
+"""
+
+
+class LocalMirror:
+    """
+    SQLite replica of the current firm's rows, kept fresh by delta sync:
+    rows with updated_at past the table's watermark are upserted, and
+    deleted_rows tombstones (deletes and deactivations) are applied first.
+    Requires the updated_at / deleted_rows migration in schema.sql.
+    """
+
+    def __init__(self, firm_id: str, db_path: Optional[Path] = None) -> None:
+        self._firm_id = firm_id
+        self._lock = threading.RLock()
+        self._con = sqlite3.connect(
+            db_path or (local_data_dir() / "mirror.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._con.row_factory = sqlite3.Row
+        self._con.execute("pragma journal_mode=wal")
+        self._con.executescript(_SCHEMA)
+        self._syncing: set[str] = set()
+
+    @property
+    def firm_id(self) -> str:
+        return self._firm_id
+
+    # -------------------------
+    # reads
+    # -------------------------
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._con.execute(sql, params).fetchall()
+
+    def ensure(self, tables: Iterable[str]) -> None:
+        """Blocks only for tables never synced; stale tables refresh in the background."""
+        stale: List[str] = []
+        for table in tables:
+            synced_at = self._synced_at(table)
+            if synced_at is None:
+                self.sync_now([table])
+            elif time.time() - synced_at >= SYNC_INTERVAL_SECONDS:
+                stale.append(table)
+        if stale:
+            self.sync_in_background(stale)
+
+    # -------------------------
+    # sync
+    # -------------------------
+    def sync_now(self, tables: Iterable[str]) -> List[str]:
+        """Delta-syncs the tables; returns the ones that changed locally."""
+        changed: List[str] = []
+        for table in tables:
+            if self._sync_table(TABLES[table]):
+                changed.append(table)
+        return changed
+
+    def sync_in_background(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            todo = [t for t in tables if t not in self._syncing]
+            self._syncing.update(todo)
+        if not todo:
+            return
+
+        def run() -> None:
+            try:
+                with request_scope(page="background", action="LocalMirror.sync"):
+                    changed = self.sync_now(todo)
+            except Exception:
+                logger.warning("mirror sync failed for %s", ",".join(todo), exc_info=True)
+                changed = []
+            finally:
+                with self._lock:
+                    self._syncing.difference_update(todo)
+
+            # Someone else changed the data: let the pages reload (from the mirror).
+            # The sync only issued GETs, so drop shared reads from before it by hand
+            if changed:
+                read_coalescer().invalidate()
+            for table in changed:
+                event = TABLES[table].changed_event
+                if event:
+                    events().notify(event)
+
+        threading.Thread(target=run, name="mirror-sync", daemon=True).start()
+
+    def _synced_at(self, table: str) -> Optional[float]:
+        row = self.query(
+            "select synced_at from sync_state where firm_id = ? and table_name = ?",
+            (self._firm_id, table),
+        )
+        return float(row[0][0]) if row else None
+
+    def _watermarks(self, table: str) -> Tuple[str, str]:
+        row = self.query(
+            "select updated_wm, deleted_wm from sync_state where firm_id = ? and table_name = ?",
+            (self._firm_id, table),
+        )
+        return (str(row[0][0]), str(row[0][1])) if row else (_EPOCH, _EPOCH)
+
+    def _sync_table(self, spec: MirrorTable) -> bool:
+        if not spec.firm_scoped:
+            return self._replace_global(spec)
+
+        sb = get_supabase()
+        updated_wm, deleted_wm = self._watermarks(spec.name)
+
+        # Tombstones first, so a row deactivated and reactivated since the last sync survives
+        gone: List[Tuple[str]] = []
+        for r in self._fetch_pages(
+            lambda: sb.table("deleted_rows")
+            .select("row_id, deleted_at")
+            .eq("firm_id", self._firm_id)
+            .eq("table_name", spec.name)
+            .gt("deleted_at", _minus_overlap(deleted_wm))
+            .order("deleted_at")
+            .order("row_id")
+        ):
+            gone.append((str(r.get("row_id", "")),))
+            deleted_wm = max(deleted_wm, str(r.get("deleted_at", "") or ""))
+
+        upserts: List[Dict[str, Any]] = []
+        for r in self._fetch_pages(
+            lambda: sb.table(spec.name)
+            .select(", ".join(spec.columns))
+            .eq("firm_id", self._firm_id)
+            .gt("updated_at", _minus_overlap(updated_wm))
+            .order("updated_at")
+            .order("id")
+        ):
+            upserts.append(r)
+            updated_wm = max(updated_wm, str(r.get("updated_at", "") or ""))
+
+        with self._lock:
+            before = self._con.total_changes
+            self._con.execute("begin")
+            try:
+                if gone:
+                    self._con.executemany(f"delete from {spec.name} where id = ?", gone)
+                self._upsert(spec, upserts)
+                changed = self._con.total_changes != before
+                self._save_state(spec.name, updated_wm, deleted_wm)
+                self._con.execute("commit")
+            except Exception:
+                self._con.execute("rollback")
+                raise
+
+        return changed
+
+    def _upsert(self, spec: MirrorTable, rows: List[Dict[str, Any]], *, force: bool = False) -> None:
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in range(len(spec.columns) + 1))
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in spec.columns if c != "id")
+        # Rows re-read through the overlap window are skipped, so they don't count as changes
+        guard = "" if force else f" where excluded.updated_at <> {spec.name}.updated_at"
+        self._con.executemany(
+            f"insert into {spec.name} (firm_id, {', '.join(spec.columns)}) values ({placeholders}) "
+            f"on conflict (id) do update set {assignments}{guard}",
+            [(self._firm_id, *(_to_sqlite(r.get(c)) for c in spec.columns)) for r in rows],
+        )
+
+    def apply_written(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Stores rows returned by our own insert/update (return=representation)."""
+        with self._lock:
+            self._upsert(TABLES[table], rows, force=True)
+
+    def apply_deleted(self, table: str, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._con.executemany(f"delete from {TABLES[table].name} where id = ?", [(i,) for i in ids])
+
+    def _replace_global(self, spec: MirrorTable) -> bool:
+        sb = get_supabase()
+        rows = [
+            ("", *(_to_sqlite(r.get(c)) for c in spec.columns))
+            for r in self._fetch_pages(lambda: sb.table(spec.name).select(", ".join(spec.columns)).order("id"))
+        ]
+        placeholders = ", ".join("?" for _ in range(len(spec.columns) + 1))
+
+        with self._lock:
+            before = [tuple(r) for r in self._con.execute(f"select firm_id, {', '.join(spec.columns)} from {spec.name} order by id")]
+            self._con.execute("begin")
+            try:
+                self._con.execute(f"delete from {spec.name}")
+                self._con.executemany(
+                    f"insert into {spec.name} (firm_id, {', '.join(spec.columns)}) values ({placeholders})", rows
+                )
+                self._save_state(spec.name, _EPOCH, _EPOCH)
+                self._con.execute("commit")
+            except Exception:
+                self._con.execute("rollback")
+                raise
+
+        return before != rows
+
+    @staticmethod
+    def _fetch_pages(build_query: Any) -> Iterable[Dict[str, Any]]:
+        offset = 0
+        while True:
+            resp = build_query().range(offset, offset + SYNC_PAGE_SIZE - 1).execute()
+            if hasattr(resp, "error") and resp.error:
+                raise RuntimeError(f"Mirror sync failed: {resp.error}")
+            data = resp.data or []
+            for r in data:
+                if isinstance(r, dict):
+                    yield r
+            if len(data) < SYNC_PAGE_SIZE:
+                return
+            offset += SYNC_PAGE_SIZE
+
+    def _save_state(self, table: str, updated_wm: str, deleted_wm: str) -> None:
+        self._con.execute(
+            "insert into sync_state (firm_id, table_name, updated_wm, deleted_wm, synced_at) values (?, ?, ?, ?, ?) "
+            "on conflict (firm_id, table_name) do update set updated_wm = excluded.updated_wm, "
+            "deleted_wm = excluded.deleted_wm, synced_at = excluded.synced_at",
+            (self._firm_id, table, updated_wm, deleted_wm, time.time()),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            for spec in TABLES.values():
+                if spec.firm_scoped:
+                    self._con.execute(f"delete from {spec.name} where firm_id = ?", (self._firm_id,))
+            self._con.execute("delete from sync_state where firm_id = ?", (self._firm_id,))
+
+
+def _minus_overlap(watermark: str) -> str:
+    if watermark == _EPOCH:
+        return watermark
+    try:
+        return (datetime.fromisoformat(watermark) - timedelta(seconds=SYNC_OVERLAP_SECONDS)).isoformat()
+    except ValueError:
+        return watermark
+
+
+def _to_sqlite(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def mirror_enabled() -> bool:
+    return os.getenv(MIRROR_ENV, "").strip().lower() in ("1", "true", "yes")
+
+
+_mirrors: Dict[str, LocalMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def local_mirror(tables: Sequence[str]) -> Optional[LocalMirror]:
+    """
+    The current firm's mirror, ready to serve `tables`; None when the mirror is
+    disabled or could not be synced (callers then read from Supabase).
+    """
+    if not mirror_enabled():
+        return None
+
+    firm_id = AppSession.require().firm_id
+    with _mirrors_lock:
+        mirror = _mirrors.get(firm_id)
+        if mirror is None:
+            mirror = _mirrors[firm_id] = LocalMirror(firm_id)
+
+    try:
+        mirror.ensure(tables)
+    except Exception:
+        logger.warning("local mirror unavailable for %s; reading from Supabase", ",".join(tables), exc_info=True)
+        return None
+    return mirror
+
+
+def _current_mirror() -> Optional[LocalMirror]:
+    if not mirror_enabled() or AppSession.current is None:
+        return None
+    return _mirrors.get(AppSession.current.firm_id)
+
+
+def mirror_after_write(table: str, returned: Any = None) -> None:
+    """
+    Puts our own write into the mirror before listeners reload (read-your-writes).
+    Uses the returned representation when it has every mirrored column; otherwise
+    falls back to a delta sync of the table.
+    """
+    mirror = _current_mirror()
+    if mirror is None:
+        return
+    columns = TABLES[table].columns
+    try:
+        rows = [r for r in (returned or []) if isinstance(r, dict)]
+        if rows and all(all(c in r for c in columns) for r in rows):
+            mirror.apply_written(table, rows)
+        else:
+            mirror.sync_now([table])
+    except Exception:
+        logger.warning("mirror update after write failed for %s", table, exc_info=True)
+
+
+def mirror_after_delete(table: str, ids: Iterable[str]) -> None:
+    mirror = _current_mirror()
+    if mirror is None:
+        return
+    try:
+        mirror.apply_deleted(table, ids)
+    except Exception:
+        logger.warning("mirror update after delete failed for %s", table, exc_info=True)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+from dotenv import load_dotenv
+from supabase import create_client, ClientOptions
+
+from app.db.supabase_client import build_http_client
+
+
+def _time_requests(n: int, run_one: Callable[[], None]) -> List[float]:
+    samples: List[float] = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        run_one()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def _summary(label: str, samples: List[float]) -> str:
+    return (
+        f"{label:<28} median {statistics.median(samples):7.1f} ms   "
+        f"min {min(samples):7.1f} ms   max {max(samples):7.1f} ms"
+    )
+
+
+def main() -> None:
+    """
+    Compares per-request latency of a small PostgREST query:
+    - a fresh HTTP connection per request (new TCP + TLS handshake every time)
+    - the shared pooled transport used by get_supabase()
+
+    Usage: python -m app.db.measure_transport [requests]
+    """
+    load_dotenv()
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_ANON_KEY")
+
+    if not url or not key:
+        raise RuntimeError(
+            "Missing SUPABASE_URL or SUPABASE_ANON_KEY. "
+            "Set them in a .env file or as environment variables."
+        )
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    def cold() -> None:
+        http = build_http_client()
+        try:
+            sb = create_client(url, key, options=ClientOptions(httpx_client=http))
+            sb.table("incident_types").select("id").limit(1).execute()
+        finally:
+            http.close()
+
+    pooled_http = build_http_client()
+    pooled = create_client(url, key, options=ClientOptions(httpx_client=pooled_http))
+
+    def warm() -> None:
+        pooled.table("incident_types").select("id").limit(1).execute()
+
+    try:
+        warm()  # open the pooled connection once
+        cold_ms = _time_requests(n, cold)
+        warm_ms = _time_requests(n, warm)
+    finally:
+        pooled_http.close()
+
+    print(_summary("new connection per request", cold_ms))
+    print(_summary("pooled keep-alive", warm_ms))
+    print(f"saved per request (median): {statistics.median(cold_ms) - statistics.median(warm_ms):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -398,4 +398,146 @@ create policy document_templates_update
 on public.document_templates for update
 to public
 using (firm_id = current_firm_id())
-with check (firm_id = current_firm_id());
\ No newline at end of file
+with check (firm_id = current_firm_id());
+
+-- =========================================================
+-- LOCAL MIRROR SUPPORT (delta sync)
+-- updated_at watermarks + tombstones for deletes / deactivations
+-- =========================================================
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+alter table public.company_clients add column if not exists updated_at timestamptz not null default now();
+alter table public.workers add column if not exists updated_at timestamptz not null default now();
+alter table public.incidents add column if not exists updated_at timestamptz not null default now();
+alter table public.document_templates add column if not exists updated_at timestamptz not null default now();
+alter table if exists public.generated_documents add column if not exists updated_at timestamptz not null default now();
+
+drop trigger if exists trg_company_clients_updated_at on public.company_clients;
+create trigger trg_company_clients_updated_at
+before update on public.company_clients
+for each row execute function public.set_updated_at();
+
+drop trigger if exists trg_workers_updated_at on public.workers;
+create trigger trg_workers_updated_at
+before update on public.workers
+for each row execute function public.set_updated_at();
+
+drop trigger if exists trg_incidents_updated_at on public.incidents;
+create trigger trg_incidents_updated_at
+before update on public.incidents
+for each row execute function public.set_updated_at();
+
+drop trigger if exists trg_document_templates_updated_at on public.document_templates;
+create trigger trg_document_templates_updated_at
+before update on public.document_templates
+for each row execute function public.set_updated_at();
+
+create index if not exists idx_company_clients_firm_updated_at
+  on public.company_clients(firm_id, updated_at);
+
+create index if not exists idx_workers_firm_updated_at
+  on public.workers(firm_id, updated_at);
+
+create index if not exists idx_incidents_firm_updated_at
+  on public.incidents(firm_id, updated_at);
+
+create index if not exists idx_templates_firm_updated_at
+  on public.document_templates(firm_id, updated_at);
+
+-- Rows that left a firm's visible set: hard deletes, and deactivations
+-- (workers / templates become invisible through RLS once is_active = false)
+create table if not exists public.deleted_rows (
+  id bigint generated always as identity primary key,
+  firm_id uuid not null references public.firms(id) on delete cascade,
+  table_name text not null,
+  row_id uuid not null,
+  deleted_at timestamptz not null default now()
+);
+
+create index if not exists idx_deleted_rows_firm_table_deleted_at
+  on public.deleted_rows(firm_id, table_name, deleted_at);
+
+alter table public.deleted_rows enable row level security;
+
+drop policy if exists deleted_rows_select on public.deleted_rows;
+create policy deleted_rows_select
+on public.deleted_rows for select
+to public
+using (firm_id = current_firm_id());
+
+create or replace function public.record_row_removal()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op = 'DELETE' then
+    insert into public.deleted_rows (firm_id, table_name, row_id)
+    values (old.firm_id, tg_table_name, old.id);
+    return old;
+  end if;
+
+  if coalesce((to_jsonb(old)->>'is_active')::boolean, false)
+     and not coalesce((to_jsonb(new)->>'is_active')::boolean, true) then
+    insert into public.deleted_rows (firm_id, table_name, row_id)
+    values (new.firm_id, tg_table_name, new.id);
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists trg_company_clients_removal on public.company_clients;
+create trigger trg_company_clients_removal
+after update or delete on public.company_clients
+for each row execute function public.record_row_removal();
+
+drop trigger if exists trg_workers_removal on public.workers;
+create trigger trg_workers_removal
+after update or delete on public.workers
+for each row execute function public.record_row_removal();
+
+drop trigger if exists trg_incidents_removal on public.incidents;
+create trigger trg_incidents_removal
+after delete on public.incidents
+for each row execute function public.record_row_removal();
+
+drop trigger if exists trg_document_templates_removal on public.document_templates;
+create trigger trg_document_templates_removal
+after update or delete on public.document_templates
+for each row execute function public.record_row_removal();
+
+
+-- =========================================================
+-- INCIDENTS LIST PAGING
+-- The incidents page reads 200 rows at a time, newest first, with a
+-- (created_at, id) keyset; these keep every page an index range scan.
+-- =========================================================
+create index if not exists idx_incidents_firm_created_id
+  on public.incidents(firm_id, created_at desc, id desc);
+
+create index if not exists idx_incidents_firm_worker_created_id
+  on public.incidents(firm_id, worker_id, created_at desc, id desc);
+
+-- =========================================================
+-- WORKER SEARCH
+-- The incidents worker picker searches as you type
+-- (full_name ilike '%words%' or national_id ilike 'prefix%').
+-- =========================================================
+create extension if not exists "pg_trgm";
+
+create index if not exists idx_workers_active_full_name_trgm
+  on public.workers using gin (full_name gin_trgm_ops)
+  where is_active;
+
+create index if not exists idx_workers_active_national_id_trgm
+  on public.workers using gin (national_id gin_trgm_ops)
+  where is_active;
@@ -1,35 +1,244 @@
 from __future__ import annotations
 
+import logging
 import os
-from supabase import create_client, Client
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
 
-from app.core.session import AppSession
+import httpx
+from supabase import create_client, Client, ClientOptions
 
-_supabase: Client | None = None
+from app.core.session import AppSession, SessionState
+from app.db.coalescing import read_coalescer
+from app.db.instrumentation import request_metrics
 
 
-def get_supabase() -> Client:
-    global _supabase
+logger = logging.getLogger(__name__)
+
+# Refresh the access token this many seconds before it expires
+REFRESH_MARGIN_SECONDS = 120
+
+# Shared HTTP transport defaults (overridable through HRDOCS_HTTP_* env vars)
+HTTP_POOL_SIZE = 10
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 10.0
+HTTP_TIMEOUT_SECONDS = 60.0
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("ignoring invalid %s=%r", name, raw)
+        return default
+
+
+def _http2_available() -> bool:
+    if os.getenv("HRDOCS_HTTP2", "1").strip().lower() in ("0", "false", "no"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_http_client() -> httpx.Client:
+    """
+    One pooled transport shared by PostgREST, Storage and Auth.
+    - Keep-alive connections are reused across repo calls (no TLS setup per request).
+    - HTTP/2 is used when the h2 package is installed.
+    - Responses may be gzip-compressed.
+    - Every request is recorded by request_metrics().
+    Tunables: HRDOCS_HTTP_POOL_SIZE, HRDOCS_HTTP_KEEPALIVE_EXPIRY,
+    HRDOCS_HTTP_CONNECT_TIMEOUT, HRDOCS_HTTP_TIMEOUT, HRDOCS_HTTP2=0.
+    """
+    pool_size = max(1, int(_env_number("HRDOCS_HTTP_POOL_SIZE", HTTP_POOL_SIZE)))
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=_env_number("HRDOCS_HTTP_KEEPALIVE_EXPIRY", HTTP_KEEPALIVE_EXPIRY_SECONDS),
+    )
+    timeout = httpx.Timeout(
+        _env_number("HRDOCS_HTTP_TIMEOUT", HTTP_TIMEOUT_SECONDS),
+        connect=_env_number("HRDOCS_HTTP_CONNECT_TIMEOUT", HTTP_CONNECT_TIMEOUT_SECONDS),
+    )
+    metrics = request_metrics()
+    return httpx.Client(
+        http2=_http2_available(),
+        limits=limits,
+        timeout=timeout,
+        headers={"Accept-Encoding": "gzip"},
+        follow_redirects=True,
+        event_hooks={
+            "request": [metrics.on_request],
+            # Writes invalidate coalesced reads before the repo announces the change
+            "response": [metrics.on_response, read_coalescer().on_response],
+        },
+    )
+
 
-    url = os.getenv("SUPABASE_URL", "").strip()
-    key = os.getenv("SUPABASE_ANON_KEY", "").strip()
-    if not url or not key:
-        raise RuntimeError("Missing SUPABASE_URL / SUPABASE_ANON_KEY in environment")
+@dataclass
+class AuthStats:
+    clients_created: int = 0
+    token_applies: int = 0
+    token_apply_fallbacks: int = 0
+    token_apply_failures: int = 0
+    token_reuses: int = 0
+    refreshes: int = 0
+    refresh_failures: int = 0
+    external_refreshes: int = 0
 
-    if _supabase is None:
-        _supabase = create_client(url, key)
 
+class SupabaseClientManager:
+    """
+    Owns the process-wide Supabase client.
+    - The client is created once (env is read once).
+    - The user's token is applied only when it differs from the last applied one.
+    - Tokens are refreshed shortly before they expire, and refreshes done by
+      supabase-py itself are mirrored back into AppSession.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._client: Optional[Client] = None
+        self._http: Optional[httpx.Client] = None
+        self._anon_key: str = ""
+        self._applied_token: str = ""
+        # supabase-py rebuilds its postgrest client on auth events; the token lives on that object
+        self._applied_postgrest: Any = None
+        self._refreshing: bool = False
+        self.stats = AuthStats()
+
+    def client(self) -> Client:
+        with self._lock:
+            sb = self._ensure_client()
+
+            session = AppSession.current
+            if session is None or not session.access_token:
+                return sb
+
+            self._refresh_if_expiring(sb, session)
+
+            if session.access_token == self._applied_token and sb.postgrest is self._applied_postgrest:
+                self.stats.token_reuses += 1
+            else:
+                self._apply_token(sb, session)
+
+            return sb
+
+    def _ensure_client(self) -> Client:
+        if self._client is not None:
+            return self._client
+
+        url = os.getenv("SUPABASE_URL", "").strip()
+        key = os.getenv("SUPABASE_ANON_KEY", "").strip()
+        if not url or not key:
+            raise RuntimeError("Missing SUPABASE_URL / SUPABASE_ANON_KEY in environment")
+
+        self._http = build_http_client()
+        self._client = create_client(url, key, options=ClientOptions(httpx_client=self._http))
+        self._anon_key = key
+        self.stats.clients_created += 1
 
-    if AppSession.current and AppSession.current.access_token:
         try:
-            _supabase.postgrest.auth(AppSession.current.access_token)
+            self._client.auth.on_auth_state_change(self._on_auth_event)
+        except Exception:
+            logger.debug("auth state listener not available", exc_info=True)
+
+        return self._client
+
+    def _apply_token(self, sb: Client, session: SessionState) -> None:
+        try:
+            sb.postgrest.auth(session.access_token)
+            self.stats.token_applies += 1
         except Exception:
             try:
-                _supabase.auth.set_session(
-                    AppSession.current.access_token,
-                    AppSession.current.refresh_token
-                )
+                sb.auth.set_session(session.access_token, session.refresh_token)
+                self.stats.token_apply_fallbacks += 1
             except Exception:
-                pass
+                self.stats.token_apply_failures += 1
+                return
+        self._applied_token = session.access_token
+        self._applied_postgrest = sb.postgrest
+
+    def _refresh_if_expiring(self, sb: Client, session: SessionState) -> None:
+        if not session.expires_at or not session.refresh_token:
+            return
+        if time.time() < session.expires_at - REFRESH_MARGIN_SECONDS:
+            return
+
+        self._refreshing = True
+        try:
+            res = sb.auth.refresh_session(session.refresh_token)
+        except Exception:
+            # Keep the current token; the request itself will surface any auth error
+            self.stats.refresh_failures += 1
+            logger.warning("token refresh failed", exc_info=True)
+            return
+        finally:
+            self._refreshing = False
+
+        new_session = getattr(res, "session", None)
+        if new_session is None:
+            self.stats.refresh_failures += 1
+            return
+
+        session.update_tokens(new_session)
+        self.stats.refreshes += 1
+
+    def _on_auth_event(self, event: Any, new_session: Any) -> None:
+        # supabase-py's own auto-refresh resets postgrest/storage with the new token
+        if event != "TOKEN_REFRESHED" or new_session is None:
+            return
+        with self._lock:
+            current = AppSession.current
+            if current is None:
+                return
+            current.update_tokens(new_session)
+            # The rebuilt postgrest client already carries the new token
+            self._applied_token = current.access_token
+            self._applied_postgrest = None
+            if not self._refreshing:
+                self.stats.external_refreshes += 1
 
-    return _supabase
\ No newline at end of file
+    def reset_auth(self) -> None:
+        """Drops the user token (sign-out); requests go back to the anon key."""
+        with self._lock:
+            if self._client is not None and self._applied_token:
+                try:
+                    self._client.postgrest.auth(self._anon_key)
+                except Exception:
+                    pass
+            self._applied_token = ""
+            self._applied_postgrest = None
+
+    def close(self) -> None:
+        """Closes the pooled connections (app shutdown)."""
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+            self._http = None
+            self._client = None
+            self._applied_token = ""
+            self._applied_postgrest = None
+
+    def stats_snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return asdict(self.stats)
+
+
+_manager = SupabaseClientManager()
+
+
+def client_manager() -> SupabaseClientManager:
+    return _manager
+
+
+def get_supabase() -> Client:
+    return _manager.client()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import logging
+import multiprocessing
 import sys
 import os
 from pathlib import Path
@@ -20,11 +22,50 @@ load_dotenv(env_path)
 
 # ---------------------------------------
 
+from app.core.events import events
+from app.db.coalescing import read_coalescer
+from app.db.instrumentation import request_metrics
+from app.db.supabase_client import client_manager
+from app.ui import background_loader, stall_watchdog
 from app.ui.login_window import LoginWindow
 
 
+def _dump_request_log() -> None:
+    # HRDOCS_REQUEST_LOG=<path> writes the request counters, slow-query log and
+    # how many reads / refreshes the coalescing layers saved (and stale page
+    # loads dropped), on exit
+    path = os.getenv("HRDOCS_REQUEST_LOG", "").strip()
+    if path:
+        request_metrics().dump_json(
+            path,
+            extra={
+                "events": events().stats_snapshot(),
+                "coalesced_reads": read_coalescer().stats_snapshot(),
+                "background_loads": background_loader.stats_snapshot(),
+                "ui_stalls": stall_watchdog.stats_snapshot(),
+            },
+        )
+
+
+def _start_stall_watchdog(app: QApplication) -> None:
+    # HRDOCS_STALL_LOG=<path> logs every event-loop stall over HRDOCS_STALL_MS
+    # (default 100) with the page, action and stack that blocked it
+    path = os.getenv("HRDOCS_STALL_LOG", "").strip()
+    if path:
+        app.aboutToQuit.connect(stall_watchdog.start_stall_watchdog(path).stop)
+
+
 def main() -> None:
+    # Report exports use a process pool; required for the PyInstaller build
+    multiprocessing.freeze_support()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(_dump_request_log)
+    app.aboutToQuit.connect(client_manager().close)
+    _start_stall_watchdog(app)
     w = LoginWindow()
     w.show()
     sys.exit(app.exec())
@@ -13,8 +13,11 @@ from PySide6.QtWidgets import (
     QMessageBox,
 )
 
+from app.core.events import events
 from app.repositories.company_clients_repo import CompanyClientsRepo
 from app.modules.company_clients.model import CompanyClientsTableModel
+from app.ui.background_loader import BackgroundLoader, loading_label
+from app.ui.indexed_filter_proxy import install_filter_proxy
 
 
 class CompanyClientsPage(QWidget):
@@ -22,6 +25,7 @@ class CompanyClientsPage(QWidget):
         super().__init__()
 
         self._is_busy: bool = False
+        self.loader = BackgroundLoader(self)
 
         layout = QVBoxLayout(self)
 
@@ -57,13 +61,18 @@ class CompanyClientsPage(QWidget):
         self.desc_input.returnPressed.connect(self._on_add)
 
         # ---- Table ----
+        layout.addWidget(loading_label(self.loader))
+        self.search_input = QLineEdit()
+        layout.addWidget(self.search_input)
         self.table = QTableView()
         self.model = CompanyClientsTableModel()
-        self.table.setModel(self.model)
+        self.proxy = install_filter_proxy(self.table, self.model, self.search_input)
 
         self.table.doubleClicked.connect(self._on_deactivate)
         layout.addWidget(self.table)
 
+        events().subscribe("company_clients_changed", self.refresh, owner=self)
+
         self.refresh()
         self.name_input.setFocus()
 
@@ -84,12 +93,10 @@ class CompanyClientsPage(QWidget):
         return value.strip().replace(" ", "")
 
     def refresh(self) -> None:
-        try:
-            rows = CompanyClientsRepo.list_active()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load clients.\n\n{e}")
-            return
-        self.model.load(rows)
+        self.loader.load("rows", CompanyClientsRepo.list_active, self.model.sync, self._on_load_failed)
+
+    def _on_load_failed(self, e: Exception) -> None:
+        QMessageBox.critical(self, "Error", f"Failed to load clients.\n\n{e}")
 
     def _on_add(self) -> None:
         if self._is_busy:
@@ -121,7 +128,8 @@ class CompanyClientsPage(QWidget):
 
         self._set_busy(True)
         try:
-            CompanyClientsRepo.create(name, legal_id, desc)
+            with events().applied_locally(self):
+                row = CompanyClientsRepo.create(name, legal_id, desc)
         except Exception as e:
             # Common case: unique constraint, RLS, etc.
             QMessageBox.critical(self, "Create failed", str(e))
@@ -135,13 +143,14 @@ class CompanyClientsPage(QWidget):
         self.desc_input.clear()
         self.name_input.setFocus()
 
-        self.refresh()
+        self.model.upsert([row])
+        self.loader.reload_if_pending("rows")
 
     def _on_deactivate(self, index: QModelIndex) -> None:
         if self._is_busy:
             return
 
-        row = index.row()
+        row = self.proxy.source_row(index.row())
         if row < 0:
             return
 
@@ -161,11 +170,13 @@ class CompanyClientsPage(QWidget):
 
         self._set_busy(True)
         try:
-            CompanyClientsRepo.deactivate(client_id)
+            with events().applied_locally(self):
+                CompanyClientsRepo.deactivate(client_id)
         except Exception as e:
             QMessageBox.critical(self, "Deactivate failed", str(e))
             return
         finally:
             self._set_busy(False)
 
-        self.refresh()
\ No newline at end of file
+        self.model.remove([client_id])
+        self.loader.reload_if_pending("rows")
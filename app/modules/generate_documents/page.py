@@ -3,7 +3,6 @@ from __future__ import annotations
 from datetime import date
 from typing import Dict, List, Optional, Tuple
 
-from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -15,14 +14,15 @@ from PySide6.QtWidgets import (
     QMessageBox,
     QFileDialog,
     QLineEdit,
-    QCompleter,
 )
 
+from app.core.events import events
 from app.repositories.generate_documents_repo import (
     GenerateDocumentsRepo,
     IncidentForDoc,
 )
 from app.repositories.generated_documents_repo import GeneratedDocumentsRepo
+from app.services.reference_data import reference_data
 
 from app.services.document_renderer import (
     DocContext,
@@ -31,6 +31,9 @@ from app.services.document_renderer import (
     save_bytes,
     assert_required_placeholders,
 )
+from app.repositories.company_clients_repo import CompanyClientOption
+from app.ui.background_loader import BackgroundLoader
+from app.ui.searchable_combo import setup_searchable_combo
 
 
 # Required placeholders by incident_type_code
@@ -45,6 +48,8 @@ class GenerateDocumentsPage(QWidget):
     def __init__(self) -> None:
         super().__init__()
 
+        self.loader = BackgroundLoader(self)
+
         layout = QVBoxLayout(self)
 
         # ---- Filters row ----
@@ -53,7 +58,8 @@ class GenerateDocumentsPage(QWidget):
         filters.addWidget(QLabel("Company client:"))
 
         self.client_filter = QComboBox()
-        self._setup_searchable_combo(self.client_filter)
+        self.client_filter.addItem("All", "")
+        setup_searchable_combo(self.client_filter, fallback_index=0)
         filters.addWidget(self.client_filter)
 
         filters.addWidget(QLabel("From:"))
@@ -93,22 +99,18 @@ class GenerateDocumentsPage(QWidget):
 
         self._output_folder: Optional[str] = None
 
+        events().subscribe("company_clients_changed", self.reload_clients, owner=self)
+
         self._load_clients()
         self._init_dates()
 
-    def _setup_searchable_combo(self, combo: QComboBox) -> None:
-        combo.setEditable(True)
-        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-
-        completer = QCompleter(combo.model(), combo)
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-        combo.setCompleter(completer)
-
     def _load_clients(self) -> None:
-        clients = GenerateDocumentsRepo.list_company_clients_options()
+        self.loader.load("clients", reference_data().company_clients, self._apply_clients, self._on_clients_failed)
+
+    def _on_clients_failed(self, e: Exception) -> None:
+        QMessageBox.critical(self, "Error", f"Could not load clients.\n\n{e}")
 
+    def _apply_clients(self, clients: List[CompanyClientOption]) -> None:
         self.client_filter.blockSignals(True)
         self.client_filter.clear()
         self.client_filter.addItem("All", "")
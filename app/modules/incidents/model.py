@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-from typing import List, Any
+from typing import Callable, Optional
 
-from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex, QPersistentModelIndex
+from PySide6.QtCore import QModelIndex, QPersistentModelIndex
 
 from app.repositories.incidents_repo import IncidentRow
+from app.ui.keyed_table_model import KeyedTableModel
 
 
-class IncidentsTableModel(QAbstractTableModel):
+class IncidentsTableModel(KeyedTableModel[IncidentRow]):
     HEADERS = [
         "Code",
         "Received Day",
@@ -17,60 +18,41 @@ class IncidentsTableModel(QAbstractTableModel):
         "Manual",
         "Created At",
     ]
+    COLUMNS = [
+        "code",
+        "received_day",
+        "incident_date",
+        "worker_name",
+        "incident_type",
+        "manual_handling",
+        "created_at",
+    ]
 
     def __init__(self) -> None:
         super().__init__()
-        self._rows: List[IncidentRow] = []
-
-    def load(self, rows: List[IncidentRow]) -> None:
-        self.beginResetModel()
-        self._rows = list(rows)
-        self.endResetModel()
-
-    def rowCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
-        return len(self._rows)
-
-    def columnCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
-        return len(self.HEADERS)
-
-    def data(
-        self,
-        index: QModelIndex | QPersistentModelIndex,
-        role: int = int(Qt.ItemDataRole.DisplayRole),
-    ) -> Any:
-        if not index.isValid() or role != int(Qt.ItemDataRole.DisplayRole):
-            return None
-
-        row = self._rows[int(index.row())]
-        col = int(index.column())
-
-        if col == 0:
-            return row["code"]
-        if col == 1:
-            return row["received_day"]
-        if col == 2:
-            return row["incident_date"]
-        if col == 3:
-            return row["worker_name"]
-        if col == 4:
-            return row["incident_type"]
-        if col == 5:
-            return "Yes" if row["manual_handling"] else "No"
-        if col == 6:
-            return row["created_at"]
-
-        return None
-
-    def headerData(
-        self,
-        section: int,
-        orientation: Qt.Orientation,
-        role: int = int(Qt.ItemDataRole.DisplayRole),
-    ) -> Any:
-        if role == int(Qt.ItemDataRole.DisplayRole) and orientation == Qt.Orientation.Horizontal:
-            if 0 <= int(section) < len(self.HEADERS):
-                return self.HEADERS[int(section)]
-        return None
+        # Loads the next page into the model (page-owned: it knows filters and the outbox overlay)
+        self._fetch_more: Optional[Callable[[], None]] = None
+        self._has_more = False
+        self._fetching = False
+
+    def set_fetch_more(self, fetch: Optional[Callable[[], None]]) -> None:
+        self._fetch_more = fetch
+
+    def set_has_more(self, has_more: bool) -> None:
+        self._has_more = has_more
+
+    def canFetchMore(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._has_more and self._fetch_more is not None and not self._fetching
+
+    def fetchMore(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> None:
+        if not self.canFetchMore(parent):
+            return
+        assert self._fetch_more is not None
+        self._fetching = True
+        try:
+            self._fetch_more()
+        finally:
+            self._fetching = False
 
     def incident_id_at(self, row: int) -> str:
-        return self._rows[row]["id"]
\ No newline at end of file
+        return self.id_at(row)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from PySide6.QtCore import QModelIndex, Qt, QDate
+from PySide6.QtCore import QModelIndex, QDate
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -15,18 +15,33 @@ from PySide6.QtWidgets import (
     QPushButton,
     QTableView,
     QMessageBox,
-    QCompleter,
+    QLineEdit,
 )
 
 from app.core.events import events
-from app.repositories.incidents_repo import IncidentsRepo, IncidentRow
+from app.repositories.incident_types_repo import IncidentTypeOption
+from app.repositories.incidents_repo import (
+    INCIDENTS_PAGE_SIZE,
+    WORKER_SEARCH_LIMIT,
+    IncidentsRepo,
+    IncidentRow,
+    WorkerOption,
+    worker_option_matches,
+)
+from app.services.incident_outbox import incident_outbox
+from app.services.reference_data import reference_data
 from app.modules.incidents.model import IncidentsTableModel
+from app.ui.background_loader import BackgroundLoader, loading_label
+from app.ui.indexed_filter_proxy import install_filter_proxy
+from app.ui.searchable_combo import ServerSearchCombo
 
 
 class IncidentsPage(QWidget):
     def __init__(self) -> None:
         super().__init__()
 
+        self.loader = BackgroundLoader(self)
+
         layout = QVBoxLayout(self)
 
         title = QLabel("Incidents")
@@ -38,13 +53,34 @@ class IncidentsPage(QWidget):
         self.hint.setStyleSheet("color: #666;")
         layout.addWidget(self.hint)
 
+        # Offline queue status (queued / rejected writes, last flush throughput)
+        outbox_row = QHBoxLayout()
+        self.outbox_status = QLabel("")
+        self.outbox_status.setStyleSheet("color: #666;")
+        outbox_row.addWidget(self.outbox_status, stretch=1)
+        self.retry_failed_btn = QPushButton("Retry rejected")
+        self.retry_failed_btn.clicked.connect(self._on_retry_failed)
+        self.retry_failed_btn.setVisible(False)
+        outbox_row.addWidget(self.retry_failed_btn)
+        layout.addLayout(outbox_row)
+
         # ---- Worker filter/target ----
         top = QHBoxLayout()
         top.addWidget(QLabel("Worker:"))
 
         self.worker_combo = QComboBox()
         self.worker_combo.setMinimumWidth(360)
-        self._setup_searchable_combo(self.worker_combo)
+        self.worker_combo.addItem("All", "")  # filter option
+        # Searches the server as you type: the full worker list is never loaded
+        self.worker_picker = ServerSearchCombo(
+            self.worker_combo,
+            IncidentsRepo.search_workers,
+            WORKER_SEARCH_LIMIT,
+            refine=worker_option_matches,
+        )
+        self.worker_picker.search_failed.connect(lambda e: self._set_hint(f"Could not search workers: {e}"))
+        self.worker_combo.lineEdit().setPlaceholderText("Type a name or national ID...")
+        self._has_workers = False
         self.worker_combo.currentIndexChanged.connect(self._on_worker_changed)
 
         top.addWidget(self.worker_combo)
@@ -93,15 +129,27 @@ class IncidentsPage(QWidget):
         layout.addLayout(obs_row)
 
         # ---- Table ----
+        layout.addWidget(loading_label(self.loader))
+        self.search_input = QLineEdit()
+        layout.addWidget(self.search_input)
         self.table = QTableView()
         self.model = IncidentsTableModel()
-        self.table.setModel(self.model)
+        # Server rows loaded so far (newest first); more pages load as the table scrolls
+        self._server_rows: List[IncidentRow] = []
+        self._server_has_more = False
+        self.model.set_fetch_more(self._load_more)
+        self.proxy = install_filter_proxy(self.table, self.model, self.search_input)
         self.table.doubleClicked.connect(self._on_delete)
         layout.addWidget(self.table)
 
         # ---- Subscribe to global events ----
-        events().workers_changed.connect(self._on_workers_changed)
-        events().incidents_changed.connect(self._on_incidents_changed)
+        events().subscribe("workers_changed", self._on_workers_changed, owner=self)
+        events().subscribe("incidents_changed", self._on_incidents_changed, owner=self)
+        events().subscribe("incident_types_changed", self.reload_types, owner=self)
+        events().subscribe("outbox_changed", self._on_outbox_changed, owner=self)
+
+        # Writes left queued by a sign-out or an earlier session go out now
+        incident_outbox().kick()
 
         # Initial load
         self._load_types()
@@ -112,43 +160,23 @@ class IncidentsPage(QWidget):
     def _set_hint(self, text: str) -> None:
         self.hint.setText(text or "")
 
-    def _setup_searchable_combo(self, combo: QComboBox) -> None:
-        combo.setEditable(True)
-        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-
-        completer = QCompleter(combo.model(), combo)
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-        combo.setCompleter(completer)
-
-        # Optional hardening (same pattern as other pages): typed text must match
-        def apply_text_to_selection() -> None:
-            text = combo.currentText().strip()
-            if not text:
-                combo.setCurrentIndex(-1)
-                return
-            idx = combo.findText(text, Qt.MatchFlag.MatchFixedString)
-            combo.setCurrentIndex(idx if idx >= 0 else -1)
-
-        completer.activated.connect(lambda _: apply_text_to_selection())
-        if combo.lineEdit():
-            combo.lineEdit().editingFinished.connect(apply_text_to_selection)
-
     def _load_workers(self) -> None:
-        try:
-            workers = IncidentsRepo.list_workers_options()
-        except Exception as e:
-            self._set_hint(f"Could not load workers: {e}")
-            workers = []
+        # Only whether any exist; the picker searches on demand
+        self.worker_picker.clear_cache()
+        self.loader.load(
+            "workers",
+            lambda: IncidentsRepo.search_workers("", limit=1),
+            self._apply_workers,
+            self._on_workers_failed,
+        )
+
+    def _on_workers_failed(self, e: Exception) -> None:
+        self._has_workers = False
+        self._set_hint(f"Could not load workers: {e}")
+        self._sync_form_state()
 
-        self.worker_combo.blockSignals(True)
-        self.worker_combo.clear()
-        self.worker_combo.addItem("All", "")  # filter option
-        for w in workers:
-            self.worker_combo.addItem(w["label"], w["id"])
-        self.worker_combo.setCurrentIndex(0)
-        self.worker_combo.blockSignals(False)
+    def _apply_workers(self, workers: List[WorkerOption]) -> None:
+        self._has_workers = bool(workers)
 
         if not workers:
             # NO POPUP — just a hint
@@ -161,16 +189,24 @@ class IncidentsPage(QWidget):
         self._sync_form_state()
 
     def _load_types(self) -> None:
-        try:
-            types_ = IncidentsRepo.list_incident_types_options()
-        except Exception as e:
-            self._set_hint(f"Could not load incident types: {e}")
-            types_ = []
+        self.loader.load("types", reference_data().incident_types, self._apply_types, self._on_types_failed)
+
+    def _on_types_failed(self, e: Exception) -> None:
+        self._set_hint(f"Could not load incident types: {e}")
+        self._sync_form_state()
+
+    def _apply_types(self, types_: List[IncidentTypeOption]) -> None:
+        selected = self.type_combo.currentData()
 
         self.type_combo.blockSignals(True)
         self.type_combo.clear()
         for t in types_:
-            self.type_combo.addItem(t["label"], t["id"])
+            label = f"{t['code']} — {t['name']}" if t["name"] else t["code"]
+            self.type_combo.addItem(label, t["id"])
+        if selected is not None:
+            idx = self.type_combo.findData(selected)
+            if idx >= 0:
+                self.type_combo.setCurrentIndex(idx)
         self.type_combo.blockSignals(False)
 
         if not types_:
@@ -181,6 +217,9 @@ class IncidentsPage(QWidget):
 
     def _on_worker_changed(self) -> None:
         self._sync_form_state()
+        # Different filter: start again from the first page
+        self._server_rows = []
+        self._server_has_more = False
         self.refresh()
 
     def _sync_form_state(self) -> None:
@@ -190,7 +229,7 @@ class IncidentsPage(QWidget):
         - incident type selected
         - and workers/types exist
         """
-        has_workers = self.worker_combo.count() > 1  # includes "All"
+        has_workers = self._has_workers
         has_types = self.type_combo.count() > 0
 
         worker_id = self.worker_combo.currentData()
@@ -208,18 +247,92 @@ class IncidentsPage(QWidget):
 
         self.save_btn.setEnabled(worker_ok and type_ok and form_enabled)
 
-    def refresh(self) -> None:
+    def _selected_worker_id(self) -> str:
         worker_id = self.worker_combo.currentData()
         if not isinstance(worker_id, str) or not worker_id.strip():
-            worker_id = ""
+            return ""
+        return worker_id
+
+    def refresh(self) -> None:
+        # Only the newest page is re-read; older pages already loaded are merged, not refetched
+        worker_id = self._selected_worker_id() or None
+        # No fetchMore while rows are on their way
+        self.model.set_has_more(False)
+        self.loader.load(
+            "rows",
+            lambda: IncidentsRepo.list_recent(worker_id=worker_id),
+            self._on_rows_loaded,
+            self._on_rows_failed,
+        )
+
+    def _on_rows_loaded(self, head: List[IncidentRow]) -> None:
+        if len(head) < INCIDENTS_PAGE_SIZE:
+            # Everything there is fits in the first page
+            self._server_rows = head
+            self._server_has_more = False
+        else:
+            # Keep the loaded rows older than the page just read (keyset order: created_at, id)
+            boundary = (head[-1]["created_at"], head[-1]["id"])
+            tail = [r for r in self._server_rows if (r["created_at"], r["id"]) < boundary]
+            self._server_rows = head + tail
+            self._server_has_more = self._server_has_more if tail else True
+        self.model.set_has_more(self._server_has_more)
+        self._apply_rows()
+
+    def _on_rows_failed(self, e: Exception) -> None:
+        # Keep what is shown; the next refresh tries again
+        self._set_hint(f"Could not load incidents: {e}")
+        self.model.set_has_more(self._server_has_more)
+
+    def _load_more(self) -> None:
+        if not self._server_rows:
+            return
+        last = self._server_rows[-1]
+        worker_id = self._selected_worker_id() or None
+        self.model.set_has_more(False)
+        # Same channel as refresh(): a refresh (e.g. new worker filter) supersedes this page
+        self.loader.load(
+            "rows",
+            lambda: IncidentsRepo.list_recent(worker_id=worker_id, before=(last["created_at"], last["id"])),
+            self._on_more_loaded,
+            # fetchMore stays off (no retry loop while offline); the next refresh re-enables it
+            lambda e: self._set_hint(f"Could not load more incidents: {e}"),
+        )
+
+    def _on_more_loaded(self, page: List[IncidentRow]) -> None:
+        self._server_has_more = len(page) >= INCIDENTS_PAGE_SIZE
+        self.model.set_has_more(self._server_has_more)
+        self._server_rows = self._server_rows + page
+        self._apply_rows()
+
+    def _apply_rows(self) -> None:
+        # Queued (not yet flushed) writes are shown on top of the server rows
+        self.model.sync(incident_outbox().overlay(self._server_rows, self._selected_worker_id() or None))
+        self._update_outbox_status()
+
+    def _update_outbox_status(self) -> None:
+        st = incident_outbox().stats()
+        parts: List[str] = []
+        if st.pending:
+            text = f"{st.pending} incident change(s) waiting to sync"
+            if st.retrying_in:
+                text += f" — offline, retrying in {st.retrying_in:.0f}s"
+            parts.append(text)
+        if st.failed:
+            parts.append(f"{st.failed} rejected by the server (double-click to discard, or retry): {st.last_error}")
+        if not parts and st.last_flush_rows:
+            parts.append(
+                f"All changes synced (last flush: {st.last_flush_rows} row(s), "
+                f"{st.last_flush_rows_per_sec:.0f} rows/s)"
+            )
+        self.outbox_status.setText(" · ".join(parts))
+        self.retry_failed_btn.setVisible(st.failed > 0)
 
+    def _on_retry_failed(self) -> None:
         try:
-            rows: List[IncidentRow] = IncidentsRepo.list_recent(worker_id=worker_id or None)
+            incident_outbox().retry_failed()
         except Exception as e:
-            self._set_hint(f"Could not load incidents: {e}")
-            rows = []
-
-        self.model.load(rows)
+            QMessageBox.warning(self, "Error", f"Could not retry:\n{e}")
 
     def _on_add(self) -> None:
         worker_id = self.worker_combo.currentData()
@@ -249,13 +362,16 @@ class IncidentsPage(QWidget):
 
         self.save_btn.setEnabled(False)
         try:
-            IncidentsRepo.create(
+            # Queued locally and flushed in the background; shows up immediately as "(pending)"
+            incident_outbox().create(
                 worker_id=worker_id,
                 incident_type_id=incident_type_id,
                 incident_date=incident_date_str,
                 received_day=received_day_str,
                 observations=observations,
                 manual_handling=self.manual_cb.isChecked(),
+                worker_name=self.worker_combo.currentText().split(" — ")[0],
+                incident_type_label=self.type_combo.currentText(),
             )
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Could not create incident:\n{e}")
@@ -269,12 +385,8 @@ class IncidentsPage(QWidget):
         self.incident_date.setDate(QDate.currentDate())
         self.received_day.setDate(QDate.currentDate())
 
-        # Notify + refresh
-        events().incidents_changed.emit()
-        self.refresh()
-
     def _on_delete(self, index: QModelIndex) -> None:
-        row = index.row()
+        row = self.proxy.source_row(index.row())
         incident_id = self.model.incident_id_at(row)
 
         confirm = QMessageBox.question(self, "Delete Incident", "Delete this incident?")
@@ -282,14 +394,11 @@ class IncidentsPage(QWidget):
             return
 
         try:
-            IncidentsRepo.delete(incident_id)
+            incident_outbox().delete(incident_id)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Could not delete incident:\n{e}")
             return
 
-        events().incidents_changed.emit()
-        self.refresh()
-
     # ---- Event handlers ----
     def _on_workers_changed(self) -> None:
         self._load_workers()
@@ -298,6 +407,9 @@ class IncidentsPage(QWidget):
     def _on_incidents_changed(self) -> None:
         self.refresh()
 
+    def _on_outbox_changed(self) -> None:
+        self._apply_rows()
+
     # Optional explicit calls
     def reload_workers(self) -> None:
         self._load_workers()
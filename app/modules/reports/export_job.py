@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from PySide6.QtCore import QObject, Signal
+
+from app.db.instrumentation import request_scope
+from app.repositories.reports_repo import ReportIncidentRow, ReportsRepo
+from app.services.document_renderer import safe_filename
+from app.services.report_rollups import ReportRollupStore
+from app.services.reports_excel_exporter import (
+    DETAIL_ROWS_PER_SHEET,
+    ExportCancelled,
+    ReportsExcelExporter,
+    ReportsMetadata,
+    ReportTrends,
+    export_workbook_file,
+    previous_period,
+    trend_start,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Rows per "Detalle" sheet (1 .. DETAIL_ROWS_PER_SHEET, the default)
+DETAIL_ROWS_ENV = "HRDOCS_DETAIL_ROWS_PER_SHEET"
+
+
+def detail_rows_per_sheet_from_env() -> int:
+    raw = os.getenv(DETAIL_ROWS_ENV, "").strip()
+    if not raw:
+        return DETAIL_ROWS_PER_SHEET
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if not 0 < value <= DETAIL_ROWS_PER_SHEET:
+        logger.warning(
+            "%s=%r is not a row count between 1 and %d; using %d",
+            DETAIL_ROWS_ENV,
+            raw,
+            DETAIL_ROWS_PER_SHEET,
+            DETAIL_ROWS_PER_SHEET,
+        )
+        return DETAIL_ROWS_PER_SHEET
+    return value
+
+
+@dataclass(frozen=True)
+class ReportExportRequest:
+    date_from: date
+    date_to: date
+    company_client_id: Optional[str]
+    client_name: str
+    path: str
+    include_trends: bool = False
+    detail_rows_per_sheet: int = field(default_factory=detail_rows_per_sheet_from_env)
+    # One workbook per company client; path is then the output folder
+    per_client: bool = False
+    # Process pool size for per_client mode (None = CPU count)
+    max_workers: Optional[int] = None
+    # "openpyxl", "xlsxwriter" or "auto"; None falls back to HRDOCS_XLSX_BACKEND
+    xlsx_backend: Optional[str] = None
+
+
+class ReportExportJob(QObject):
+    """
+    Runs fetch -> aggregate -> sheets -> save off the UI thread.
+    Meant to be moved to a QThread; run() is connected to QThread.started.
+    """
+
+    # phase, done, total
+    progress = Signal(str, int, int)
+    # rows exported (0 means there was nothing to export and no file was written)
+    finished = Signal(int)
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, request: ReportExportRequest) -> None:
+        super().__init__()
+        self._request = request
+        self._cancel = threading.Event()
+
+        self._phase: str = ""
+        self._phase_started: float = 0.0
+        self._phase_rows: int = 0
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    # -------------------------
+    # phase timing
+    # -------------------------
+    def _enter_phase(self, phase: str, done: int, total: int) -> None:
+        if self.is_cancelled():
+            raise ExportCancelled()
+
+        if phase != self._phase:
+            self._close_phase()
+            self._phase = phase
+            self._phase_started = time.perf_counter()
+
+        self._phase_rows = max(self._phase_rows, total)
+        self.progress.emit(phase, done, total)
+
+    def _close_phase(self) -> None:
+        if not self._phase:
+            return
+        elapsed = time.perf_counter() - self._phase_started
+        logger.info("report export: %s took %.3fs (%d rows)", self._phase, elapsed, self._phase_rows)
+        self._phase = ""
+        self._phase_rows = 0
+
+    def _refresh_rollups(self) -> ReportRollupStore:
+        req = self._request
+        prev_from, _ = previous_period(req.date_from, req.date_to)
+
+        self._enter_phase("rollups", 0, 0)
+        store = ReportRollupStore.for_current_firm()
+        store.refresh(min(trend_start(req.date_to), prev_from), req.date_to)
+        return store
+
+    def _trends_for(self, store: ReportRollupStore, company_client_id: Optional[str]) -> ReportTrends:
+        req = self._request
+        t_from = trend_start(req.date_to)
+        prev_from, prev_to = previous_period(req.date_from, req.date_to)
+
+        counts = store.counts(date_from=t_from, date_to=req.date_to, company_client_id=company_client_id)
+        previous = store.counts(date_from=prev_from, date_to=prev_to, company_client_id=company_client_id)
+
+        return ReportTrends(
+            trend_from=t_from,
+            counts=counts,
+            previous_from=prev_from,
+            previous_to=prev_to,
+            previous_counts=previous,
+        )
+
+    def _run_single(self, rows: List[ReportIncidentRow]) -> None:
+        req = self._request
+
+        trends = None
+        if req.include_trends:
+            trends = self._trends_for(self._refresh_rollups(), req.company_client_id)
+
+        wb = ReportsExcelExporter.build_workbook(
+            incidents=rows,
+            meta=ReportsMetadata(
+                date_from=req.date_from,
+                date_to=req.date_to,
+                client_name=req.client_name,
+            ),
+            on_progress=self._enter_phase,
+            is_cancelled=self.is_cancelled,
+            trends=trends,
+            detail_rows_per_sheet=req.detail_rows_per_sheet,
+            backend=req.xlsx_backend,
+        )
+        logger.info("report export: %s backend", wb.backend)
+
+        try:
+            self._enter_phase("save", 0, len(rows))
+        except ExportCancelled:
+            wb.discard()
+            raise
+        wb.save(req.path)
+        # File is on disk: report completion without honouring a late cancel
+        self.progress.emit("save", len(rows), len(rows))
+
+    def _run_per_client(self, rows: List[ReportIncidentRow]) -> None:
+        """
+        One workbook per company client, built and saved in a process pool.
+        req.path is the output folder in this mode.
+        """
+        req = self._request
+
+        self._enter_phase("partition", 0, len(rows))
+        by_client: Dict[str, List[ReportIncidentRow]] = defaultdict(list)
+        for r in rows:
+            by_client[r.company_client_id].append(r)
+
+        store = self._refresh_rollups() if req.include_trends else None
+
+        # Largest first, so the slowest workbook starts right away
+        jobs = []
+        used_names: Set[str] = set()
+        for client_id, client_rows in sorted(by_client.items(), key=lambda x: -len(x[1])):
+            client_name = client_rows[0].company_client_name
+            period = f"{req.date_from.isoformat()}_a_{req.date_to.isoformat()}"
+            filename = safe_filename(f"reporte_incidencias_{client_name}_{period}.xlsx")
+            if filename.casefold() in used_names:
+                # Client names aren't unique (and safe_filename can merge similar ones)
+                filename = safe_filename(f"reporte_incidencias_{client_name}_{client_id[:8]}_{period}.xlsx")
+            used_names.add(filename.casefold())
+            jobs.append(
+                (
+                    str(Path(req.path) / filename),
+                    client_rows,
+                    ReportsMetadata(date_from=req.date_from, date_to=req.date_to, client_name=client_name),
+                    self._trends_for(store, client_id) if store is not None else None,
+                    req.detail_rows_per_sheet,
+                    req.xlsx_backend,
+                )
+            )
+
+        Path(req.path).mkdir(parents=True, exist_ok=True)
+
+        total = len(jobs)
+        workers = max(1, min(total, req.max_workers or (os.cpu_count() or 1)))
+        self._enter_phase("workbooks", 0, total)
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures: List[Future] = []
+        try:
+            futures = [executor.submit(export_workbook_file, *job) for job in jobs]
+            pending = set(futures)
+            done_count = 0
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for f in done:
+                    f.result()  # re-raise worker errors
+                    done_count += 1
+                # Raises ExportCancelled on cancel
+                self._enter_phase("workbooks", done_count, total)
+        except ExportCancelled:
+            self._discard_workbooks(executor, futures, jobs)
+            raise
+        except Exception as e:
+            # A failed workbook is handled like a cancel: no partial set of files
+            self._discard_workbooks(executor, futures, jobs)
+            failed = [job[2].client_name for f, job in zip(futures, jobs) if not f.cancelled() and f.exception()]
+            if failed:
+                raise RuntimeError(f"Workbook for '{failed[0]}' failed: {e}. No files were kept.") from e
+            raise
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _discard_workbooks(executor: ProcessPoolExecutor, futures: List[Future], jobs: List[Tuple[Any, ...]]) -> None:
+        """
+        Workers can't be interrupted: lets the running ones finish, drops the
+        queued ones, then removes every workbook this export wrote.
+        """
+        executor.shutdown(wait=True, cancel_futures=True)
+        for f, (path, *_) in zip(futures, jobs):
+            if f.cancelled() or f.exception() is not None:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # -------------------------
+    # run
+    # -------------------------
+    def run(self) -> None:
+        # Runs on a worker thread; keep its requests attributed to the reports page
+        with request_scope(page="reports", action="export"):
+            self._run()
+
+    def _run(self) -> None:
+        req = self._request
+        started = time.perf_counter()
+
+        try:
+            self._enter_phase("fetch", 0, 0)
+            rows = ReportsRepo.list_incidents_for_reports(
+                date_from=req.date_from,
+                date_to=req.date_to,
+                company_client_id=req.company_client_id,
+            )
+            self._enter_phase("fetch", len(rows), len(rows))
+
+            if not rows:
+                self._close_phase()
+                self.finished.emit(0)
+                return
+
+            if req.per_client:
+                self._run_per_client(rows)
+            else:
+                self._run_single(rows)
+            self._close_phase()
+        except ExportCancelled:
+            self._close_phase()
+            logger.info("report export: cancelled after %.3fs", time.perf_counter() - started)
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            self._close_phase()
+            logger.exception("report export: failed")
+            self.failed.emit(str(e))
+            return
+
+        logger.info("report export: done in %.3fs (%d rows)", time.perf_counter() - started, len(rows))
+        self.finished.emit(len(rows))
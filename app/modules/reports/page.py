@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import date
+from typing import List, Optional
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QThread
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -13,12 +14,16 @@ from PySide6.QtWidgets import (
     QMessageBox,
     QFileDialog,
     QDateEdit,
-    QCompleter,
+    QProgressBar,
+    QCheckBox,
 )
 
 from app.core.events import events
-from app.repositories.reports_repo import ReportsRepo
-from app.services.reports_excel_exporter import ReportsExcelExporter, ReportsMetadata
+from app.repositories.company_clients_repo import CompanyClientOption
+from app.services.reference_data import reference_data
+from app.modules.reports.export_job import ReportExportJob, ReportExportRequest
+from app.ui.background_loader import BackgroundLoader
+from app.ui.searchable_combo import setup_searchable_combo
 
 
 class ReportsPage(QWidget):
@@ -27,6 +32,8 @@ class ReportsPage(QWidget):
     def __init__(self) -> None:
         super().__init__()
 
+        self.loader = BackgroundLoader(self)
+
         layout = QVBoxLayout(self)
 
         title = QLabel("Reports")
@@ -38,7 +45,8 @@ class ReportsPage(QWidget):
 
         filters.addWidget(QLabel("Company client:"))
         self.client_filter = QComboBox()
-        self._setup_searchable_combo(self.client_filter)
+        setup_searchable_combo(self.client_filter, fallback_index=0)
+        self.client_filter.currentIndexChanged.connect(lambda _: self._apply_ui_state())
         filters.addWidget(self.client_filter, stretch=1)
 
         filters.addWidget(QLabel("From (received_day):"))
@@ -53,19 +61,44 @@ class ReportsPage(QWidget):
         self.date_to.setDisplayFormat("yyyy-MM-dd")
         filters.addWidget(self.date_to)
 
+        self.trends_cb = QCheckBox("Include trends")
+        self.trends_cb.setToolTip(
+            "Adds monthly/weekly trend sheets and a comparison with the previous period, "
+            "computed from the local rollups."
+        )
+        filters.addWidget(self.trends_cb)
+
+        self.per_client_cb = QCheckBox("One workbook per client")
+        self.per_client_cb.setToolTip("Only with client = All. Writes one .xlsx per client into a folder.")
+        filters.addWidget(self.per_client_cb)
+
         self.export_btn = QPushButton("Export Excel")
         self.export_btn.clicked.connect(self._on_export)
         filters.addWidget(self.export_btn)
 
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self._on_cancel_export)
+        self.cancel_btn.setVisible(False)
+        filters.addWidget(self.cancel_btn)
+
         layout.addLayout(filters)
 
         self.hint = QLabel(self.DEFAULT_HINT)
         self.hint.setStyleSheet("color: #666;")
         layout.addWidget(self.hint)
 
+        self.progress = QProgressBar()
+        self.progress.setVisible(False)
+        layout.addWidget(self.progress)
+
+        # Running export (if any)
+        self._export_thread: Optional[QThread] = None
+        self._export_job: Optional[ReportExportJob] = None
+        self._export_request: Optional[ReportExportRequest] = None
+
         layout.addStretch(1)
 
-        events().company_clients_changed.connect(self.reload_clients)
+        events().subscribe("company_clients_changed", self.reload_clients, owner=self)
 
         self._set_default_dates()
         self._load_clients()
@@ -74,29 +107,6 @@ class ReportsPage(QWidget):
     def _set_hint(self, text: str) -> None:
         self.hint.setText(text or "")
 
-    def _setup_searchable_combo(self, combo: QComboBox) -> None:
-        combo.setEditable(True)
-        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-
-        completer = QCompleter(combo.model(), combo)
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-        combo.setCompleter(completer)
-
-        # Hardening: typed text must match an item
-        def apply_text_to_selection() -> None:
-            text = combo.currentText().strip()
-            if not text:
-                combo.setCurrentIndex(0)  # default to "All"
-                return
-            idx = combo.findText(text, Qt.MatchFlag.MatchFixedString)
-            combo.setCurrentIndex(idx if idx >= 0 else 0)
-
-        completer.activated.connect(lambda _: apply_text_to_selection())
-        if combo.lineEdit():
-            combo.lineEdit().editingFinished.connect(apply_text_to_selection)
-
     def _set_default_dates(self) -> None:
         today = date.today()
         first = date(today.year, today.month, 1)
@@ -110,15 +120,15 @@ class ReportsPage(QWidget):
         self.client_filter.setCurrentIndex(0)
         self.client_filter.blockSignals(False)
 
-        self._set_hint(self.DEFAULT_HINT)
+        self._set_hint("Loading clients...")
+        self.export_btn.setEnabled(False)
+        self.loader.load("clients", reference_data().company_clients, self._apply_clients, self._on_clients_failed)
 
-        try:
-            clients = ReportsRepo.list_company_clients_options()
-        except Exception as e:
-            self._set_hint(f"Could not load clients: {e}")
-            self.export_btn.setEnabled(False)
-            return
+    def _on_clients_failed(self, e: Exception) -> None:
+        self._set_hint(f"Could not load clients: {e}")
+        self._apply_ui_state()
 
+    def _apply_clients(self, clients: List[CompanyClientOption]) -> None:
         self.client_filter.blockSignals(True)
         self.client_filter.clear()
         self.client_filter.addItem("All", "")
@@ -132,10 +142,22 @@ class ReportsPage(QWidget):
         else:
             self._set_hint(self.DEFAULT_HINT)
 
-        self.export_btn.setEnabled(True)
+        self._apply_ui_state()
+
+    def _is_exporting(self) -> bool:
+        return self._export_thread is not None
 
     def _apply_ui_state(self) -> None:
-        if self.client_filter.count() == 0:
+        is_all = not (self.client_filter.currentData() or "")
+        self.per_client_cb.setEnabled(is_all and not self._is_exporting())
+        if not is_all:
+            self.per_client_cb.setChecked(False)
+
+        if self._is_exporting():
+            self.export_btn.setEnabled(False)
+        elif self.loader.is_loading("clients"):
+            self.export_btn.setEnabled(False)
+        elif self.client_filter.count() == 0:
             self.export_btn.setEnabled(False)
         elif "Could not load clients" in (self.hint.text() or ""):
             self.export_btn.setEnabled(False)
@@ -143,40 +165,34 @@ class ReportsPage(QWidget):
             self.export_btn.setEnabled(True)
 
     def _on_export(self) -> None:
-        self.export_btn.setEnabled(False)
-        try:
-            client_id = self.client_filter.currentData()
-            if not isinstance(client_id, str):
-                client_id = ""
-            client_id = client_id.strip() or None
+        if self._is_exporting():
+            return
 
-            d_from = self.date_from.date().toPython()
-            d_to = self.date_to.date().toPython()
+        client_id = self.client_filter.currentData()
+        if not isinstance(client_id, str):
+            client_id = ""
+        client_id = client_id.strip() or None
 
-            if d_from > d_to:
-                QMessageBox.warning(self, "Error", "From date must be <= To date.")
-                return
+        d_from = self.date_from.date().toPython()
+        d_to = self.date_to.date().toPython()
 
-            try:
-                rows = ReportsRepo.list_incidents_for_reports(
-                    date_from=d_from,
-                    date_to=d_to,
-                    company_client_id=client_id,
-                )
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to load incidents.\n\n{e}")
-                return
+        if d_from > d_to:
+            QMessageBox.warning(self, "Error", "From date must be <= To date.")
+            return
 
-            if not rows:
-                QMessageBox.information(self, "No data", "No incidents found for the selected filters.")
-                return
+        if client_id:
+            client_name_ui = self.client_filter.currentText().strip() or "Cliente"
+            client_name_es = client_name_ui
+        else:
+            client_name_es = "Todos"
 
-            if client_id:
-                client_name_ui = self.client_filter.currentText().strip() or "Cliente"
-                client_name_es = client_name_ui
-            else:
-                client_name_es = "Todos"
+        per_client = self.per_client_cb.isChecked() and not client_id
 
+        if per_client:
+            path = QFileDialog.getExistingDirectory(self, "Select output folder")
+            if not path:
+                return
+        else:
             suggested = f"reporte_incidencias_{d_from.isoformat()}_a_{d_to.isoformat()}.xlsx"
             path, _ = QFileDialog.getSaveFileName(
                 self,
@@ -190,19 +206,115 @@ class ReportsPage(QWidget):
             if not path.lower().endswith(".xlsx"):
                 path = path + ".xlsx"
 
-            try:
-                wb = ReportsExcelExporter.build_workbook(
-                    incidents=rows,
-                    meta=ReportsMetadata(date_from=d_from, date_to=d_to, client_name=client_name_es),
-                )
-                wb.save(path)
-            except Exception as e:
-                QMessageBox.critical(self, "Export failed", str(e))
-                return
+        self._start_export(
+            ReportExportRequest(
+                date_from=d_from,
+                date_to=d_to,
+                company_client_id=client_id,
+                client_name=client_name_es,
+                path=path,
+                include_trends=self.trends_cb.isChecked(),
+                per_client=per_client,
+            )
+        )
+
+    # -------------------------
+    # Background export
+    # -------------------------
+    def _start_export(self, request: ReportExportRequest) -> None:
+        thread = QThread(self)
+        job = ReportExportJob(request)
+        job.moveToThread(thread)
+
+        thread.started.connect(job.run)
+        job.progress.connect(self._on_export_progress)
+        job.finished.connect(self._on_export_finished)
+        job.failed.connect(self._on_export_failed)
+        job.cancelled.connect(self._on_export_cancelled)
+
+        # Every outcome ends the thread
+        job.finished.connect(thread.quit)
+        job.failed.connect(thread.quit)
+        job.cancelled.connect(thread.quit)
+        thread.finished.connect(job.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(self._on_export_thread_done)
+
+        self._export_thread = thread
+        self._export_job = job
+        self._export_request = request
+
+        self.progress.setRange(0, 0)
+        self.progress.setVisible(True)
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.setVisible(True)
+        self._set_hint("Exporting: fetching incidents...")
+        self._apply_ui_state()
 
-            QMessageBox.information(self, "Done", "Report exported successfully.")
-        finally:
-            self.export_btn.setEnabled(True)
+        thread.start()
+
+    def _on_cancel_export(self) -> None:
+        if self._export_job is None:
+            return
+        self._export_job.cancel()
+        self.cancel_btn.setEnabled(False)
+        self._set_hint("Cancelling export...")
+
+    def _on_export_progress(self, phase: str, done: int, total: int) -> None:
+        if self._export_job is not None and self._export_job.is_cancelled():
+            return
+
+        if total > 0:
+            self.progress.setRange(0, total)
+            self.progress.setValue(min(done, total))
+        else:
+            self.progress.setRange(0, 0)
+
+        if phase == "fetch":
+            text = "Exporting: fetching incidents..." if done == 0 else f"Exporting: fetched {done} incident(s)"
+        elif phase == "rollups":
+            text = "Exporting: updating local rollups..."
+        elif phase == "partition":
+            text = f"Exporting: splitting {total} incident(s) by client..."
+        elif phase == "workbooks":
+            text = f"Exporting: workbooks saved {done}/{total}"
+        elif phase == "aggregate":
+            text = f"Exporting: aggregating {total} incident(s)..."
+        elif phase == "save":
+            text = f"Exporting: saving workbook ({total} rows)..."
+        else:
+            text = f"Exporting: writing sheet '{phase}' ({done}/{total})"
+        self._set_hint(text)
+
+    def _on_export_finished(self, rows: int) -> None:
+        if rows == 0:
+            QMessageBox.information(self, "No data", "No incidents found for the selected filters.")
+            return
+        request = self._export_request
+        if request is not None and request.per_client:
+            QMessageBox.information(
+                self,
+                "Done",
+                f"Reports exported successfully ({rows} incident(s)), one workbook per client in:\n{request.path}",
+            )
+            return
+        QMessageBox.information(self, "Done", f"Report exported successfully ({rows} incident(s)).")
+
+    def _on_export_failed(self, message: str) -> None:
+        QMessageBox.critical(self, "Export failed", message)
+
+    def _on_export_cancelled(self) -> None:
+        self._set_hint("Export cancelled. No file was written.")
+
+    def _on_export_thread_done(self) -> None:
+        self._export_thread = None
+        self._export_job = None
+
+        self.progress.setVisible(False)
+        self.cancel_btn.setVisible(False)
+        if (self.hint.text() or "").startswith("Exporting") or self.hint.text() == "Cancelling export...":
+            self._set_hint(self.DEFAULT_HINT)
+        self._apply_ui_state()
 
     def reload_clients(self) -> None:
         self._load_clients()
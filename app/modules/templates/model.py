@@ -1,61 +1,19 @@
 from __future__ import annotations
 
-from typing import List
-
-from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from typing import Any
 
 from app.repositories.document_templates_repo import TemplateRow
+from app.ui.keyed_table_model import KeyedTableModel
 
 
-class TemplatesTableModel(QAbstractTableModel):
+class TemplatesTableModel(KeyedTableModel[TemplateRow]):
     HEADERS = ["Client", "Template Key", "Version", "Active", "Created At"]
+    COLUMNS = ["company_client_name", "template_key", "version", "is_active", "created_at"]
 
-    def __init__(self) -> None:
-        super().__init__()
-        self._rows: List[TemplateRow] = []
-
-    def load(self, rows: List[TemplateRow]) -> None:
-        self.beginResetModel()
-        self._rows = rows
-        self.endResetModel()
-
-    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
-        return len(self._rows)
-
-    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
-        return len(self.HEADERS)
-
-    def data(self, index: QModelIndex, role: int = int(Qt.ItemDataRole.DisplayRole)):
-        if not index.isValid() or role != int(Qt.ItemDataRole.DisplayRole):
-            return None
-
-        r = index.row()
-        if r < 0 or r >= len(self._rows):
-            return None
-
-        row = self._rows[r]
-        col = index.column()
-
-        if col == 0:
-            return row["company_client_name"]
-        if col == 1:
-            return row["template_key"]
-        if col == 2:
-            return str(row["version"])
-        if col == 3:
-            return "Yes" if row["is_active"] else "No"
-        if col == 4:
-            return row["created_at"]
-
-        return None
-
-    def headerData(self, section: int, orientation: Qt.Orientation, role: int = int(Qt.ItemDataRole.DisplayRole)):
-        if role == int(Qt.ItemDataRole.DisplayRole) and orientation == Qt.Orientation.Horizontal:
-            if 0 <= section < len(self.HEADERS):
-                return self.HEADERS[section]
-        return None
+    def sort_key(self, row: TemplateRow, column: int, text: str) -> Any:
+        if column == 2:
+            return row["version"]
+        return super().sort_key(row, column, text)
 
     def template_id_at(self, row: int) -> str:
-        if row < 0 or row >= len(self._rows):
-            return ""
-        return self._rows[row]["id"]
\ No newline at end of file
+        return self.id_at(row)
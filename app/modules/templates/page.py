@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from PySide6.QtCore import QModelIndex, Qt
+from PySide6.QtCore import QModelIndex
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -14,20 +14,27 @@ from PySide6.QtWidgets import (
     QComboBox,
     QLabel,
     QFileDialog,
-    QCompleter,
 )
 
 from app.core.events import events
+from app.repositories.company_clients_repo import CompanyClientOption
+from app.repositories.incident_types_repo import IncidentTypeOption
 from app.repositories.document_templates_repo import (
     DocumentTemplatesRepo,
     TemplateRow,
 )
+from app.services.reference_data import reference_data
+from app.ui.background_loader import BackgroundLoader, loading_label
+from app.ui.indexed_filter_proxy import install_filter_proxy
+from app.ui.searchable_combo import setup_searchable_combo
 
 
 class TemplatesPage(QWidget):
     def __init__(self) -> None:
         super().__init__()
 
+        self.loader = BackgroundLoader(self)
+
         layout = QVBoxLayout(self)
 
         title = QLabel("Templates")
@@ -43,7 +50,7 @@ class TemplatesPage(QWidget):
         filter_row.addWidget(QLabel("Company client:"))
 
         self.client_filter = QComboBox()
-        self._setup_searchable_combo(self.client_filter)
+        setup_searchable_combo(self.client_filter)
         self.client_filter.currentIndexChanged.connect(self._on_filter_changed)
         filter_row.addWidget(self.client_filter)
 
@@ -53,7 +60,7 @@ class TemplatesPage(QWidget):
         form = QHBoxLayout()
 
         self.client_select = QComboBox()
-        self._setup_searchable_combo(self.client_select)
+        setup_searchable_combo(self.client_select)
         self.client_select.setMinimumWidth(280)
 
         self.template_type = QComboBox()
@@ -80,55 +87,41 @@ class TemplatesPage(QWidget):
         layout.addLayout(form)
 
         # ---- Table ----
+        layout.addWidget(loading_label(self.loader))
+        self.search_input = QLineEdit()
+        layout.addWidget(self.search_input)
         self.table = QTableView()
         self.model = self._build_model()
-        self.table.setModel(self.model)
+        self.proxy = install_filter_proxy(self.table, self.model, self.search_input)
         self.table.doubleClicked.connect(self._on_deactivate)
         layout.addWidget(self.table)
 
         self._selected_file: Optional[str] = None
 
         # ---- Subscribe to global events ----
-        events().company_clients_changed.connect(self._on_company_clients_changed)
-        events().templates_changed.connect(self._on_templates_changed)
+        events().subscribe("company_clients_changed", self._on_company_clients_changed, owner=self)
+        events().subscribe("templates_changed", self._on_templates_changed, owner=self)
+        events().subscribe("incident_types_changed", self.reload_types, owner=self)
 
         # ---- Initial load ----
         self._load_types()
         self._load_clients()
         self.refresh()
-        self._apply_ui_state()
 
     def _build_model(self):
         from app.modules.templates.model import TemplatesTableModel
         return TemplatesTableModel()
 
-    def _setup_searchable_combo(self, combo: QComboBox) -> None:
-        combo.setEditable(True)
-        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-
-        completer = QCompleter(combo.model(), combo)
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-        combo.setCompleter(completer)
-
-        # Typed text must match an item
-        def apply_text_to_selection() -> None:
-            text = combo.currentText().strip()
-            if not text:
-                combo.setCurrentIndex(-1)
-                return
-            idx = combo.findText(text, Qt.MatchFlag.MatchFixedString)
-            combo.setCurrentIndex(idx if idx >= 0 else -1)
-
-        completer.activated.connect(lambda _: apply_text_to_selection())
-        if combo.lineEdit():
-            combo.lineEdit().editingFinished.connect(apply_text_to_selection)
-
     def _set_hint(self, text: str) -> None:
         self.hint.setText(text or "")
 
     def _apply_ui_state(self) -> None:
+        if self.loader.is_loading("clients") or self.loader.is_loading("types"):
+            # Not known yet: don't flash "No clients found"
+            self.pick_btn.setEnabled(False)
+            self.upload_btn.setEnabled(False)
+            return
+
         has_clients = self.client_select.count() > 0
         has_types = self.template_type.count() > 0
 
@@ -144,18 +137,21 @@ class TemplatesPage(QWidget):
             self._set_hint("")
 
     def _load_clients(self) -> None:
-        try:
-            clients = DocumentTemplatesRepo.list_company_clients_options()
-        except Exception as e:
-            self.client_filter.blockSignals(True)
-            self.client_filter.clear()
-            self.client_filter.addItem("All", "")
-            self.client_filter.blockSignals(False)
-
-            self.client_select.clear()
-            self._set_hint(f"Could not load clients: {e}")
-            self._apply_ui_state()
-            return
+        self.loader.load("clients", reference_data().company_clients, self._apply_clients, self._on_clients_failed)
+        self._apply_ui_state()
+
+    def _on_clients_failed(self, e: Exception) -> None:
+        self.client_filter.blockSignals(True)
+        self.client_filter.clear()
+        self.client_filter.addItem("All", "")
+        self.client_filter.blockSignals(False)
+
+        self.client_select.clear()
+        self._apply_ui_state()
+        self._set_hint(f"Could not load clients: {e}")
+
+    def _apply_clients(self, clients: List[CompanyClientOption]) -> None:
+        filter_before = self._selected_filter_client_id()
 
         # Filter combo defaults to All
         self.client_filter.blockSignals(True)
@@ -175,20 +171,30 @@ class TemplatesPage(QWidget):
 
         self._apply_client_lock()
         self._apply_ui_state()
+        if self._selected_filter_client_id() != filter_before:
+            # Filter went back to "All" while rows for the old one were loading
+            self.refresh()
 
     def _load_types(self) -> None:
-        try:
-            types_ = DocumentTemplatesRepo.list_incident_types_options()
-        except Exception as e:
-            self.template_type.clear()
-            self._set_hint(f"Could not load incident types: {e}")
-            self._apply_ui_state()
-            return
+        self.loader.load("types", reference_data().incident_types, self._apply_types, self._on_types_failed)
+        self._apply_ui_state()
+
+    def _on_types_failed(self, e: Exception) -> None:
+        self.template_type.clear()
+        self._apply_ui_state()
+        self._set_hint(f"Could not load incident types: {e}")
+
+    def _apply_types(self, types_: List[IncidentTypeOption]) -> None:
+        selected = self.template_type.currentData()
 
         self.template_type.clear()
         for t in types_:
             label = f"{t['name']} ({t['code']})"
             self.template_type.addItem(label, t["code"])
+        if selected is not None:
+            idx = self.template_type.findData(selected)
+            if idx >= 0:
+                self.template_type.setCurrentIndex(idx)
 
         self._apply_ui_state()
 
@@ -196,11 +202,14 @@ class TemplatesPage(QWidget):
         self._apply_client_lock()
         self.refresh()
 
-    def _apply_client_lock(self) -> None:
+    def _selected_filter_client_id(self) -> str:
         selected = self.client_filter.currentData()
-        selected_id = selected if isinstance(selected, str) else ""
+        return selected.strip() if isinstance(selected, str) else ""
+
+    def _apply_client_lock(self) -> None:
+        selected_id = self._selected_filter_client_id()
 
-        if selected_id.strip():
+        if selected_id:
             self._set_combo_by_data(self.client_select, selected_id)
             self.client_select.setEnabled(False)
         else:
@@ -215,20 +224,20 @@ class TemplatesPage(QWidget):
         combo.setCurrentIndex(-1)
 
     def refresh(self) -> None:
-        selected_client_id = self.client_filter.currentData()
-        if not isinstance(selected_client_id, str):
-            selected_client_id = ""
+        selected_client_id = self._selected_filter_client_id()
+        self.loader.load(
+            "rows",
+            lambda: DocumentTemplatesRepo.list_templates(company_client_id=selected_client_id or None),
+            self._apply_rows,
+            self._on_rows_failed,
+        )
 
-        try:
-            rows: List[TemplateRow] = DocumentTemplatesRepo.list_templates(
-                company_client_id=selected_client_id or None
-            )
-        except Exception as e:
-            self.model.load([])
-            self._set_hint(f"Could not load templates: {e}")
-            return
+    def _apply_rows(self, rows: List[TemplateRow]) -> None:
+        self.model.sync(rows)
 
-        self.model.load(rows)
+    def _on_rows_failed(self, e: Exception) -> None:
+        self.model.load([])
+        self._set_hint(f"Could not load templates: {e}")
 
     def _pick_file(self) -> None:
         path, _ = QFileDialog.getOpenFileName(
@@ -276,11 +285,12 @@ class TemplatesPage(QWidget):
 
         self.upload_btn.setEnabled(False)
         try:
-            DocumentTemplatesRepo.create_template(
-                company_client_id=company_client_id,
-                template_key=template_key,
-                local_file_path=self._selected_file,
-            )
+            with events().applied_locally(self):
+                row = DocumentTemplatesRepo.create_template(
+                    company_client_id=company_client_id,
+                    template_key=template_key,
+                    local_file_path=self._selected_file,
+                )
         except Exception as e:
             msg = str(e)
             if "row-level security" in msg.lower() or "42501" in msg:
@@ -297,12 +307,22 @@ class TemplatesPage(QWidget):
         self._selected_file = None
         self.file_path_input.clear()
 
-        events().templates_changed.emit()
-        self.refresh()
+        # The new version supersedes the previously active one (kept in place, marked inactive)
+        self.model.upsert(
+            {**r, "is_active": False}
+            for r in self.model.rows()
+            if r["is_active"]
+            and r["company_client_id"] == row["company_client_id"]
+            and r["template_key"] == row["template_key"]
+        )
+        filter_client_id = self.client_filter.currentData()
+        if not isinstance(filter_client_id, str) or not filter_client_id or filter_client_id == row["company_client_id"]:
+            self.model.upsert([row])
+        self.loader.reload_if_pending("rows")
         self._apply_ui_state()
 
     def _on_deactivate(self, index: QModelIndex) -> None:
-        row = index.row()
+        row = self.proxy.source_row(index.row())
         template_id = self.model.template_id_at(row)
         if not template_id:
             return
@@ -312,20 +332,20 @@ class TemplatesPage(QWidget):
             return
 
         try:
-            DocumentTemplatesRepo.deactivate(template_id)
+            with events().applied_locally(self):
+                DocumentTemplatesRepo.deactivate(template_id)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
             return
 
-        events().templates_changed.emit()
-        self.refresh()
+        self.model.upsert([{**self.model.row_at(row), "is_active": False}])
+        self.loader.reload_if_pending("rows")
 
     # ---- Event handlers ----
     def _on_company_clients_changed(self) -> None:
         # New client added elsewhere -> reload combos + lock + UI state + refresh table
         self._load_clients()
         self.refresh()
-        self._apply_ui_state()
 
     def _on_templates_changed(self) -> None:
         self.refresh()
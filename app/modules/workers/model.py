@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import List, TypedDict
+from typing import TypedDict
 
-from PySide6.QtCore import QAbstractTableModel, QModelIndex, QPersistentModelIndex, Qt
+from app.ui.keyed_table_model import KeyedTableModel
 
 
 class WorkerRow(TypedDict):
@@ -14,52 +14,9 @@ class WorkerRow(TypedDict):
     created_at: str
 
 
-class WorkersTableModel(QAbstractTableModel):
+class WorkersTableModel(KeyedTableModel[WorkerRow]):
     HEADERS = ["Worker", "National ID", "Company Client", "Created At"]
-
-    def __init__(self) -> None:
-        super().__init__()
-        self._rows: List[WorkerRow] = []
-
-    def load(self, rows: List[WorkerRow]) -> None:
-        self.beginResetModel()
-        self._rows = list(rows)
-        self.endResetModel()
-
-    def rowCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
-        return len(self._rows)
-
-    def columnCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
-        return len(self.HEADERS)
-
-    def data(self, index: QModelIndex | QPersistentModelIndex, role: int = int(Qt.ItemDataRole.DisplayRole)):
-        if not index.isValid() or role != int(Qt.ItemDataRole.DisplayRole):
-            return None
-
-        r = int(index.row())
-        if r < 0 or r >= len(self._rows):
-            return None
-
-        row = self._rows[r]
-        col = int(index.column())
-
-        if col == 0:
-            return row["full_name"]
-        if col == 1:
-            return row["national_id"]
-        if col == 2:
-            return row["company_client_name"]
-        if col == 3:
-            return row["created_at"]
-        return None
-
-    def headerData(self, section: int, orientation: Qt.Orientation, role: int = int(Qt.ItemDataRole.DisplayRole)):
-        if role == int(Qt.ItemDataRole.DisplayRole) and orientation == Qt.Orientation.Horizontal:
-            if 0 <= int(section) < len(self.HEADERS):
-                return self.HEADERS[int(section)]
-        return None
+    COLUMNS = ["full_name", "national_id", "company_client_name", "created_at"]
 
     def worker_id_at(self, row: int) -> str:
-        if row < 0 or row >= len(self._rows):
-            return ""
-        return self._rows[row]["id"]
\ No newline at end of file
+        return self.id_at(row)
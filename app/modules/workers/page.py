@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from PySide6.QtCore import QModelIndex, Qt
+from PySide6.QtCore import QModelIndex
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -13,18 +13,24 @@ from PySide6.QtWidgets import (
     QMessageBox,
     QComboBox,
     QLabel,
-    QCompleter,
 )
 
 from app.core.events import events
+from app.repositories.company_clients_repo import CompanyClientOption
 from app.repositories.workers_repo import WorkersRepo
+from app.services.reference_data import reference_data
 from app.modules.workers.model import WorkersTableModel, WorkerRow
+from app.ui.background_loader import BackgroundLoader, loading_label
+from app.ui.indexed_filter_proxy import install_filter_proxy
+from app.ui.searchable_combo import setup_searchable_combo
 
 
 class WorkersPage(QWidget):
     def __init__(self) -> None:
         super().__init__()
 
+        self.loader = BackgroundLoader(self)
+
         layout = QVBoxLayout(self)
 
         title = QLabel("Workers")
@@ -40,7 +46,7 @@ class WorkersPage(QWidget):
         filter_row.addWidget(QLabel("Company client:"))
 
         self.client_filter = QComboBox()
-        self._setup_searchable_combo(self.client_filter)
+        setup_searchable_combo(self.client_filter)
         self.client_filter.currentIndexChanged.connect(self._on_filter_changed)
         filter_row.addWidget(self.client_filter)
 
@@ -51,7 +57,7 @@ class WorkersPage(QWidget):
 
         self.client_select = QComboBox()
         self.client_select.setMinimumWidth(240)
-        self._setup_searchable_combo(self.client_select)
+        setup_searchable_combo(self.client_select)
 
         self.full_name_input = QLineEdit()
         self.full_name_input.setPlaceholderText("Worker full name")
@@ -70,26 +76,34 @@ class WorkersPage(QWidget):
         layout.addLayout(form)
 
         # ---- Table ----
+        layout.addWidget(loading_label(self.loader))
+        self.search_input = QLineEdit()
+        layout.addWidget(self.search_input)
         self.table = QTableView()
         self.model = WorkersTableModel()
-        self.table.setModel(self.model)
+        self.proxy = install_filter_proxy(self.table, self.model, self.search_input)
         self.table.doubleClicked.connect(self._on_deactivate)
         layout.addWidget(self.table)
 
         # ---- Subscribe to global events ----
-        events().company_clients_changed.connect(self._on_company_clients_changed)
-        events().workers_changed.connect(self._on_workers_changed)
+        events().subscribe("company_clients_changed", self._on_company_clients_changed, owner=self)
+        events().subscribe("workers_changed", self._on_workers_changed, owner=self)
 
         # ---- Initial load ----
         self._load_clients()
-        self._apply_filter_to_form()
         self.refresh()
-        self._apply_ui_state()
 
     def _set_hint(self, text: str) -> None:
         self.hint.setText(text or "")
 
     def _apply_ui_state(self) -> None:
+        if self.loader.is_loading("clients"):
+            # Not known yet: don't flash "No clients found"
+            self.full_name_input.setEnabled(False)
+            self.national_id_input.setEnabled(False)
+            self.save_btn.setEnabled(False)
+            return
+
         has_clients = self.client_select.count() > 0
 
         # Enable/disable form controls based on whether clients exist
@@ -105,42 +119,22 @@ class WorkersPage(QWidget):
         else:
             self._set_hint("")
 
-    def _setup_searchable_combo(self, combo: QComboBox) -> None:
-        combo.setEditable(True)
-        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-
-        completer = QCompleter(combo.model(), combo)
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-        combo.setCompleter(completer)
-
-        # Typed text must match an item
-        def apply_text_to_selection() -> None:
-            text = combo.currentText().strip()
-            if not text:
-                combo.setCurrentIndex(-1)
-                return
-            idx = combo.findText(text, Qt.MatchFlag.MatchFixedString)
-            combo.setCurrentIndex(idx if idx >= 0 else -1)
-
-        completer.activated.connect(lambda _: apply_text_to_selection())
-        if combo.lineEdit():
-            combo.lineEdit().editingFinished.connect(apply_text_to_selection)
-
     def _load_clients(self) -> None:
-        try:
-            clients = WorkersRepo.list_company_clients_options()
-        except Exception as e:
-            self.client_filter.blockSignals(True)
-            self.client_filter.clear()
-            self.client_filter.addItem("All", "")
-            self.client_filter.blockSignals(False)
-
-            self.client_select.clear()
-            self._set_hint(f"Could not load clients: {e}")
-            self._apply_ui_state()
-            return
+        self.loader.load("clients", reference_data().company_clients, self._apply_clients, self._on_clients_failed)
+        self._apply_ui_state()
+
+    def _on_clients_failed(self, e: Exception) -> None:
+        self.client_filter.blockSignals(True)
+        self.client_filter.clear()
+        self.client_filter.addItem("All", "")
+        self.client_filter.blockSignals(False)
+
+        self.client_select.clear()
+        self._apply_ui_state()
+        self._set_hint(f"Could not load clients: {e}")
+
+    def _apply_clients(self, clients: List[CompanyClientOption]) -> None:
+        filter_before = self._selected_filter_client_id()
 
         # Filter combo (includes "All")
         self.client_filter.blockSignals(True)
@@ -161,6 +155,9 @@ class WorkersPage(QWidget):
 
         self._apply_filter_to_form()
         self._apply_ui_state()
+        if self._selected_filter_client_id() != filter_before:
+            # Filter went back to "All" while rows for the old one were loading
+            self.refresh()
 
     def _on_filter_changed(self) -> None:
         self._apply_filter_to_form()
@@ -193,17 +190,19 @@ class WorkersPage(QWidget):
 
     def refresh(self) -> None:
         selected_client_id = self._selected_filter_client_id()
+        self.loader.load(
+            "rows",
+            lambda: WorkersRepo.list_active(company_client_id=selected_client_id or None),
+            self._apply_rows,
+            self._on_rows_failed,
+        )
 
-        try:
-            rows: List[WorkerRow] = WorkersRepo.list_active(
-                company_client_id=selected_client_id or None
-            )
-        except Exception as e:
-            self.model.load([])
-            self._set_hint(f"Could not load workers: {e}")
-            return
+    def _apply_rows(self, rows: List[WorkerRow]) -> None:
+        self.model.sync(rows)
 
-        self.model.load(rows)
+    def _on_rows_failed(self, e: Exception) -> None:
+        self.model.load([])
+        self._set_hint(f"Could not load workers: {e}")
 
     def _on_add(self) -> None:
         if self.client_select.count() == 0:
@@ -228,11 +227,12 @@ class WorkersPage(QWidget):
 
         self.save_btn.setEnabled(False)
         try:
-            WorkersRepo.create(
-                company_client_id=company_client_id,
-                full_name=full_name,
-                national_id=national_id,
-            )
+            with events().applied_locally(self):
+                row = WorkersRepo.create(
+                    company_client_id=company_client_id,
+                    full_name=full_name,
+                    national_id=national_id,
+                )
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
             return
@@ -242,11 +242,13 @@ class WorkersPage(QWidget):
         self.full_name_input.clear()
         self.national_id_input.clear()
 
-        events().workers_changed.emit()
-        self.refresh()
+        filter_client_id = self._selected_filter_client_id()
+        if not filter_client_id or filter_client_id == row["company_client_id"]:
+            self.model.upsert([row])
+        self.loader.reload_if_pending("rows")
 
     def _on_deactivate(self, index: QModelIndex) -> None:
-        row = index.row()
+        row = self.proxy.source_row(index.row())
         worker_id = self.model.worker_id_at(row)
         if not worker_id:
             return
@@ -256,25 +258,24 @@ class WorkersPage(QWidget):
             return
 
         try:
-            WorkersRepo.deactivate(worker_id)
+            with events().applied_locally(self):
+                WorkersRepo.deactivate(worker_id)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
             return
 
-        events().workers_changed.emit()
-        self.refresh()
+        self.model.remove([worker_id])
+        self.loader.reload_if_pending("rows")
 
     # ---- Event handlers ----
     def _on_company_clients_changed(self) -> None:
         # Client created elsewhere -> reload combos and update hint/buttons
         self._load_clients()
         self.refresh()
-        self._apply_ui_state()
 
     def _on_workers_changed(self) -> None:
         self.refresh()
 
     # Optional explicit calls
     def reload_clients(self) -> None:
-        self._load_clients()
-        self._apply_filter_to_form()
\ No newline at end of file
+        self._load_clients()
\ No newline at end of file
@@ -2,6 +2,9 @@ from __future__ import annotations
 
 from typing import TypedDict, Any, List, cast
 
+from app.db.coalescing import coalesced
+from app.db.instrumentation import tracked
+from app.db.local_mirror import local_mirror, mirror_after_write
 from app.db.supabase_client import get_supabase
 from app.core.session import AppSession
 from app.core.events import events
@@ -15,9 +18,70 @@ class CompanyClientRow(TypedDict):
     created_at: str
 
 
+class CompanyClientOption(TypedDict):
+    id: str
+    name: str
+
+
+def _to_client_row(r: dict[str, Any]) -> CompanyClientRow:
+    return {
+        "id": str(r.get("id", "") or ""),
+        "name": str(r.get("name", "") or ""),
+        "legal_id": str(r.get("legal_id", "") or ""),
+        "description": r.get("description"),
+        "created_at": str(r.get("created_at", "") or ""),
+    }
+
+
 class CompanyClientsRepo:
     @staticmethod
+    @tracked
+    @coalesced
+    def list_options() -> List[CompanyClientOption]:
+        """Active clients as (id, name), ordered by name. Read through reference_data()."""
+        m = local_mirror(("company_clients",))
+        if m is not None:
+            rows = m.query(
+                "select id, name from company_clients where firm_id = ? and is_active = 1 order by name",
+                (m.firm_id,),
+            )
+            return [{"id": r["id"], "name": r["name"]} for r in rows]
+
+        sb = get_supabase()
+        firm_id: str = AppSession.require().firm_id
+
+        resp = (
+            sb.table("company_clients")
+            .select("id, name")
+            .eq("firm_id", firm_id)
+            .eq("is_active", True)
+            .order("name")
+            .execute()
+        )
+
+        if getattr(resp, "error", None):
+            raise RuntimeError(f"Failed to load clients: {resp.error}")
+
+        data = resp.data or []
+        out: List[CompanyClientOption] = []
+        for r in data:
+            if isinstance(r, dict):
+                out.append({"id": str(r.get("id", "")), "name": str(r.get("name", ""))})
+        return out
+
+    @staticmethod
+    @tracked
+    @coalesced
     def list_active() -> List[CompanyClientRow]:
+        m = local_mirror(("company_clients",))
+        if m is not None:
+            rows = m.query(
+                "select id, name, legal_id, description, created_at from company_clients "
+                "where firm_id = ? and is_active = 1 order by created_at desc",
+                (m.firm_id,),
+            )
+            return cast(List[CompanyClientRow], [dict(r) for r in rows])
+
         sb = get_supabase()
         firm_id: str = AppSession.require().firm_id
 
@@ -40,7 +104,8 @@ class CompanyClientsRepo:
         return cast(List[CompanyClientRow], data)
 
     @staticmethod
-    def create(name: str, legal_id: str, description: str | None) -> None:
+    @tracked
+    def create(name: str, legal_id: str, description: str | None) -> CompanyClientRow:
         sb = get_supabase()
         firm_id: str = AppSession.require().firm_id
 
@@ -56,9 +121,16 @@ class CompanyClientsRepo:
         if getattr(resp, "error", None):
             raise RuntimeError(f"Failed to create client: {resp.error}")
 
-        events().company_clients_changed.emit()
+        data = resp.data or []
+        if not data or not isinstance(data[0], dict):
+            raise RuntimeError("Unexpected response while creating client.")
+
+        mirror_after_write("company_clients", data)
+        events().notify("company_clients_changed")
+        return _to_client_row(data[0])
 
     @staticmethod
+    @tracked
     def deactivate(client_id: str) -> None:
         sb = get_supabase()
         firm_id: str = AppSession.require().firm_id
@@ -74,4 +146,5 @@ class CompanyClientsRepo:
         if getattr(resp, "error", None):
             raise RuntimeError(f"Failed to deactivate client: {resp.error}")
 
-        events().company_clients_changed.emit()
\ No newline at end of file
+        mirror_after_write("company_clients", resp.data)
+        events().notify("company_clients_changed")
\ No newline at end of file
@@ -4,21 +4,13 @@ import os
 from typing import Any, Dict, List, Optional, TypedDict
 
 from app.core.session import AppSession
+from app.db.coalescing import coalesced
+from app.db.instrumentation import tracked
+from app.db.local_mirror import local_mirror, mirror_after_write
 from app.db.supabase_client import get_supabase
 from app.core.events import events
 
 
-class CompanyClientOption(TypedDict):
-    id: str
-    name: str
-
-
-class IncidentTypeOption(TypedDict):
-    id: int
-    code: str
-    name: str
-
-
 class TemplateRow(TypedDict):
     id: str
     company_client_id: str
@@ -30,6 +22,24 @@ class TemplateRow(TypedDict):
     created_at: str
 
 
+def _to_template_row(r: Dict[str, Any]) -> TemplateRow:
+    embedded = r.get("company_clients")
+    client_name = ""
+    if isinstance(embedded, dict):
+        client_name = str(embedded.get("name", ""))
+
+    return {
+        "id": str(r.get("id", "")),
+        "company_client_id": str(r.get("company_client_id", "")),
+        "company_client_name": client_name,
+        "template_key": str(r.get("template_key", "")),
+        "version": int(r.get("version", 0) or 0),
+        "storage_path": str(r.get("storage_path", "")),
+        "is_active": bool(r.get("is_active", False)),
+        "created_at": str(r.get("created_at", "")),
+    }
+
+
 class DocumentTemplatesRepo:
     @staticmethod
     def _bucket_name() -> str:
@@ -39,52 +49,37 @@ class DocumentTemplatesRepo:
         return bucket
 
     @staticmethod
-    def list_company_clients_options() -> List[CompanyClientOption]:
-        sb = get_supabase()
-        firm_id = AppSession.require().firm_id
-
-        resp = (
-            sb.table("company_clients")
-            .select("id, name")
-            .eq("firm_id", firm_id)
-            .eq("is_active", True)
-            .order("name")
-            .execute()
-        )
-
-        data = resp.data or []
-        out: List[CompanyClientOption] = []
-        for r in data:
-            if isinstance(r, dict):
-                out.append({"id": str(r.get("id", "")), "name": str(r.get("name", ""))})
-        return out
-
-    @staticmethod
-    def list_incident_types_options() -> List[IncidentTypeOption]:
-        sb = get_supabase()
-
-        resp = (
-            sb.table("incident_types")
-            .select("id, code, name")
-            .order("id")
-            .execute()
-        )
-
-        data = resp.data or []
-        out: List[IncidentTypeOption] = []
-        for r in data:
-            if isinstance(r, dict):
-                out.append(
-                    {
-                        "id": int(r.get("id", 0) or 0),
-                        "code": str(r.get("code", "")),
-                        "name": str(r.get("name", "")),
-                    }
-                )
-        return out
-
-    @staticmethod
+    @tracked
+    @coalesced
     def list_templates(company_client_id: Optional[str] = None) -> List[TemplateRow]:
+        m = local_mirror(("document_templates", "company_clients"))
+        if m is not None:
+            # Same rows as the remote query below: whatever the select policy lets the mirror sync
+            sql = (
+                "select t.id, t.company_client_id, coalesce(c.name, '') as company_client_name, t.template_key, "
+                "t.version, t.storage_path, t.is_active, t.created_at "
+                "from document_templates t left join company_clients c on c.id = t.company_client_id "
+                "where t.firm_id = ?"
+            )
+            params: List[Any] = [m.firm_id]
+            if company_client_id:
+                sql += " and t.company_client_id = ?"
+                params.append(company_client_id)
+            sql += " order by t.created_at desc"
+            return [
+                {
+                    "id": r["id"],
+                    "company_client_id": r["company_client_id"],
+                    "company_client_name": r["company_client_name"],
+                    "template_key": r["template_key"],
+                    "version": int(r["version"]),
+                    "storage_path": r["storage_path"],
+                    "is_active": bool(r["is_active"]),
+                    "created_at": r["created_at"],
+                }
+                for r in m.query(sql, params)
+            ]
+
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -103,32 +98,10 @@ class DocumentTemplatesRepo:
         resp = query.execute()
         data = resp.data or []
 
-        out: List[TemplateRow] = []
-        for r in data:
-            if not isinstance(r, dict):
-                continue
-
-            embedded = r.get("company_clients")
-            client_name = ""
-            if isinstance(embedded, dict):
-                client_name = str(embedded.get("name", ""))
-
-            out.append(
-                {
-                    "id": str(r.get("id", "")),
-                    "company_client_id": str(r.get("company_client_id", "")),
-                    "company_client_name": client_name,
-                    "template_key": str(r.get("template_key", "")),
-                    "version": int(r.get("version", 0) or 0),
-                    "storage_path": str(r.get("storage_path", "")),
-                    "is_active": bool(r.get("is_active", False)),
-                    "created_at": str(r.get("created_at", "")),
-                }
-            )
-
-        return out
+        return [_to_template_row(r) for r in data if isinstance(r, dict)]
 
     @staticmethod
+    @tracked
     def _get_next_version(company_client_id: str, template_key: str) -> int:
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
@@ -156,6 +129,7 @@ class DocumentTemplatesRepo:
         return f"templates/{firm_id}/{company_client_id}/{template_key}/v{version}.docx"
 
     @staticmethod
+    @tracked
     def _upload_docx_to_storage(storage_path: str, local_file_path: str) -> None:
         sb = get_supabase()
         bucket = DocumentTemplatesRepo._bucket_name()
@@ -184,7 +158,9 @@ class DocumentTemplatesRepo:
         )
 
     @staticmethod
-    def create_template(company_client_id: str, template_key: str, local_file_path: str) -> None:
+    @tracked
+    def create_template(company_client_id: str, template_key: str, local_file_path: str) -> TemplateRow:
+        """Uploads a new version, makes it the active one and returns its row."""
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -195,11 +171,12 @@ class DocumentTemplatesRepo:
         DocumentTemplatesRepo._upload_docx_to_storage(storage_path, local_file_path)
 
         # 2) Deactivate previous active
-        sb.table("document_templates").update(
+        previous = sb.table("document_templates").update(
             {"is_active": False}
         ).eq("firm_id", firm_id).eq("company_client_id", company_client_id).eq(
             "template_key", template_key
         ).eq("is_active", True).execute()
+        mirror_after_write("document_templates", previous.data)
 
         # 3) Insert the new active template row
         payload: Dict[str, Any] = {
@@ -211,17 +188,24 @@ class DocumentTemplatesRepo:
             "is_active": True,
         }
 
-        sb.table("document_templates").insert(payload).execute()
-        
-        events().templates_changed.emit()
+        resp = sb.table("document_templates").insert(payload).select("*, company_clients(name)").execute()
+        data = resp.data or []
+        if not data or not isinstance(data[0], dict):
+            raise RuntimeError("Unexpected response while creating template.")
+
+        mirror_after_write("document_templates", data)
+        events().notify("templates_changed")
+        return _to_template_row(data[0])
 
     @staticmethod
+    @tracked
     def deactivate(template_id: str) -> None:
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
-        sb.table("document_templates").update(
+        resp = sb.table("document_templates").update(
             {"is_active": False}
         ).eq("id", template_id).eq("firm_id", firm_id).execute()
-        
-        events().templates_changed.emit()
\ No newline at end of file
+
+        mirror_after_write("document_templates", resp.data)
+        events().notify("templates_changed")
\ No newline at end of file
@@ -3,38 +3,60 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
 from typing import Any, List, Optional, TypedDict
 
+from app.core.interning import IncidentRefs, IncidentTypeInfo, WorkerInfo
 from app.core.session import AppSession
+from app.db.coalescing import coalesced
+from app.db.instrumentation import tracked
+from app.db.local_mirror import LocalMirror, local_mirror
 from app.db.supabase_client import get_supabase
 
 
 TEMPLATES_BUCKET = os.getenv("SUPABASE_TEMPLATES_BUCKET", "templates")
 
 
-class CompanyClientOption(TypedDict):
-    id: str
-    name: str
-
-
 class ActiveTemplate(TypedDict):
     storage_path: str
     version: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IncidentForDoc:
+    """Worker / type are shared per fetch (see IncidentRefs)."""
+
     id: str
     code: str
     incident_date: date
     received_day: Optional[date]
     observations: str
-    incident_type_code: str
-    incident_type_name: str
-    worker_full_name: str
-    worker_national_id: str
-    company_client_id: str
-    company_client_name: str
+    incident_type: IncidentTypeInfo
+    worker: WorkerInfo
+
+    @property
+    def incident_type_code(self) -> str:
+        return self.incident_type.code
+
+    @property
+    def incident_type_name(self) -> str:
+        return self.incident_type.name
+
+    @property
+    def worker_full_name(self) -> str:
+        return self.worker.full_name
+
+    @property
+    def worker_national_id(self) -> str:
+        return self.worker.national_id
+
+    @property
+    def company_client_id(self) -> str:
+        return self.worker.company_client_id
+
+    @property
+    def company_client_name(self) -> str:
+        return self.worker.company_client_name
 
 
 def _parse_iso_date(value: Any) -> Optional[date]:
@@ -43,45 +65,33 @@ def _parse_iso_date(value: Any) -> Optional[date]:
     if isinstance(value, date):
         return value
     if isinstance(value, str):
-        s = value.strip()
-        if not s:
-            return None
-        y, m, d = s.split("-")
-        return date(int(y), int(m), int(d))
+        return _parse_iso_date_str(value)
     return None
 
 
-class GenerateDocumentsRepo:
-    @staticmethod
-    def list_company_clients_options() -> List[CompanyClientOption]:
-        sb = get_supabase()
-        firm_id = AppSession.require().firm_id
-
-        resp = (
-            sb.table("company_clients")
-            .select("id, name")
-            .eq("firm_id", firm_id)
-            .eq("is_active", True)
-            .order("name")
-            .execute()
-        )
-
-        data = resp.data or []
-        out: List[CompanyClientOption] = []
-
-        for r in data:
-            if isinstance(r, dict):
-                out.append({"id": str(r.get("id", "")), "name": str(r.get("name", ""))})
+@lru_cache(maxsize=8192)
+def _parse_iso_date_str(value: str) -> Optional[date]:
+    s = value.strip()
+    if not s:
+        return None
+    y, m, d = s.split("-")
+    return date(int(y), int(m), int(d))
 
-        return out
 
+class GenerateDocumentsRepo:
     @staticmethod
+    @tracked
+    @coalesced
     def list_incidents_for_generation(
         *,
         date_from: date,
         date_to: date,
         company_client_id: Optional[str],
     ) -> List[IncidentForDoc]:
+        m = local_mirror(("incidents", "workers", "company_clients", "incident_types"))
+        if m is not None:
+            return GenerateDocumentsRepo._list_incidents_local(m, date_from, date_to, company_client_id)
+
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -89,8 +99,8 @@ class GenerateDocumentsRepo:
             sb.table("incidents")
             .select(
                 "id, code, incident_date, received_day, observations, "
-                "worker:workers(full_name, national_id, company_client_id, company_client:company_clients(name)), "
-                "type:incident_types(code, name)"
+                "worker:workers(id, full_name, national_id, company_client_id, company_client:company_clients(name)), "
+                "type:incident_types(id, code, name)"
             )
             .eq("firm_id", firm_id)
             .gte("incident_date", str(date_from))
@@ -101,22 +111,18 @@ class GenerateDocumentsRepo:
 
         data = resp.data or []
         out: List[IncidentForDoc] = []
+        refs = IncidentRefs()
 
         for r in data:
             if not isinstance(r, dict):
                 continue
 
-            worker = r.get("worker")
-            itype = r.get("type")
-            if not isinstance(worker, dict) or not isinstance(itype, dict):
+            worker = refs.worker_json(r.get("worker"))
+            itype = refs.incident_type_json(r.get("type"))
+            if worker is None or itype is None:
                 continue
 
-            cc = worker.get("company_client")
-            if not isinstance(cc, dict):
-                continue
-
-            cc_id = str(worker.get("company_client_id", ""))
-            if company_client_id and cc_id != company_client_id:
+            if company_client_id and worker.company_client_id != company_client_id:
                 continue
 
             inc_date = _parse_iso_date(r.get("incident_date"))
@@ -135,23 +141,76 @@ class GenerateDocumentsRepo:
                     incident_date=inc_date,
                     received_day=rec_day,
                     observations=obs_text,
-                    incident_type_code=str(itype.get("code", "")),
-                    incident_type_name=str(itype.get("name", "")),
-                    worker_full_name=str(worker.get("full_name", "")),
-                    worker_national_id=str(worker.get("national_id", "")),
-                    company_client_id=cc_id,
-                    company_client_name=str(cc.get("name", "")),
+                    incident_type=itype,
+                    worker=worker,
                 )
             )
 
         return out
 
     @staticmethod
+    def _list_incidents_local(
+        m: LocalMirror,
+        date_from: date,
+        date_to: date,
+        company_client_id: Optional[str],
+    ) -> List[IncidentForDoc]:
+        sql = (
+            "select i.id, coalesce(i.code, '') as code, i.incident_date, i.received_day, "
+            "coalesce(i.observations, '') as observations, i.incident_type_id, t.code as type_code, "
+            "t.name as type_name, i.worker_id, w.full_name, w.national_id, w.company_client_id, c.name as client_name "
+            "from incidents i "
+            "join workers w on w.id = i.worker_id "
+            "join company_clients c on c.id = w.company_client_id "
+            "join incident_types t on t.id = i.incident_type_id "
+            "where i.firm_id = ? and i.incident_date between ? and ?"
+        )
+        params: List[Any] = [m.firm_id, str(date_from), str(date_to)]
+        if company_client_id:
+            sql += " and w.company_client_id = ?"
+            params.append(company_client_id)
+        sql += " order by i.incident_date"
+
+        out: List[IncidentForDoc] = []
+        refs = IncidentRefs()
+        for r in m.query(sql, params):
+            inc_date = _parse_iso_date(r["incident_date"])
+            if not inc_date:
+                continue
+            out.append(
+                IncidentForDoc(
+                    id=r["id"],
+                    code=r["code"],
+                    incident_date=inc_date,
+                    received_day=_parse_iso_date(r["received_day"]),
+                    observations=r["observations"],
+                    incident_type=refs.incident_type(r["incident_type_id"], r["type_code"], r["type_name"]),
+                    worker=refs.worker(
+                        r["worker_id"], r["full_name"], r["national_id"], r["company_client_id"], r["client_name"]
+                    ),
+                )
+            )
+        return out
+
+    @staticmethod
+    @tracked
+    @coalesced
     def get_active_template(
         *,
         company_client_id: str,
         template_key: str,
     ) -> Optional[ActiveTemplate]:
+        m = local_mirror(("document_templates",))
+        if m is not None:
+            found = m.query(
+                "select storage_path, version from document_templates where firm_id = ? and company_client_id = ? "
+                "and template_key = ? and is_active = 1 order by version desc limit 1",
+                (m.firm_id, company_client_id, template_key),
+            )
+            if not found or not found[0]["storage_path"] or int(found[0]["version"]) <= 0:
+                return None
+            return {"storage_path": found[0]["storage_path"], "version": int(found[0]["version"])}
+
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -180,6 +239,7 @@ class GenerateDocumentsRepo:
         return {"storage_path": storage_path, "version": version}
 
     @staticmethod
+    @tracked
     def download_template_bytes(storage_path: str) -> bytes:
         sb = get_supabase()
         return sb.storage.from_(TEMPLATES_BUCKET).download(storage_path)
\ No newline at end of file
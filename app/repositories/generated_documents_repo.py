@@ -3,17 +3,32 @@ from __future__ import annotations
 from typing import Any, Dict
 
 from app.core.session import AppSession
+from app.db.coalescing import coalesced
+from app.db.instrumentation import tracked
+from app.db.local_mirror import local_mirror, mirror_after_write
 from app.db.supabase_client import get_supabase
 
 
 class GeneratedDocumentsRepo:
     @staticmethod
+    @tracked
+    @coalesced
     def exists_for_incident(
         *,
         incident_id: str,
         template_key: str,
         template_version: int,
     ) -> bool:
+        m = local_mirror(("generated_documents",))
+        if m is not None:
+            return bool(
+                m.query(
+                    "select 1 from generated_documents where firm_id = ? and incident_id = ? "
+                    "and template_key = ? and template_version = ? limit 1",
+                    (m.firm_id, incident_id, template_key, template_version),
+                )
+            )
+
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -32,6 +47,7 @@ class GeneratedDocumentsRepo:
         return bool(rows)
 
     @staticmethod
+    @tracked
     def create(
         *,
         company_client_id: str,
@@ -54,4 +70,7 @@ class GeneratedDocumentsRepo:
             # "generated_by": AppSession.require().user_id,
         }
 
-        sb.table("generated_documents").insert(payload).execute()
\ No newline at end of file
+        resp = sb.table("generated_documents").insert(payload).execute()
+
+        # Keeps exists_for_incident() correct without a sync per generated document
+        mirror_after_write("generated_documents", resp.data)
\ No newline at end of file
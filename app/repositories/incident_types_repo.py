@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import List, Tuple, TypedDict
+
+from app.db.instrumentation import tracked
+from app.db.supabase_client import get_supabase
+
+
+class IncidentTypeOption(TypedDict):
+    id: int
+    code: str
+    name: str
+
+
+class IncidentTypesRepo:
+    @staticmethod
+    @tracked
+    def list_all() -> List[IncidentTypeOption]:
+        """Global incident type catalog, ordered by id. Read through reference_data()."""
+        sb = get_supabase()
+
+        resp = (
+            sb.table("incident_types")
+            .select("id, code, name")
+            .order("id")
+            .execute()
+        )
+
+        if hasattr(resp, "error") and resp.error:
+            raise RuntimeError(f"Failed to load incident types: {resp.error}")
+
+        data = resp.data or []
+        if not isinstance(data, list):
+            raise RuntimeError("Unexpected response while loading incident types.")
+
+        out: List[IncidentTypeOption] = []
+        for r in data:
+            if not isinstance(r, dict):
+                continue
+
+            type_id = r.get("id")
+            if not isinstance(type_id, int):
+                continue
+
+            out.append(
+                {
+                    "id": type_id,
+                    "code": str(r.get("code", "") or "").strip(),
+                    "name": str(r.get("name", "") or "").strip(),
+                }
+            )
+
+        return out
+
+    @staticmethod
+    @tracked
+    def fingerprint() -> Tuple[int, int]:
+        """(row count, max id): a one-row request used to revalidate the local catalog."""
+        sb = get_supabase()
+
+        resp = (
+            sb.table("incident_types")
+            .select("id", count="exact")
+            .order("id", desc=True)
+            .limit(1)
+            .execute()
+        )
+
+        if hasattr(resp, "error") and resp.error:
+            raise RuntimeError(f"Failed to check incident types: {resp.error}")
+
+        data = resp.data or []
+        max_id = 0
+        if data and isinstance(data[0], dict) and isinstance(data[0].get("id"), int):
+            max_id = int(data[0]["id"])
+
+        return int(getattr(resp, "count", None) or 0), max_id
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, TypedDict
+import re
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
 from app.core.session import AppSession
+from app.db.coalescing import coalesced
+from app.db.instrumentation import tracked
+from app.db.local_mirror import LocalMirror, local_mirror, mirror_after_delete, mirror_after_write
 from app.db.supabase_client import get_supabase
-from app.core.events import events
 
 
-class WorkerOption(TypedDict):
-    id: str
-    label: str
+# Incidents list page size (keyset-paged on created_at, id)
+INCIDENTS_PAGE_SIZE = 200
+
+# Worker picker: at most this many matches per search
+WORKER_SEARCH_LIMIT = 30
 
+# PostgREST filter syntax characters; dropped from search text
+_FILTER_CHARS = re.compile(r'[,()"\\*%:_]')
 
-class IncidentTypeOption(TypedDict):
-    id: int
+
+class WorkerOption(TypedDict):
+    id: str
     label: str
+    full_name: str
+    national_id: str
 
 
 class IncidentRow(TypedDict):
@@ -29,29 +39,35 @@ class IncidentRow(TypedDict):
     created_at: str
 
 
-class IncidentsRepo:
-    @staticmethod
-    def list_workers_options() -> List[WorkerOption]:
-        sb = get_supabase()
-        firm_id = AppSession.require().firm_id
+def _search_words(text: str) -> List[str]:
+    return _FILTER_CHARS.sub(" ", text).split()
 
-        # IMPORTANT: your workers table FK is company_client_id (not client_id)
-        resp = (
-            sb.table("workers")
-            .select("id, full_name, company_clients(name)")
-            .eq("firm_id", firm_id)
-            .eq("is_active", True)
-            .order("full_name")
-            .execute()
-        )
 
-        if hasattr(resp, "error") and resp.error:
-            raise RuntimeError(f"Failed to load workers: {resp.error}")
+def worker_option_matches(text: str, option: WorkerOption) -> bool:
+    """Same rule as IncidentsRepo.search_workers, applied to an option already loaded."""
+    words = [w.casefold() for w in _search_words(text)]
+    if not words:
+        return True
+    name = option["full_name"].casefold()
+    pos = 0
+    for w in words:
+        pos = name.find(w, pos)
+        if pos < 0:
+            break
+        pos += len(w)
+    else:
+        return True
+    return option["national_id"].casefold().startswith("".join(words))
 
-        data = resp.data or []
-        if not isinstance(data, list):
-            raise RuntimeError("Unexpected response while loading workers.")
 
+class IncidentsRepo:
+    @staticmethod
+    def _local_worker_option(r: Any) -> WorkerOption:
+        label = f"{r['full_name']} — {r['client_name']}" if r["client_name"] else r["full_name"]
+        return {"id": r["id"], "label": label, "full_name": r["full_name"], "national_id": r["national_id"]}
+
+    @staticmethod
+    def _to_worker_options(data: List[Any]) -> List[WorkerOption]:
         out: List[WorkerOption] = []
         for r in data:
             if not isinstance(r, dict):
@@ -59,6 +75,7 @@ class IncidentsRepo:
 
             worker_id = str(r.get("id", "") or "").strip()
             full_name = str(r.get("full_name", "") or "").strip()
+            national_id = str(r.get("national_id", "") or "").strip()
 
             embedded = r.get("company_clients")
             client_name = ""
@@ -69,47 +86,75 @@ class IncidentsRepo:
                 continue
 
             label = f"{full_name} — {client_name}" if client_name else full_name
-            out.append({"id": worker_id, "label": label})
+            out.append({"id": worker_id, "label": label, "full_name": full_name, "national_id": national_id})
 
         return out
 
     @staticmethod
-    def list_incident_types_options() -> List[IncidentTypeOption]:
+    @tracked
+    @coalesced
+    def search_workers(text: str, limit: int = WORKER_SEARCH_LIMIT) -> List[WorkerOption]:
+        """
+        Active workers whose full name contains every word of `text` (in order)
+        or whose national ID starts with it; ordered by name, at most `limit`.
+        """
+        words = _search_words(text)
+        m = local_mirror(("workers", "company_clients"))
+        if m is not None:
+            sql = (
+                "select w.id, w.full_name, coalesce(w.national_id, '') as national_id, "
+                "coalesce(c.name, '') as client_name "
+                "from workers w left join company_clients c on c.id = w.company_client_id "
+                "where w.firm_id = ? and w.is_active = 1"
+            )
+            params: List[Any] = [m.firm_id]
+            if words:
+                sql += " and (w.full_name like ? or w.national_id like ?)"
+                params += ["%" + "%".join(words) + "%", "".join(words) + "%"]
+            sql += " order by w.full_name limit ?"
+            params.append(limit)
+            return [IncidentsRepo._local_worker_option(r) for r in m.query(sql, params)]
+
         sb = get_supabase()
+        firm_id = AppSession.require().firm_id
 
-        resp = (
-            sb.table("incident_types")
-            .select("id, code, name")
-            .order("id")
-            .execute()
+        query = (
+            sb.table("workers")
+            .select("id, full_name, national_id, company_clients(name)")
+            .eq("firm_id", firm_id)
+            .eq("is_active", True)
         )
+        if words:
+            # ilike: * is the wildcard; words carry no filter syntax (see _FILTER_CHARS)
+            query = query.or_(f"full_name.ilike.*{'*'.join(words)}*,national_id.ilike.{''.join(words)}*")
+
+        resp = query.order("full_name").limit(limit).execute()
 
         if hasattr(resp, "error") and resp.error:
-            raise RuntimeError(f"Failed to load incident types: {resp.error}")
+            raise RuntimeError(f"Failed to search workers: {resp.error}")
 
         data = resp.data or []
         if not isinstance(data, list):
-            raise RuntimeError("Unexpected response while loading incident types.")
+            raise RuntimeError("Unexpected response while searching workers.")
 
-        out: List[IncidentTypeOption] = []
-        for r in data:
-            if not isinstance(r, dict):
-                continue
-
-            type_id = r.get("id")
-            if not isinstance(type_id, int):
-                continue
-
-            code = str(r.get("code", "") or "").strip()
-            name = str(r.get("name", "") or "").strip()
-            label = f"{code} — {name}" if name else code
-
-            out.append({"id": type_id, "label": label})
-
-        return out
+        return IncidentsRepo._to_worker_options(data)
 
     @staticmethod
-    def list_recent(worker_id: Optional[str] = None) -> List[IncidentRow]:
+    @tracked
+    @coalesced
+    def list_recent(
+        worker_id: Optional[str] = None,
+        before: Optional[Tuple[str, str]] = None,
+        limit: int = INCIDENTS_PAGE_SIZE,
+    ) -> List[IncidentRow]:
+        """
+        Newest first, at most `limit` rows. `before` = (created_at, id) of the last
+        row already shown; the next page starts right after it.
+        """
+        m = local_mirror(("incidents", "workers", "incident_types"))
+        if m is not None:
+            return IncidentsRepo._list_recent_local(m, worker_id, before, limit)
+
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -120,13 +165,16 @@ class IncidentsRepo:
                 "workers(full_name), incident_types(code, name)"
             )
             .eq("firm_id", firm_id)
-            .order("created_at", desc=True)
         )
 
         if worker_id:
             query = query.eq("worker_id", worker_id)
 
-        resp = query.execute()
+        if before:
+            created_at, last_id = before
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})')
+
+        resp = query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
 
         if hasattr(resp, "error") and resp.error:
             raise RuntimeError(f"Failed to load incidents: {resp.error}")
@@ -167,49 +215,82 @@ class IncidentsRepo:
         return out
 
     @staticmethod
-    def create(
-        *,
-        worker_id: str,
-        incident_type_id: int,
-        incident_date: str,   # "YYYY-MM-DD"
-        received_day: str,    # "YYYY-MM-DD"
-        observations: Optional[str],
-        manual_handling: bool,
-    ) -> None:
+    def _list_recent_local(
+        m: LocalMirror, worker_id: Optional[str], before: Optional[Tuple[str, str]], limit: int
+    ) -> List[IncidentRow]:
+        sql = (
+            "select i.id, coalesce(i.code, '') as code, coalesce(w.full_name, '') as worker_name, "
+            "t.code as type_code, t.name as type_name, i.incident_date, i.received_day, "
+            "i.manual_handling, coalesce(i.observations, '') as observations, i.created_at "
+            "from incidents i "
+            "left join workers w on w.id = i.worker_id "
+            "left join incident_types t on t.id = i.incident_type_id "
+            "where i.firm_id = ?"
+        )
+        params: List[Any] = [m.firm_id]
+        if worker_id:
+            sql += " and i.worker_id = ?"
+            params.append(worker_id)
+        if before:
+            sql += " and (i.created_at < ? or (i.created_at = ? and i.id < ?))"
+            params.extend([before[0], before[0], before[1]])
+        sql += " order by i.created_at desc, i.id desc limit ?"
+        params.append(limit)
+
+        out: List[IncidentRow] = []
+        for r in m.query(sql, params):
+            it_code = (r["type_code"] or "").strip()
+            it_name = (r["type_name"] or "").strip()
+            out.append(
+                {
+                    "id": r["id"],
+                    "code": r["code"],
+                    "worker_name": r["worker_name"],
+                    "incident_type": f"{it_code} — {it_name}" if it_name else it_code,
+                    "incident_date": r["incident_date"],
+                    "received_day": r["received_day"],
+                    "manual_handling": bool(r["manual_handling"]),
+                    "observations": r["observations"],
+                    "created_at": r["created_at"],
+                }
+            )
+        return out
+
+    @staticmethod
+    @tracked
+    def insert_many(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Bulk insert used by the incident outbox. Each payload carries a client-generated
+        id, which doubles as the idempotency key: replayed rows are ignored.
+        """
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
-        payload: Dict[str, Any] = {
-            "firm_id": firm_id,
-            "worker_id": worker_id,
-            "incident_type_id": incident_type_id,
-            "incident_date": incident_date,
-            "received_day": received_day,
-            "observations": observations,
-            "manual_handling": manual_handling,
-        }
-
-        resp = sb.table("incidents").insert(payload).execute()
+        rows = [{**p, "firm_id": firm_id} for p in payloads]
+        resp = sb.table("incidents").upsert(rows, on_conflict="id", ignore_duplicates=True).execute()
 
         if hasattr(resp, "error") and resp.error:
-            raise RuntimeError(f"Failed to create incident: {resp.error}")
-        
-        events().incidents_changed.emit()
+            raise RuntimeError(f"Failed to create incidents: {resp.error}")
+
+        data = [r for r in (resp.data or []) if isinstance(r, dict)]
+        mirror_after_write("incidents", data)
+        return data
 
     @staticmethod
-    def delete(incident_id: str) -> None:
+    @tracked
+    def delete_many(incident_ids: List[str]) -> None:
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
         resp = (
             sb.table("incidents")
             .delete()
-            .eq("id", incident_id)
+            .in_("id", incident_ids)
             .eq("firm_id", firm_id)
             .execute()
         )
 
         if hasattr(resp, "error") and resp.error:
-            raise RuntimeError(f"Failed to delete incident: {resp.error}")
-        
-        events().incidents_changed.emit()
\ No newline at end of file
+            raise RuntimeError(f"Failed to delete incidents: {resp.error}")
+
+        mirror_after_delete("incidents", incident_ids)
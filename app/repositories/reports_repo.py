@@ -1,119 +1,212 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import date
-from typing import List, Optional
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Tuple
 
+from app.core.interning import IncidentRefs, IncidentTypeInfo, WorkerInfo
 from app.core.session import AppSession
+from app.db.instrumentation import bind_scope, tracked
 from app.db.supabase_client import get_supabase
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ReportIncidentRow:
-    incident_id: str
+    """One incident of a report. Worker / type are shared per fetch (see IncidentRefs)."""
+
     received_day: date
-    incident_type_code: str
-    incident_type_name: str
-    worker_full_name: str
-    worker_national_id: str
-    company_client_id: str
-    company_client_name: str
+    incident_type: IncidentTypeInfo
+    worker: WorkerInfo
 
+    @property
+    def incident_type_code(self) -> str:
+        return self.incident_type.code
 
-def _parse_date_yyyy_mm_dd(value: str) -> date:
-    y, m, d = value.split("-")
-    return date(int(y), int(m), int(d))
+    @property
+    def incident_type_name(self) -> str:
+        return self.incident_type.name
 
+    @property
+    def worker_full_name(self) -> str:
+        return self.worker.full_name
 
-class ReportsRepo:
-    @staticmethod
-    def list_company_clients_options() -> List[dict]:
-        sb = get_supabase()
-        firm_id = AppSession.require().firm_id
+    @property
+    def worker_national_id(self) -> str:
+        return self.worker.national_id
 
-        resp = (
-            sb.table("company_clients")
-            .select("id, name")
-            .eq("firm_id", firm_id)
-            .eq("is_active", True)
-            .order("name")
-            .execute()
-        )
+    @property
+    def company_client_id(self) -> str:
+        return self.worker.company_client_id
 
-        if hasattr(resp, "error") and resp.error:
-            raise RuntimeError(resp.error)
+    @property
+    def company_client_name(self) -> str:
+        return self.worker.company_client_name
 
-        data = resp.data or []
-        out: List[dict] = []
-        for r in data:
-            if isinstance(r, dict):
-                out.append({"id": str(r.get("id", "")), "name": str(r.get("name", ""))})
-        return out
 
+# Concurrent month windows for wide report ranges
+FETCH_MAX_WORKERS = 4
+# PostgREST caps responses (Supabase default max_rows = 1000): windows are paged
+FETCH_PAGE_SIZE = 1000
+
+_REPORT_INCIDENT_SELECT = (
+    "received_day, created_at, "
+    "type:incident_types(id, code, name), "
+    "worker:workers(id, full_name, national_id, company_client_id, company_client:company_clients(name))"
+)
+
+
+@lru_cache(maxsize=8192)
+def _parse_date_yyyy_mm_dd(value: str) -> date:
+    y, m, d = value.split("-")
+    return date(int(y), int(m), int(d))
+
+
+class ReportsRepo:
     @staticmethod
+    @tracked
     def list_incidents_for_reports(
         *,
         date_from: date,
         date_to: date,
         company_client_id: Optional[str],
     ) -> List[ReportIncidentRow]:
+        data = _fetch_incidents_range(date_from, date_to)
+        return _parse_report_rows(data, company_client_id)
+
+    @staticmethod
+    @tracked
+    def list_incidents_for_rollups(*, date_from: date, date_to: date) -> Tuple[List[ReportIncidentRow], str]:
+        """All incidents received in the range, plus the max created_at among them (the rollup watermark)."""
+        data = _fetch_incidents_range(date_from, date_to)
+        return _parse_report_rows(data, None), _max_created_at(data)
+
+    @staticmethod
+    @tracked
+    def list_incidents_created_after(
+        *,
+        created_after: str,
+        date_from: date,
+        date_to: date,
+    ) -> Tuple[List[ReportIncidentRow], str]:
+        """
+        Delta query for the local rollups: incidents inserted after the
+        created_at watermark whose received_day falls in the given range,
+        plus the new watermark ("" when there are none).
+        """
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
-        resp = (
-            sb.table("incidents")
-            .select(
-                "id, received_day, "
-                "type:incident_types(code, name), "
-                "worker:workers(full_name, national_id, company_client_id, company_client:company_clients(name))"
-            )
+        data = _fetch_pages(
+            lambda count: sb.table("incidents")
+            .select(_REPORT_INCIDENT_SELECT, count=count)
             .eq("firm_id", firm_id)
+            .gt("created_at", created_after)
             .gte("received_day", str(date_from))
             .lte("received_day", str(date_to))
-            .order("received_day", desc=False)
-            .execute()
+            .order("created_at", desc=False)
+            .order("id", desc=False),
+            f"incidents created after {created_after}",
         )
+        return _parse_report_rows(data, None), _max_created_at(data)
+
+
+def _month_windows(date_from: date, date_to: date) -> List[Tuple[date, date]]:
+    """Splits [date_from, date_to] at month boundaries."""
+    out: List[Tuple[date, date]] = []
+    start = date_from
+    while start <= date_to:
+        next_month = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+        end = min(date_to, next_month - timedelta(days=1))
+        out.append((start, end))
+        start = next_month
+    return out
+
+
+def _fetch_incidents_range(date_from: date, date_to: date) -> List[Any]:
+    sb = get_supabase()
+    firm_id = AppSession.require().firm_id
+
+    windows = _month_windows(date_from, date_to)
+    if len(windows) == 1:
+        return _fetch_incidents_window(sb, firm_id, date_from, date_to)
+
+    # Wide ranges: one request per month, fetched concurrently, merged in order
+    workers = min(FETCH_MAX_WORKERS, len(windows))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reports-fetch") as pool:
+        fetch = bind_scope(lambda w: _fetch_incidents_window(sb, firm_id, w[0], w[1]))
+        chunks = pool.map(fetch, windows)
+        return [r for chunk in chunks for r in chunk]
+
+
+def _fetch_incidents_window(sb: Any, firm_id: str, date_from: date, date_to: date) -> List[Any]:
+    return _fetch_pages(
+        lambda count: sb.table("incidents")
+        .select(_REPORT_INCIDENT_SELECT, count=count)
+        .eq("firm_id", firm_id)
+        .gte("received_day", str(date_from))
+        .lte("received_day", str(date_to))
+        .order("received_day", desc=False)
+        .order("id", desc=False),
+        f"incidents {date_from}..{date_to}",
+    )
+
+
+def _fetch_pages(build_query: Callable[[Optional[str]], Any], what: str) -> List[Any]:
+    """
+    All rows of a query, paged with .range() (the query needs a total order).
+    The first page asks for the exact count; fewer rows than that means the
+    server caps pages below FETCH_PAGE_SIZE, which would silently truncate.
+    """
+    out: List[Any] = []
+    total: Optional[int] = None
+    while True:
+        query = build_query("exact" if not out else None)
+        resp = query.range(len(out), len(out) + FETCH_PAGE_SIZE - 1).execute()
 
         # Optional hardening
         if hasattr(resp, "error") and resp.error:
             raise RuntimeError(resp.error)
 
         data = resp.data or []
-        out: List[ReportIncidentRow] = []
-
-        for r in data:
-            if not isinstance(r, dict):
-                continue
-
-            received_day_str = r.get("received_day")
-            if not isinstance(received_day_str, str) or not received_day_str:
-                continue
-
-            itype = r.get("type")
-            worker = r.get("worker")
-            if not isinstance(itype, dict) or not isinstance(worker, dict):
-                continue
-
-            cc = worker.get("company_client")
-            if not isinstance(cc, dict):
-                continue
-
-            cc_id = str(worker.get("company_client_id", ""))
-
-            if company_client_id and cc_id != company_client_id:
-                continue
-
-            out.append(
-                ReportIncidentRow(
-                    incident_id=str(r.get("id", "")),
-                    received_day=_parse_date_yyyy_mm_dd(received_day_str),
-                    incident_type_code=str(itype.get("code", "")),
-                    incident_type_name=str(itype.get("name", "")),
-                    worker_full_name=str(worker.get("full_name", "")),
-                    worker_national_id=str(worker.get("national_id", "")),
-                    company_client_id=cc_id,
-                    company_client_name=str(cc.get("name", "")),
-                )
-            )
-
-        return out
\ No newline at end of file
+        if not isinstance(data, list):
+            data = []
+        if not out:
+            total = getattr(resp, "count", None)
+        out.extend(data)
+        if len(data) < FETCH_PAGE_SIZE:
+            break
+
+    if total is not None and len(out) < total:
+        raise RuntimeError(f"{what}: got {len(out)} of {total} rows (server page size below {FETCH_PAGE_SIZE}?)")
+    return out
+
+
+def _max_created_at(data: List[Any]) -> str:
+    return max((str(r.get("created_at") or "") for r in data if isinstance(r, dict)), default="")
+
+
+def _parse_report_rows(data: Any, company_client_id: Optional[str]) -> List[ReportIncidentRow]:
+    out: List[ReportIncidentRow] = []
+    refs = IncidentRefs()
+
+    for r in data:
+        if not isinstance(r, dict):
+            continue
+
+        received_day_str = r.get("received_day")
+        if not isinstance(received_day_str, str) or not received_day_str:
+            continue
+
+        itype = refs.incident_type_json(r.get("type"))
+        worker = refs.worker_json(r.get("worker"))
+        if itype is None or worker is None:
+            continue
+
+        if company_client_id and worker.company_client_id != company_client_id:
+            continue
+
+        out.append(ReportIncidentRow(_parse_date_yyyy_mm_dd(received_day_str), itype, worker))
+
+    return out
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, Dict, List, Optional, TypedDict, cast
 
 from app.core.session import AppSession
+from app.db.coalescing import coalesced
+from app.db.instrumentation import tracked
+from app.db.local_mirror import local_mirror, mirror_after_write
 from app.db.supabase_client import get_supabase
 from app.core.events import events
 
@@ -15,37 +18,42 @@ class WorkerRow(TypedDict):
     created_at: str
 
 
-class ClientOption(TypedDict):
-    id: str
-    name: str
-
+def _to_worker_row(r: Dict[str, Any]) -> WorkerRow:
+    embedded = r.get("company_clients")
+    client_name = ""
+    if isinstance(embedded, dict):
+        client_name = str(embedded.get("name", "") or "")
 
-class WorkersRepo:
-    @staticmethod
-    def list_company_clients_options() -> List[ClientOption]:
-        sb = get_supabase()
-        firm_id = AppSession.require().firm_id
+    return {
+        "id": str(r.get("id", "") or ""),
+        "full_name": str(r.get("full_name", "") or ""),
+        "national_id": str(r.get("national_id", "") or ""),
+        "company_client_id": str(r.get("company_client_id", "") or ""),
+        "company_client_name": client_name,
+        "created_at": str(r.get("created_at", "") or ""),
+    }
 
-        resp = (
-            sb.table("company_clients")
-            .select("id, name")
-            .eq("firm_id", firm_id)
-            .eq("is_active", True)
-            .order("name")
-            .execute()
-        )
-
-        data = resp.data or []
-        out: List[ClientOption] = []
-
-        for r in data:
-            if isinstance(r, dict):
-                out.append({"id": str(r.get("id", "")), "name": str(r.get("name", ""))})
-
-        return out
 
+class WorkersRepo:
     @staticmethod
+    @tracked
+    @coalesced
     def list_active(company_client_id: Optional[str] = None) -> List[WorkerRow]:
+        m = local_mirror(("workers", "company_clients"))
+        if m is not None:
+            sql = (
+                "select w.id, w.full_name, w.national_id, w.company_client_id, "
+                "coalesce(c.name, '') as company_client_name, w.created_at "
+                "from workers w left join company_clients c on c.id = w.company_client_id "
+                "where w.firm_id = ? and w.is_active = 1"
+            )
+            params: List[Any] = [m.firm_id]
+            if company_client_id:
+                sql += " and w.company_client_id = ?"
+                params.append(company_client_id)
+            sql += " order by w.created_at desc"
+            return [cast(WorkerRow, dict(r)) for r in m.query(sql, params)]
+
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -63,31 +71,12 @@ class WorkersRepo:
         resp = query.execute()
         data = resp.data or []
 
-        out: List[WorkerRow] = []
-        for r in data:
-            if not isinstance(r, dict):
-                continue
-
-            embedded = r.get("company_clients")
-            client_name = ""
-            if isinstance(embedded, dict):
-                client_name = str(embedded.get("name", "") or "")
-
-            out.append(
-                {
-                    "id": str(r.get("id", "") or ""),
-                    "full_name": str(r.get("full_name", "") or ""),
-                    "national_id": str(r.get("national_id", "") or ""),
-                    "company_client_id": str(r.get("company_client_id", "") or ""),
-                    "company_client_name": client_name,
-                    "created_at": str(r.get("created_at", "") or ""),
-                }
-            )
-
-        return out
+        return [_to_worker_row(r) for r in data if isinstance(r, dict)]
 
     @staticmethod
-    def create(company_client_id: str, full_name: str, national_id: str) -> None:
+    @tracked
+    def create(company_client_id: str, full_name: str, national_id: str) -> WorkerRow:
+        """Inserts the worker and returns it as listed by list_active()."""
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
@@ -98,15 +87,23 @@ class WorkersRepo:
             "national_id": national_id,
         }
 
-        sb.table("workers").insert(payload).execute()
-        
-        events().workers_changed.emit()
+        # Full row for the mirror + the client name for the list
+        resp = sb.table("workers").insert(payload).select("*, company_clients(name)").execute()
+        data = resp.data or []
+        if not data or not isinstance(data[0], dict):
+            raise RuntimeError("Unexpected response while creating worker.")
+
+        mirror_after_write("workers", data)
+        events().notify("workers_changed")
+        return _to_worker_row(data[0])
 
     @staticmethod
+    @tracked
     def deactivate(worker_id: str) -> None:
         sb = get_supabase()
         firm_id = AppSession.require().firm_id
 
-        sb.table("workers").update({"is_active": False}).eq("id", worker_id).eq("firm_id", firm_id).execute()
-        
-        events().workers_changed.emit()
\ No newline at end of file
+        resp = sb.table("workers").update({"is_active": False}).eq("id", worker_id).eq("firm_id", firm_id).execute()
+
+        mirror_after_write("workers", resp.data)
+        events().notify("workers_changed")
\ No newline at end of file
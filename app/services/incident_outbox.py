@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from postgrest.exceptions import APIError
+
+from app.core.events import events
+from app.core.paths import local_data_dir
+from app.core.session import AppSession
+from app.db.instrumentation import request_scope
+from app.repositories.incidents_repo import IncidentRow, IncidentsRepo
+
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100
+RETRY_MIN_SECONDS = 2.0
+RETRY_MAX_SECONDS = 60.0
+
+OP_CREATE = "create"
+OP_DELETE = "delete"
+
+STATUS_PENDING = "pending"
+STATUS_FAILED = "failed"
+
+PENDING_CODE = "(pending)"
+FAILED_CODE = "(failed)"
+
+
+@dataclass(frozen=True, slots=True)
+class OutboxStats:
+    pending: int
+    failed: int
+    flushed_total: int
+    last_flush_rows: int
+    last_flush_rows_per_sec: float
+    last_error: str
+    retrying_in: float
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    seq: int
+    op: str
+    incident_id: str
+    payload: Dict[str, Any]
+    display: Dict[str, str]
+    status: str
+
+
+_SCHEMA = """
+create table if not exists outbox (
+  seq integer primary key autoincrement,
+  firm_id text not null,
+  op text not null,
+  incident_id text not null,
+  payload text not null,
+  display text not null,
+  status text not null,
+  attempts integer not null default 0,
+  last_error text not null default '',
+  queued_at text not null
+);
+
+create index if not exists idx_outbox_firm_status_seq on outbox(firm_id, status, seq);
+"""
+
+
+# SQLSTATE classes worth retrying: connection (08), rollback / deadlock (40),
+# insufficient resources (53), operator intervention / timeouts (57), system (58)
+_TRANSIENT_SQLSTATE_CLASSES = {"08", "40", "53", "57", "58"}
+_TRANSIENT_HTTP_STATUSES = {401, 408, 429}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """
+    Only the server rejecting the data itself (constraint, RLS, 4xx validation)
+    is permanent. Network errors, 5xx / 408 / 429, expired JWTs and signing out
+    mid-flush (AppSession.require) keep the rows queued.
+    """
+    if not isinstance(exc, APIError):
+        return True
+
+    code = str(exc.code or "")
+    if len(code) == 3 and code.isdigit():
+        # No JSON body: postgrest reports the HTTP status as the code (SQLSTATEs are 5 chars)
+        status = int(code)
+        return status >= 500 or status in _TRANSIENT_HTTP_STATUSES
+    if code.startswith("PGRST"):
+        # PGRST0xx: database unreachable; PGRST3xx: JWT errors
+        return code[5:6] in ("0", "3")
+    if "jwt" in (exc.message or "").lower():
+        return True
+    return code[:2] in _TRANSIENT_SQLSTATE_CLASSES or code == "55P03"
+
+
+class IncidentOutbox:
+    """
+    Durable local queue for incident creates and deletes.
+    - Writes land in SQLite immediately and show up in the incident list (overlay()).
+    - A background flusher sends them in batches; the client-generated incident id
+      is the idempotency key, so a batch replayed after a lost response is harmless.
+    - Network / server / auth errors keep the queue and retry with backoff; rows the
+      server rejects are marked failed and stay visible until deleted or retried.
+    - The flusher claims a batch (in-flight ids) in the same step that reads it, so a
+      delete() racing a flush either drops the queued create first or queues a delete.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None) -> None:
+        self._db_path = db_path or (local_data_dir() / "outbox.sqlite3")
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._retry_delay = 0.0
+        self._rejected: List[str] = []
+        self._in_flight_lock = threading.Lock()
+        self._in_flight: Set[str] = set()
+
+        self._flushed_total = 0
+        self._last_flush_rows = 0
+        self._last_flush_rate = 0.0
+        self._last_error = ""
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(self._db_path)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # -------------------------
+    # writes (GUI thread)
+    # -------------------------
+    def create(
+        self,
+        *,
+        worker_id: str,
+        incident_type_id: int,
+        incident_date: str,
+        received_day: str,
+        observations: Optional[str],
+        manual_handling: bool,
+        worker_name: str = "",
+        incident_type_label: str = "",
+    ) -> str:
+        """Queues an insert and returns the (client-generated) incident id."""
+        firm_id = AppSession.require().firm_id
+        incident_id = str(uuid.uuid4())
+
+        payload: Dict[str, Any] = {
+            "id": incident_id,
+            "worker_id": worker_id,
+            "incident_type_id": incident_type_id,
+            "incident_date": incident_date,
+            "received_day": received_day,
+            "observations": observations,
+            "manual_handling": manual_handling,
+        }
+        display = {"worker_name": worker_name, "incident_type": incident_type_label}
+
+        self._insert(firm_id, OP_CREATE, incident_id, payload, display)
+        return incident_id
+
+    def delete(self, incident_id: str) -> None:
+        """Queues a delete; deleting a still-queued create just drops it."""
+        firm_id = AppSession.require().firm_id
+
+        with self._in_flight_lock:
+            # A create being sent right now may already exist on the server: delete it there too
+            if incident_id not in self._in_flight:
+                with self._connect() as con:
+                    dropped = con.execute(
+                        "delete from outbox where firm_id = ? and op = ? and incident_id = ?",
+                        (firm_id, OP_CREATE, incident_id),
+                    ).rowcount
+                if dropped:
+                    events().notify("outbox_changed")
+                    return
+
+        self._insert(firm_id, OP_DELETE, incident_id, {}, {})
+
+    def retry_failed(self) -> int:
+        """Re-queues the rows the server rejected (e.g. after fixing the data they depend on)."""
+        firm_id = AppSession.require().firm_id
+        with self._connect() as con:
+            n = con.execute(
+                "update outbox set status = ?, last_error = '' where firm_id = ? and status = ?",
+                (STATUS_PENDING, firm_id, STATUS_FAILED),
+            ).rowcount
+        if n:
+            self._last_error = ""
+            events().notify("outbox_changed")
+            self.kick()
+        return n
+
+    def _insert(self, firm_id: str, op: str, incident_id: str, payload: Dict[str, Any], display: Dict[str, str]) -> None:
+        with self._connect() as con:
+            con.execute(
+                "insert into outbox (firm_id, op, incident_id, payload, display, status, queued_at) "
+                "values (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    firm_id, op, incident_id, json.dumps(payload), json.dumps(display),
+                    STATUS_PENDING, datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+        events().notify("outbox_changed")
+        self.kick()
+
+    # -------------------------
+    # reads
+    # -------------------------
+    def _entries(self, firm_id: str, *, op: Optional[str] = None, status: Optional[str] = None, limit: int = -1) -> List[_Entry]:
+        sql = "select seq, op, incident_id, payload, display, status from outbox where firm_id = ?"
+        params: List[Any] = [firm_id]
+        if op:
+            sql += " and op = ?"
+            params.append(op)
+        if status:
+            sql += " and status = ?"
+            params.append(status)
+        sql += " order by seq limit ?"
+        params.append(limit)
+
+        with self._connect() as con:
+            return [
+                _Entry(seq, op_, iid, json.loads(payload), json.loads(display), st)
+                for seq, op_, iid, payload, display, st in con.execute(sql, params)
+            ]
+
+    def overlay(self, rows: List[IncidentRow], worker_id: Optional[str] = None) -> List[IncidentRow]:
+        """Server rows + queued creates (on top) - queued deletes."""
+        session = AppSession.current
+        if session is None:
+            return rows
+
+        entries = self._entries(session.firm_id)
+        deleted: Set[str] = {e.incident_id for e in entries if e.op == OP_DELETE}
+
+        queued: List[IncidentRow] = []
+        for e in reversed(entries):
+            if e.op != OP_CREATE or (worker_id and e.payload.get("worker_id") != worker_id):
+                continue
+            queued.append(
+                {
+                    "id": e.incident_id,
+                    "code": FAILED_CODE if e.status == STATUS_FAILED else PENDING_CODE,
+                    "worker_name": e.display.get("worker_name", ""),
+                    "incident_type": e.display.get("incident_type", ""),
+                    "incident_date": str(e.payload.get("incident_date", "")),
+                    "received_day": str(e.payload.get("received_day", "")),
+                    "manual_handling": bool(e.payload.get("manual_handling", False)),
+                    "observations": e.payload.get("observations") or "",
+                    "created_at": "",
+                }
+            )
+
+        server = [r for r in rows if r["id"] not in deleted]
+        # A flushed create can be in both until the outbox row is removed
+        seen = {r["id"] for r in server}
+        return [r for r in queued if r["id"] not in seen] + server
+
+    def stats(self) -> OutboxStats:
+        session = AppSession.current
+        pending = failed = 0
+        if session is not None:
+            with self._connect() as con:
+                for status, n in con.execute(
+                    "select status, count(*) from outbox where firm_id = ? group by status", (session.firm_id,)
+                ):
+                    if status == STATUS_PENDING:
+                        pending = int(n)
+                    elif status == STATUS_FAILED:
+                        failed = int(n)
+
+        return OutboxStats(
+            pending=pending,
+            failed=failed,
+            flushed_total=self._flushed_total,
+            last_flush_rows=self._last_flush_rows,
+            last_flush_rows_per_sec=self._last_flush_rate,
+            last_error=self._last_error,
+            retrying_in=self._retry_delay if pending else 0.0,
+        )
+
+    # -------------------------
+    # flush (background thread)
+    # -------------------------
+    def kick(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="incident-outbox", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(timeout=self._retry_delay or None)
+            self._wake.clear()
+
+            session = AppSession.current
+            if session is None:
+                self._retry_delay = 0.0
+                continue
+
+            try:
+                with request_scope(page="background", action="IncidentOutbox.flush"):
+                    self.flush(session.firm_id)
+                self._retry_delay = 0.0
+            except Exception as e:
+                # Offline / server trouble / signed out: keep everything queued and back off
+                self._last_error = str(e)
+                self._retry_delay = min(RETRY_MAX_SECONDS, max(RETRY_MIN_SECONDS, self._retry_delay * 2))
+                logger.info("outbox flush deferred (%s); retrying in %.0fs", e, self._retry_delay)
+                events().notify("outbox_changed")
+
+    def flush(self, firm_id: str) -> int:
+        """Sends everything queued for the firm. Raises on transient errors (see _is_transient)."""
+        with self._flush_lock:
+            started = time.perf_counter()
+            sent = 0
+            self._rejected = []
+            try:
+                for op in (OP_CREATE, OP_DELETE):
+                    while True:
+                        batch = self._claim(firm_id, op)
+                        if not batch:
+                            break
+                        try:
+                            sent += self._send(op, batch)
+                        finally:
+                            with self._in_flight_lock:
+                                self._in_flight -= {e.incident_id for e in batch}
+            finally:
+                if sent:
+                    elapsed = max(time.perf_counter() - started, 1e-6)
+                    self._flushed_total += sent
+                    self._last_flush_rows = sent
+                    self._last_flush_rate = sent / elapsed
+                    logger.info("outbox: flushed %d incident write(s) in %.2fs", sent, elapsed)
+                    # Server codes / removals are now visible
+                    events().notify("incidents_changed")
+                if sent or self._rejected:
+                    events().notify("outbox_changed")
+
+            self._last_error = self._rejected[-1] if self._rejected else ""
+        return sent
+
+    def _claim(self, firm_id: str, op: str) -> List[_Entry]:
+        """Reads the next batch and marks it in flight under the lock delete() checks."""
+        with self._in_flight_lock:
+            batch = self._entries(firm_id, op=op, status=STATUS_PENDING, limit=OUTBOX_BATCH_SIZE)
+            self._in_flight |= {e.incident_id for e in batch}
+        return batch
+
+    def _send(self, op: str, batch: List[_Entry]) -> int:
+        try:
+            self._send_batch(op, batch)
+            self._remove([e.seq for e in batch])
+            return len(batch)
+        except Exception as e:
+            if _is_transient(e):
+                raise
+            if len(batch) == 1:
+                self._mark_failed(batch[0].seq, str(e))
+                return 0
+
+        # The server rejected the batch: bisect to isolate the offending rows
+        mid = len(batch) // 2
+        return self._send(op, batch[:mid]) + self._send(op, batch[mid:])
+
+    @staticmethod
+    def _send_batch(op: str, batch: List[_Entry]) -> None:
+        if op == OP_CREATE:
+            IncidentsRepo.insert_many([e.payload for e in batch])
+        else:
+            IncidentsRepo.delete_many([e.incident_id for e in batch])
+
+    def _remove(self, seqs: List[int]) -> None:
+        with self._connect() as con:
+            con.executemany("delete from outbox where seq = ?", [(s,) for s in seqs])
+
+    def _mark_failed(self, seq: int, error: str) -> None:
+        self._rejected.append(error)
+        logger.warning("outbox: incident write rejected: %s", error)
+        with self._connect() as con:
+            con.execute(
+                "update outbox set status = ?, attempts = attempts + 1, last_error = ? where seq = ?",
+                (STATUS_FAILED, error, seq),
+            )
+
+
+_outbox: IncidentOutbox | None = None
+
+
+def incident_outbox() -> IncidentOutbox:
+    global _outbox
+    if _outbox is None:
+        _outbox = IncidentOutbox()
+        # Anything left from a previous session goes out as soon as possible
+        _outbox.kick()
+    return _outbox
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import List
+
+from app.core.interning import IncidentRefs
+from app.repositories.reports_repo import ReportIncidentRow
+from app.services.reports_excel_exporter import ReportsExcelExporter, ReportsMetadata
+from app.services.xlsx_writers import BACKEND_OPENPYXL, BACKEND_XLSXWRITER, xlsxwriter
+
+
+def _incidents(n: int) -> List[ReportIncidentRow]:
+    refs = IncidentRefs()
+    return [
+        ReportIncidentRow(
+            received_day=date(2024, 1 + i % 12, 1 + i % 28),
+            incident_type=refs.incident_type(i % 2, ("ABSENCE", "LATE_ARRIVAL")[i % 2], ("Absence", "Late")[i % 2]),
+            worker=refs.worker(
+                i % 3000,
+                f"Worker {i % 3000} Surname {i % 71}",
+                str(10_000_000 + i % 3000),
+                f"client-{i % 3000 % 25}",
+                f"Client {i % 3000 % 25}",
+            ),
+        )
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    """
+    Times a full report export (build + save) of N synthetic incidents with each
+    xlsx backend.
+
+    Usage: python -m app.services.measure_xlsx_export [rows]
+    """
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    incidents = _incidents(n)
+    meta = ReportsMetadata(date_from=date(2024, 1, 1), date_to=date(2024, 12, 31), client_name="All")
+
+    backends = [BACKEND_OPENPYXL]
+    if xlsxwriter is not None:
+        backends.append(BACKEND_XLSXWRITER)
+    else:
+        print("XlsxWriter not installed: timing openpyxl only")
+
+    print(f"rows: {n}")
+    with tempfile.TemporaryDirectory() as out:
+        for backend in backends:
+            path = os.path.join(out, f"{backend}.xlsx")
+            t0 = time.perf_counter()
+            wb = ReportsExcelExporter.build_workbook(incidents=incidents, meta=meta, backend=backend)
+            wb.save(path)
+            elapsed = time.perf_counter() - t0
+            print(f"{backend:<12} {elapsed:7.2f} s   file {os.path.getsize(path) / 1e6:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
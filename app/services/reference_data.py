@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.events import events
+from app.core.paths import local_data_dir
+from app.core.session import AppSession
+from app.db.instrumentation import request_scope
+from app.repositories.company_clients_repo import CompanyClientOption, CompanyClientsRepo
+from app.repositories.incident_types_repo import IncidentTypeOption, IncidentTypesRepo
+
+
+logger = logging.getLogger(__name__)
+
+CLIENTS_TTL_SECONDS = 300.0
+# After this, the incident types are revalidated in the background (served meanwhile)
+INCIDENT_TYPES_TTL_SECONDS = 3600.0
+# The count/max-id check can't see renames; reload the whole catalog at least this often
+INCIDENT_TYPES_MAX_AGE_SECONDS = 7 * 24 * 3600.0
+REVALIDATE_RETRY_SECONDS = 60.0
+
+KEY_COMPANY_CLIENTS = "company_clients"
+KEY_INCIDENT_TYPES = "incident_types"
+
+
+@dataclass
+class ReferenceStats:
+    hits: int = 0
+    loads: int = 0
+    waits: int = 0
+    invalidations: int = 0
+    disk_hits: int = 0
+    revalidations: int = 0
+    revalidation_updates: int = 0
+    revalidation_failures: int = 0
+
+
+@dataclass
+class _Entry:
+    scope: str
+    value: Any
+    loaded_at: float
+
+
+class IncidentTypesCatalog:
+    """
+    On-disk copy of the global incident_types table (JSON), tagged with the
+    Supabase project it came from and a (count, max id) fingerprint.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self._path = path or (local_data_dir() / "incident_types.json")
+
+    @staticmethod
+    def _source() -> str:
+        return os.getenv("SUPABASE_URL", "").strip()
+
+    @staticmethod
+    def fingerprint_of(rows: List[IncidentTypeOption]) -> Tuple[int, int]:
+        return len(rows), max((r["id"] for r in rows), default=0)
+
+    def load(self) -> Optional[Tuple[List[IncidentTypeOption], float]]:
+        """(rows, saved_at) or None when missing, unreadable or from another project."""
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(raw, dict) or raw.get("source") != self._source():
+            return None
+        rows = raw.get("rows")
+        if not isinstance(rows, list):
+            return None
+        return rows, float(raw.get("saved_at", 0) or 0)
+
+    def save(self, rows: List[IncidentTypeOption]) -> None:
+        payload = {"source": self._source(), "saved_at": time.time(), "rows": rows}
+        tmp = self._path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, self._path)
+        except OSError:
+            logger.warning("could not persist incident types catalog", exc_info=True)
+
+
+class ReferenceDataStore:
+    """
+    Shared lookup lists (company clients, incident types) for every page.
+    - Entries expire after their TTL and are scoped to the signed-in firm.
+    - Loads are single-flight: concurrent readers of a key wait for one request.
+    - company_clients_changed invalidates the client list, so the next reader
+      (the first of the pages reacting to the same event) refetches it once.
+    - Incident types are persisted on disk and served from there immediately;
+      a background count/max-id check revalidates them and emits
+      incident_types_changed when the catalog moved.
+    """
+
+    def __init__(self, catalog: Optional[IncidentTypesCatalog] = None) -> None:
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, _Entry] = {}
+        self._generation: Dict[str, int] = {}
+        self._catalog = catalog or IncidentTypesCatalog()
+        self._catalog_saved_at = 0.0
+        self._revalidating = False
+        self.stats = ReferenceStats()
+
+    # -------------------------
+    # reads
+    # -------------------------
+    def company_clients(self) -> List[CompanyClientOption]:
+        firm_id = AppSession.require().firm_id
+        return list(self._get(KEY_COMPANY_CLIENTS, firm_id, CLIENTS_TTL_SECONDS, CompanyClientsRepo.list_options))
+
+    def incident_types(self) -> List[IncidentTypeOption]:
+        # Global table: not scoped to a firm. Never blocks once a copy exists (memory or disk).
+        with self._lock:
+            entry = self._entries.get(KEY_INCIDENT_TYPES)
+            if entry is None:
+                cached = self._catalog.load()
+                if cached is not None:
+                    rows, self._catalog_saved_at = cached
+                    # Stale on arrival so it gets revalidated right away
+                    entry = _Entry(scope="", value=rows, loaded_at=time.monotonic() - INCIDENT_TYPES_TTL_SECONDS)
+                    self._entries[KEY_INCIDENT_TYPES] = entry
+                    self.stats.disk_hits += 1
+            else:
+                self.stats.hits += 1
+
+        if entry is None:
+            # First run on this machine: nothing to serve yet
+            return list(self._get(KEY_INCIDENT_TYPES, "", INCIDENT_TYPES_TTL_SECONDS, self._load_incident_types))
+
+        if time.monotonic() - entry.loaded_at >= INCIDENT_TYPES_TTL_SECONDS:
+            self._revalidate_incident_types()
+        return list(entry.value)
+
+    def _load_incident_types(self) -> List[IncidentTypeOption]:
+        rows = IncidentTypesRepo.list_all()
+        self._catalog.save(rows)
+        self._catalog_saved_at = time.time()
+        return rows
+
+    def _revalidate_incident_types(self) -> None:
+        with self._lock:
+            if self._revalidating:
+                return
+            self._revalidating = True
+
+        threading.Thread(target=self._revalidate_worker, name="incident-types-revalidate", daemon=True).start()
+
+    def _revalidate_worker(self) -> None:
+        changed = False
+        try:
+            with request_scope(page="background"):
+                with self._lock:
+                    entry = self._entries.get(KEY_INCIDENT_TYPES)
+                    current: List[IncidentTypeOption] = list(entry.value) if entry else []
+
+                too_old = time.time() - self._catalog_saved_at >= INCIDENT_TYPES_MAX_AGE_SECONDS
+                if too_old or IncidentTypesRepo.fingerprint() != IncidentTypesCatalog.fingerprint_of(current):
+                    rows = self._load_incident_types()
+                    changed = rows != current
+                else:
+                    rows = current
+
+            with self._lock:
+                self._entries[KEY_INCIDENT_TYPES] = _Entry(scope="", value=rows, loaded_at=time.monotonic())
+                self.stats.revalidations += 1
+                if changed:
+                    self.stats.revalidation_updates += 1
+        except Exception:
+            # Keep serving the local copy; the next read retries
+            with self._lock:
+                self.stats.revalidation_failures += 1
+                entry = self._entries.get(KEY_INCIDENT_TYPES)
+                if entry is not None:
+                    entry.loaded_at = time.monotonic() - INCIDENT_TYPES_TTL_SECONDS + REVALIDATE_RETRY_SECONDS
+            logger.warning("incident types revalidation failed", exc_info=True)
+        finally:
+            with self._lock:
+                self._revalidating = False
+
+        if changed:
+            # Queued to the pages' (GUI) thread
+            events().notify("incident_types_changed")
+
+    def _get(self, key: str, scope: str, ttl: float, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        if not key_lock.acquire(blocking=False):
+            with self._lock:
+                self.stats.waits += 1
+            key_lock.acquire()
+
+        try:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.scope == scope and time.monotonic() - entry.loaded_at < ttl:
+                    self.stats.hits += 1
+                    return entry.value
+                generation = self._generation.get(key, 0)
+
+            value = loader()
+
+            with self._lock:
+                self.stats.loads += 1
+                # Don't cache a result that was invalidated while it was loading
+                if self._generation.get(key, 0) == generation:
+                    self._entries[key] = _Entry(scope=scope, value=value, loaded_at=time.monotonic())
+            return value
+        finally:
+            key_lock.release()
+
+    # -------------------------
+    # invalidation
+    # -------------------------
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            keys = [key] if key else list(self._entries.keys() | self._generation.keys())
+            for k in keys:
+                self._entries.pop(k, None)
+                self._generation[k] = self._generation.get(k, 0) + 1
+            self.stats.invalidations += 1
+
+    def stats_snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return asdict(self.stats)
+
+
+_store: ReferenceDataStore | None = None
+
+
+def reference_data() -> ReferenceDataStore:
+    """
+    Process-wide store. Create it before any page subscribes to the events so its
+    invalidation runs ahead of the pages' reloads (Qt calls slots in connection order).
+    """
+    global _store
+    if _store is None:
+        store = ReferenceDataStore()
+        events().company_clients_changed.connect(lambda: store.invalidate(KEY_COMPANY_CLIENTS))
+        _store = store
+    return _store
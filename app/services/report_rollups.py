@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.paths import local_data_dir
+from app.core.session import AppSession
+from app.repositories.reports_repo import ReportIncidentRow, ReportsRepo
+
+
+# Trailing days (by received_day) rebuilt from raw incidents on every refresh.
+# This is what picks up deletes, which the created_at watermark cannot see.
+RECONCILE_DAYS = 14
+
+
+@dataclass(frozen=True, slots=True)
+class RollupCount:
+    day: date
+    company_client_id: str
+    company_client_name: str
+    incident_type_code: str
+    incident_type_name: str
+    count: int
+
+
+_SCHEMA = """
+create table if not exists rollup_daily (
+  firm_id text not null,
+  day text not null,
+  company_client_id text not null,
+  company_client_name text not null,
+  worker_national_id text not null,
+  worker_full_name text not null,
+  incident_type_code text not null,
+  incident_type_name text not null,
+  n integer not null,
+  primary key (firm_id, day, company_client_id, worker_national_id, incident_type_code)
+);
+
+create index if not exists idx_rollup_daily_firm_client_day
+  on rollup_daily(firm_id, company_client_id, day);
+
+create table if not exists rollup_state (
+  firm_id text primary key,
+  covered_from text not null,
+  covered_to text not null,
+  max_created_at text not null
+);
+"""
+
+_UPSERT_ADD = """
+insert into rollup_daily (
+  firm_id, day, company_client_id, company_client_name,
+  worker_national_id, worker_full_name, incident_type_code, incident_type_name, n
+) values (?, ?, ?, ?, ?, ?, ?, ?, ?)
+on conflict (firm_id, day, company_client_id, worker_national_id, incident_type_code)
+do update set
+  n = n + excluded.n,
+  company_client_name = excluded.company_client_name,
+  worker_full_name = excluded.worker_full_name,
+  incident_type_name = excluded.incident_type_name
+"""
+
+_CubeKey = Tuple[str, str, str, str, str, str, str]
+
+
+def _group(rows: Iterable[ReportIncidentRow]) -> Dict[_CubeKey, int]:
+    counts: Dict[_CubeKey, int] = {}
+    for r in rows:
+        t, w = r.incident_type, r.worker
+        key = (
+            r.received_day.isoformat(),
+            w.company_client_id,
+            w.company_client_name,
+            w.national_id,
+            w.full_name,
+            t.code,
+            t.name,
+        )
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class ReportRollupStore:
+    """
+    Local day x client x worker x type -> count cube, persisted in SQLite.
+
+    The covered day range only grows: missing days are filled from raw incidents,
+    new inserts are folded in by created_at watermark, and the trailing
+    RECONCILE_DAYS are rebuilt to pick up deletes.
+    """
+
+    def __init__(self, firm_id: str, db_path: Optional[Path] = None) -> None:
+        self._firm_id = firm_id
+        self._db_path = db_path or (local_data_dir() / "report_rollups.sqlite3")
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    @staticmethod
+    def for_current_firm() -> "ReportRollupStore":
+        return ReportRollupStore(AppSession.require().firm_id)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(self._db_path)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # -------------------------
+    # state
+    # -------------------------
+    def _state(self, con: sqlite3.Connection) -> Optional[Tuple[date, date, str]]:
+        row = con.execute(
+            "select covered_from, covered_to, max_created_at from rollup_state where firm_id = ?",
+            (self._firm_id,),
+        ).fetchone()
+        if not row:
+            return None
+        return date.fromisoformat(row[0]), date.fromisoformat(row[1]), str(row[2])
+
+    def _save_state(self, con: sqlite3.Connection, covered_from: date, covered_to: date, max_created_at: str) -> None:
+        con.execute(
+            "insert into rollup_state (firm_id, covered_from, covered_to, max_created_at) values (?, ?, ?, ?) "
+            "on conflict (firm_id) do update set covered_from = excluded.covered_from, "
+            "covered_to = excluded.covered_to, max_created_at = excluded.max_created_at",
+            (self._firm_id, covered_from.isoformat(), covered_to.isoformat(), max_created_at),
+        )
+
+    # -------------------------
+    # writes
+    # -------------------------
+    def _add(self, con: sqlite3.Connection, rows: Iterable[ReportIncidentRow]) -> None:
+        con.executemany(
+            _UPSERT_ADD,
+            [(self._firm_id, *key, n) for key, n in _group(rows).items()],
+        )
+
+    def _rebuild_days(self, con: sqlite3.Connection, date_from: date, date_to: date) -> str:
+        """Replace [date_from, date_to] with fresh counts. Returns the max created_at seen."""
+        rows, max_created = ReportsRepo.list_incidents_for_rollups(date_from=date_from, date_to=date_to)
+        con.execute(
+            "delete from rollup_daily where firm_id = ? and day between ? and ?",
+            (self._firm_id, date_from.isoformat(), date_to.isoformat()),
+        )
+        self._add(con, rows)
+        return max_created
+
+    def refresh(self, date_from: date, date_to: date) -> None:
+        """Make sure [date_from, date_to] is covered and up to date."""
+        with self._connect() as con:
+            state = self._state(con)
+
+            if state is None:
+                max_created = self._rebuild_days(con, date_from, date_to)
+                covered_from, covered_to = date_from, date_to
+            else:
+                covered_from, covered_to, max_created = state
+
+                # New inserts inside the already covered range
+                delta, seen = ReportsRepo.list_incidents_created_after(
+                    created_after=max_created or "1970-01-01T00:00:00+00:00",
+                    date_from=covered_from,
+                    date_to=covered_to,
+                )
+                self._add(con, delta)
+                max_created = max(max_created, seen)
+
+                # Grow the covered range
+                if date_from < covered_from:
+                    seen = self._rebuild_days(con, date_from, covered_from - timedelta(days=1))
+                    max_created = max(max_created, seen)
+                    covered_from = date_from
+                if date_to > covered_to:
+                    seen = self._rebuild_days(con, covered_to + timedelta(days=1), date_to)
+                    max_created = max(max_created, seen)
+                    covered_to = date_to
+
+                # Reconcile the trailing window (deletes, late edits)
+                window_from = max(covered_from, covered_to - timedelta(days=RECONCILE_DAYS - 1))
+                seen = self._rebuild_days(con, window_from, covered_to)
+                max_created = max(max_created, seen)
+
+            self._save_state(con, covered_from, covered_to, max_created)
+
+    def clear(self) -> None:
+        with self._connect() as con:
+            con.execute("delete from rollup_daily where firm_id = ?", (self._firm_id,))
+            con.execute("delete from rollup_state where firm_id = ?", (self._firm_id,))
+
+    # -------------------------
+    # reads
+    # -------------------------
+    def counts(
+        self,
+        *,
+        date_from: date,
+        date_to: date,
+        company_client_id: Optional[str] = None,
+    ) -> List[RollupCount]:
+        """Day x client x type counts (workers summed) for the range."""
+        sql = (
+            "select day, company_client_id, max(company_client_name), incident_type_code, "
+            "max(incident_type_name), sum(n) "
+            "from rollup_daily where firm_id = ? and day between ? and ?"
+        )
+        params: List[str] = [self._firm_id, date_from.isoformat(), date_to.isoformat()]
+        if company_client_id:
+            sql += " and company_client_id = ?"
+            params.append(company_client_id)
+        sql += " group by day, company_client_id, incident_type_code order by day"
+
+        with self._connect() as con:
+            return [
+                RollupCount(
+                    day=date.fromisoformat(day),
+                    company_client_id=cc_id,
+                    company_client_name=cc_name,
+                    incident_type_code=code,
+                    incident_type_name=name,
+                    count=int(n),
+                )
+                for day, cc_id, cc_name, code, name, n in con.execute(sql, params)
+            ]
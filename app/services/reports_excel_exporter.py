@@ -1,15 +1,15 @@
 from __future__ import annotations
 
+import os
 import re
 from collections import defaultdict
 from dataclasses import dataclass
-from datetime import date
-from typing import Dict, List, Tuple
-
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from app.repositories.reports_repo import ReportIncidentRow
+from app.services.report_rollups import RollupCount
+from app.services.xlsx_writers import WorkbookWriter, choose_backend, open_workbook_writer
 
 
 SPANISH_MONTHS = [
@@ -33,16 +33,22 @@ def format_date_es(d: date) -> str:
     return f"{d.day} de {SPANISH_MONTHS[d.month]} de {d.year}"
 
 
-def _auto_fit(ws) -> None:
-    for col in range(1, ws.max_column + 1):
-        max_len = 0
-        col_letter = get_column_letter(col)
-        for row in range(1, ws.max_row + 1):
-            v = ws.cell(row=row, column=col).value
+Cell = object
+SheetRows = Iterable[List[Cell]]
+
+
+def _column_widths(rows: SheetRows) -> List[int]:
+    widths: List[int] = []
+    for row in rows:
+        for i, v in enumerate(row):
             if v is None:
                 continue
-            max_len = max(max_len, len(str(v)))
-        ws.column_dimensions[col_letter].width = min(max_len + 2, 60)
+            n = len(str(v))
+            if i >= len(widths):
+                widths.extend([0] * (i + 1 - len(widths)))
+            if n > widths[i]:
+                widths[i] = n
+    return [min(n + 2, 60) for n in widths]
 
 
 _sheet_bad = re.compile(r"[\[\]\:\*\?\/\\]+")
@@ -54,6 +60,58 @@ def _safe_sheet_name(name: str) -> str:
     return s[:31] if len(s) > 31 else s
 
 
+# Progress callback: (phase, done, total). Phases are "aggregate" and the sheet names.
+ProgressCallback = Callable[[str, int, int], None]
+CancelCheck = Callable[[], bool]
+
+# Months covered by the "Tendencia" sheets, ending at the report's date_to
+TREND_MONTHS = 12
+
+# How many detail rows are written between progress/cancel checks
+DETAIL_PROGRESS_EVERY = 5000
+
+# Excel's hard limit per worksheet
+EXCEL_MAX_ROWS = 1_048_576
+
+# Report header (4 rows) + column header row on every sheet
+_DETAIL_HEADER_ROWS = 5
+
+# Incidents per "Detalle" sheet; larger exports spill into "Detalle (1)", "Detalle (2)", ...
+DETAIL_ROWS_PER_SHEET = EXCEL_MAX_ROWS - _DETAIL_HEADER_ROWS
+
+_DETAIL_COLUMNS = [
+    "Cliente",
+    "Trabajador",
+    "Cédula",
+    "Tipo (código)",
+    "Tipo (nombre)",
+    "received_day",
+]
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def trend_start(date_to: date) -> date:
+    """First day of the month TREND_MONTHS - 1 months before date_to."""
+    months = date_to.year * 12 + (date_to.month - 1) - (TREND_MONTHS - 1)
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def previous_period(date_from: date, date_to: date) -> Tuple[date, date]:
+    """Range of the same length right before [date_from, date_to]."""
+    length = (date_to - date_from).days + 1
+    prev_to = date_from - timedelta(days=1)
+    return prev_to - timedelta(days=length - 1), prev_to
+
+
+def _variation_pct(current: int, previous: int):
+    if previous == 0:
+        return ""
+    return round((current - previous) * 100.0 / previous, 1)
+
+
 @dataclass(frozen=True)
 class ReportsMetadata:
     date_from: date
@@ -61,117 +119,363 @@ class ReportsMetadata:
     client_name: str
 
 
+@dataclass(frozen=True)
+class ReportTrends:
+    """Counts read from the local rollups (see ReportRollupStore)."""
+
+    trend_from: date
+    counts: List[RollupCount]
+    previous_from: date
+    previous_to: date
+    previous_counts: List[RollupCount]
+
+
+@dataclass
+class ReportAggregates:
+    by_type: Dict[Tuple[str, str], int]
+    type_list: List[Tuple[str, str]]
+    by_worker: Dict[Tuple[str, str, str], Dict[str, int]]
+    worker_totals: Dict[Tuple[str, str, str], int]
+    by_client: Dict[str, int]
+
+
 class ReportsExcelExporter:
+    SHEET_POR_TIPO = "Resumen - Por tipo"
+    SHEET_POR_TRABAJADOR = "Resumen - Por trabajador"
+    SHEET_POR_CLIENTE = "Resumen - Por cliente"
+    SHEET_TENDENCIA_MES = "Tendencia - Por mes"
+    SHEET_TENDENCIA_SEMANA = "Tendencia - Por semana"
+    SHEET_COMPARATIVO = "Comparativo"
+    SHEET_DETALLE = "Detalle"
+
     @staticmethod
     def build_workbook(
         *,
         incidents: List[ReportIncidentRow],
         meta: ReportsMetadata,
-    ) -> Workbook:
-        wb = Workbook()
-        default = wb.active
-        wb.remove(default)
-
-        ReportsExcelExporter._sheet_resumen_por_tipo(wb, incidents, meta)
-        ReportsExcelExporter._sheet_resumen_por_trabajador(wb, incidents, meta)
-        ReportsExcelExporter._sheet_resumen_por_cliente(wb, incidents, meta)
-        ReportsExcelExporter._sheet_detalle(wb, incidents, meta)
+        on_progress: Optional[ProgressCallback] = None,
+        is_cancelled: Optional[CancelCheck] = None,
+        trends: Optional[ReportTrends] = None,
+        detail_rows_per_sheet: int = DETAIL_ROWS_PER_SHEET,
+        backend: Optional[str] = None,
+    ) -> WorkbookWriter:
+        """
+        Streams the report through a WorkbookWriter (see xlsx_writers): rows go
+        straight to the backend's temp files instead of being kept as cells.
+        backend is "openpyxl", "xlsxwriter" or "auto" (default, by row count).
+        Call save(path) on the result.
+        """
+        if not 0 < detail_rows_per_sheet <= DETAIL_ROWS_PER_SHEET:
+            raise ValueError(f"detail_rows_per_sheet must be between 1 and {DETAIL_ROWS_PER_SHEET}.")
+
+        def progress(phase: str, done: int, total: int) -> None:
+            if is_cancelled is not None and is_cancelled():
+                raise ExportCancelled()
+            if on_progress is not None:
+                on_progress(phase, done, total)
+
+        total = len(incidents)
+
+        progress("aggregate", 0, total)
+        agg = ReportsExcelExporter.aggregate(incidents)
+        progress("aggregate", total, total)
+
+        wb = open_workbook_writer(choose_backend(total, backend))
+        try:
+            ReportsExcelExporter._write_all(wb, incidents, agg, meta, progress, trends, detail_rows_per_sheet)
+        except BaseException:
+            wb.discard()
+            raise
 
         return wb
 
     @staticmethod
-    def _add_report_header(ws, meta: ReportsMetadata) -> None:
-        ws.append(["Reporte de incidencias"])
-        ws.append(["Rango (received_day):", format_date_es(meta.date_from), "a", format_date_es(meta.date_to)])
-        ws.append(["Cliente:", meta.client_name])
-        ws.append([])
+    def _write_all(
+        wb: WorkbookWriter,
+        incidents: List[ReportIncidentRow],
+        agg: ReportAggregates,
+        meta: ReportsMetadata,
+        progress: ProgressCallback,
+        trends: Optional[ReportTrends],
+        detail_rows_per_sheet: int,
+    ) -> None:
+        progress(ReportsExcelExporter.SHEET_POR_TIPO, 0, len(agg.by_type))
+        ReportsExcelExporter._sheet_resumen_por_tipo(wb, agg, meta)
+
+        progress(ReportsExcelExporter.SHEET_POR_TRABAJADOR, 0, len(agg.by_worker))
+        ReportsExcelExporter._sheet_resumen_por_trabajador(wb, agg, meta)
+
+        progress(ReportsExcelExporter.SHEET_POR_CLIENTE, 0, len(agg.by_client))
+        ReportsExcelExporter._sheet_resumen_por_cliente(wb, agg, meta)
+
+        if trends is not None:
+            progress(ReportsExcelExporter.SHEET_TENDENCIA_MES, 0, len(trends.counts))
+            ReportsExcelExporter._sheet_tendencia_por_mes(wb, trends, meta)
+
+            progress(ReportsExcelExporter.SHEET_TENDENCIA_SEMANA, 0, len(trends.counts))
+            ReportsExcelExporter._sheet_tendencia_por_semana(wb, trends, meta)
+
+            progress(ReportsExcelExporter.SHEET_COMPARATIVO, 0, len(trends.previous_counts))
+            ReportsExcelExporter._sheet_comparativo(wb, agg, trends, meta)
+
+        ReportsExcelExporter._sheets_detalle(wb, incidents, meta, progress, detail_rows_per_sheet)
 
     @staticmethod
-    def _sheet_resumen_por_tipo(wb: Workbook, incidents: List[ReportIncidentRow], meta: ReportsMetadata) -> None:
-        ws = wb.create_sheet(_safe_sheet_name("Resumen - Por tipo"))
-        ReportsExcelExporter._add_report_header(ws, meta)
+    def aggregate(incidents: List[ReportIncidentRow]) -> ReportAggregates:
+        by_type: Dict[Tuple[str, str], int] = defaultdict(int)
+        by_worker: Dict[Tuple[str, str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        worker_totals: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        by_client: Dict[str, int] = defaultdict(int)
 
-        counts: Dict[Tuple[str, str], int] = defaultdict(int)
         for r in incidents:
-            counts[(r.incident_type_code, r.incident_type_name)] += 1
+            t, w = r.incident_type, r.worker
+            by_type[(t.code, t.name)] += 1
 
-        ws.append(["Código tipo", "Tipo", "Cantidad"])
-        for (code, name), n in sorted(counts.items(), key=lambda x: (x[0][0], x[0][1])):
-            ws.append([code, name, n])
+            wk = (w.company_client_name, w.full_name, w.national_id)
+            by_worker[wk][t.code] += 1
+            worker_totals[wk] += 1
 
-        _auto_fit(ws)
+            by_client[w.company_client_name] += 1
 
-    @staticmethod
-    def _sheet_resumen_por_trabajador(wb: Workbook, incidents: List[ReportIncidentRow], meta: ReportsMetadata) -> None:
-        ws = wb.create_sheet(_safe_sheet_name("Resumen - Por trabajador"))
-        ReportsExcelExporter._add_report_header(ws, meta)
+        type_list = sorted(by_type.keys(), key=lambda x: (x[0], x[1]))
 
-        type_list = sorted(
-            {(r.incident_type_code, r.incident_type_name) for r in incidents},
-            key=lambda x: (x[0], x[1]),
+        return ReportAggregates(
+            by_type=by_type,
+            type_list=type_list,
+            by_worker=by_worker,
+            worker_totals=worker_totals,
+            by_client=by_client,
         )
 
-        by_worker: Dict[Tuple[str, str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
-        totals: Dict[Tuple[str, str, str], int] = defaultdict(int)
+    @staticmethod
+    def _write_sheet(wb: WorkbookWriter, title: str, rows: List[List[Cell]]) -> None:
+        ws = wb.add_sheet(_safe_sheet_name(title))
+        ws.set_widths(_column_widths(rows))
+        for row in rows:
+            ws.append(row)
 
-        for r in incidents:
-            wk = (r.company_client_name, r.worker_full_name, r.worker_national_id)
-            by_worker[wk][r.incident_type_code] += 1
-            totals[wk] += 1
+    @staticmethod
+    def _report_header(meta: ReportsMetadata) -> List[List[Cell]]:
+        return [
+            ["Reporte de incidencias"],
+            ["Rango (received_day):", format_date_es(meta.date_from), "a", format_date_es(meta.date_to)],
+            ["Cliente:", meta.client_name],
+            [],
+        ]
+
+    @staticmethod
+    def _trend_header(title: str, date_from: date, date_to: date) -> List[List[Cell]]:
+        return [
+            [title, format_date_es(date_from), "a", format_date_es(date_to)],
+            [],
+        ]
+
+    @staticmethod
+    def _sheet_resumen_por_tipo(wb: WorkbookWriter, agg: ReportAggregates, meta: ReportsMetadata) -> None:
+        rows = ReportsExcelExporter._report_header(meta)
+
+        rows.append(["Código tipo", "Tipo", "Cantidad"])
+        for (code, name), n in sorted(agg.by_type.items(), key=lambda x: (x[0][0], x[0][1])):
+            rows.append([code, name, n])
+
+        ReportsExcelExporter._write_sheet(wb, ReportsExcelExporter.SHEET_POR_TIPO, rows)
+
+    @staticmethod
+    def _sheet_resumen_por_trabajador(wb: WorkbookWriter, agg: ReportAggregates, meta: ReportsMetadata) -> None:
+        rows = ReportsExcelExporter._report_header(meta)
 
-        header = ["Cliente", "Trabajador", "Cédula", "Total"] + [f"{code}" for code, _ in type_list]
-        ws.append(header)
+        rows.append(["Cliente", "Trabajador", "Cédula", "Total"] + [f"{code}" for code, _ in agg.type_list])
 
-        for wk in sorted(by_worker.keys(), key=lambda x: (x[0], x[1], x[2])):
+        for wk in sorted(agg.by_worker.keys(), key=lambda x: (x[0], x[1], x[2])):
             client_name, worker_name, nat_id = wk
-            row = [client_name, worker_name, nat_id, totals[wk]]
-            for code, _ in type_list:
-                row.append(by_worker[wk].get(code, 0))
-            ws.append(row)
+            row: List[Cell] = [client_name, worker_name, nat_id, agg.worker_totals[wk]]
+            for code, _ in agg.type_list:
+                row.append(agg.by_worker[wk].get(code, 0))
+            rows.append(row)
 
-        _auto_fit(ws)
+        ReportsExcelExporter._write_sheet(wb, ReportsExcelExporter.SHEET_POR_TRABAJADOR, rows)
 
     @staticmethod
-    def _sheet_resumen_por_cliente(wb: Workbook, incidents: List[ReportIncidentRow], meta: ReportsMetadata) -> None:
-        ws = wb.create_sheet(_safe_sheet_name("Resumen - Por cliente"))
-        ReportsExcelExporter._add_report_header(ws, meta)
+    def _sheet_resumen_por_cliente(wb: WorkbookWriter, agg: ReportAggregates, meta: ReportsMetadata) -> None:
+        rows = ReportsExcelExporter._report_header(meta)
 
-        counts: Dict[str, int] = defaultdict(int)
-        for r in incidents:
-            counts[r.company_client_name] += 1
+        rows.append(["Cliente", "Cantidad"])
+        for client, n in sorted(agg.by_client.items(), key=lambda x: x[0]):
+            rows.append([client, n])
 
-        ws.append(["Cliente", "Cantidad"])
-        for client, n in sorted(counts.items(), key=lambda x: x[0]):
-            ws.append([client, n])
+        ReportsExcelExporter._write_sheet(wb, ReportsExcelExporter.SHEET_POR_CLIENTE, rows)
 
-        _auto_fit(ws)
+    @staticmethod
+    def _trend_types(counts: List[RollupCount]) -> List[str]:
+        return sorted({c.incident_type_code for c in counts})
 
     @staticmethod
-    def _sheet_detalle(wb: Workbook, incidents: List[ReportIncidentRow], meta: ReportsMetadata) -> None:
-        ws = wb.create_sheet(_safe_sheet_name("Detalle"))
-        ReportsExcelExporter._add_report_header(ws, meta)
+    def _sheet_tendencia_por_mes(wb: WorkbookWriter, trends: ReportTrends, meta: ReportsMetadata) -> None:
+        rows = ReportsExcelExporter._report_header(meta)
+        rows += ReportsExcelExporter._trend_header("Ventana:", trends.trend_from, meta.date_to)
 
-        ws.append(
-            [
-                "Cliente",
-                "Trabajador",
-                "Cédula",
-                "Tipo (código)",
-                "Tipo (nombre)",
-                "received_day",
-            ]
-        )
+        codes = ReportsExcelExporter._trend_types(trends.counts)
 
-        for r in incidents:
-            ws.append(
-                [
-                    r.company_client_name,
-                    r.worker_full_name,
-                    r.worker_national_id,
-                    r.incident_type_code,
-                    r.incident_type_name,
-                    format_date_es(r.received_day),
-                ]
+        buckets: Dict[Tuple[int, int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for c in trends.counts:
+            buckets[(c.day.year, c.day.month)][c.incident_type_code] += c.count
+
+        rows.append(["Mes", "Total"] + codes)
+
+        y, m = trends.trend_from.year, trends.trend_from.month
+        while (y, m) <= (meta.date_to.year, meta.date_to.month):
+            per_type = buckets.get((y, m), {})
+            rows.append([f"{SPANISH_MONTHS[m]} {y}", sum(per_type.values())] + [per_type.get(code, 0) for code in codes])
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+        ReportsExcelExporter._write_sheet(wb, ReportsExcelExporter.SHEET_TENDENCIA_MES, rows)
+
+    @staticmethod
+    def _sheet_tendencia_por_semana(wb: WorkbookWriter, trends: ReportTrends, meta: ReportsMetadata) -> None:
+        rows = ReportsExcelExporter._report_header(meta)
+        rows += ReportsExcelExporter._trend_header("Ventana:", trends.trend_from, meta.date_to)
+
+        codes = ReportsExcelExporter._trend_types(trends.counts)
+
+        buckets: Dict[date, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for c in trends.counts:
+            monday = c.day - timedelta(days=c.day.weekday())
+            buckets[monday][c.incident_type_code] += c.count
+
+        rows.append(["Semana", "Desde", "Total"] + codes)
+
+        monday = trends.trend_from - timedelta(days=trends.trend_from.weekday())
+        while monday <= meta.date_to:
+            iso_year, iso_week, _ = monday.isocalendar()
+            per_type = buckets.get(monday, {})
+            rows.append(
+                [f"{iso_year}-S{iso_week:02d}", format_date_es(monday), sum(per_type.values())]
+                + [per_type.get(code, 0) for code in codes]
             )
+            monday += timedelta(days=7)
+
+        ReportsExcelExporter._write_sheet(wb, ReportsExcelExporter.SHEET_TENDENCIA_SEMANA, rows)
+
+    @staticmethod
+    def _sheet_comparativo(
+        wb: WorkbookWriter,
+        agg: ReportAggregates,
+        trends: ReportTrends,
+        meta: ReportsMetadata,
+    ) -> None:
+        rows = ReportsExcelExporter._report_header(meta)
+        rows += ReportsExcelExporter._trend_header("Periodo anterior:", trends.previous_from, trends.previous_to)
+
+        prev_by_type: Dict[Tuple[str, str], int] = defaultdict(int)
+        prev_by_client: Dict[str, int] = defaultdict(int)
+        for c in trends.previous_counts:
+            prev_by_type[(c.incident_type_code, c.incident_type_name)] += c.count
+            prev_by_client[c.company_client_name] += c.count
+
+        rows.append(["Código tipo", "Tipo", "Actual", "Anterior", "Diferencia", "Variación %"])
+        for code, name in sorted(set(agg.by_type) | set(prev_by_type), key=lambda x: (x[0], x[1])):
+            cur = agg.by_type.get((code, name), 0)
+            prev = prev_by_type.get((code, name), 0)
+            rows.append([code, name, cur, prev, cur - prev, _variation_pct(cur, prev)])
+
+        rows.append([])
+
+        rows.append(["Cliente", "Actual", "Anterior", "Diferencia", "Variación %"])
+        for client in sorted(set(agg.by_client) | set(prev_by_client)):
+            cur = agg.by_client.get(client, 0)
+            prev = prev_by_client.get(client, 0)
+            rows.append([client, cur, prev, cur - prev, _variation_pct(cur, prev)])
 
-        _auto_fit(ws)
\ No newline at end of file
+        ReportsExcelExporter._write_sheet(wb, ReportsExcelExporter.SHEET_COMPARATIVO, rows)
+
+    @staticmethod
+    def detail_sheet_names(total: int, rows_per_sheet: int = DETAIL_ROWS_PER_SHEET) -> List[str]:
+        shards = max(1, -(-total // rows_per_sheet))
+        if shards == 1:
+            return [ReportsExcelExporter.SHEET_DETALLE]
+        return [f"{ReportsExcelExporter.SHEET_DETALLE} ({i})" for i in range(1, shards + 1)]
+
+    @staticmethod
+    def _detail_rows(incidents: List[ReportIncidentRow], start: int, stop: int) -> Iterator[List[Cell]]:
+        # received_day repeats a lot; format each distinct date once
+        dates: Dict[date, str] = {}
+        for i in range(start, stop):
+            r = incidents[i]
+            day = dates.get(r.received_day)
+            if day is None:
+                day = dates[r.received_day] = format_date_es(r.received_day)
+            t, w = r.incident_type, r.worker
+            yield [
+                w.company_client_name,
+                w.full_name,
+                w.national_id,
+                t.code,
+                t.name,
+                day,
+            ]
+
+    @staticmethod
+    def _sheets_detalle(
+        wb: WorkbookWriter,
+        incidents: List[ReportIncidentRow],
+        meta: ReportsMetadata,
+        progress: ProgressCallback,
+        rows_per_sheet: int,
+    ) -> None:
+        total = len(incidents)
+        header = ReportsExcelExporter._report_header(meta) + [list(_DETAIL_COLUMNS)]
+
+        for shard, title in enumerate(ReportsExcelExporter.detail_sheet_names(total, rows_per_sheet)):
+            start = shard * rows_per_sheet
+            stop = min(start + rows_per_sheet, total)
+            count = stop - start
+
+            progress(title, 0, count)
+
+            ws = wb.add_sheet(_safe_sheet_name(title))
+
+            # Two cheap passes over the slice: widths first, then the streamed rows
+            widths = _column_widths(header)
+            body = _column_widths(ReportsExcelExporter._detail_rows(incidents, start, stop))
+            ws.set_widths([max(a, b) for a, b in zip(widths, body)] + widths[len(body):])
+
+            for row in header:
+                ws.append(row)
+
+            for i, row in enumerate(ReportsExcelExporter._detail_rows(incidents, start, stop), start=1):
+                ws.append(row)
+                if i % DETAIL_PROGRESS_EVERY == 0:
+                    progress(title, i, count)
+
+            progress(title, count, count)
+
+
+def export_workbook_file(
+    path: str,
+    incidents: List[ReportIncidentRow],
+    meta: ReportsMetadata,
+    trends: Optional[ReportTrends] = None,
+    detail_rows_per_sheet: int = DETAIL_ROWS_PER_SHEET,
+    backend: Optional[str] = None,
+) -> int:
+    """
+    Builds and saves one workbook. Module-level so it can run in a process pool
+    (see ReportExportJob's per-client mode). Returns the number of incidents written.
+    """
+    wb = ReportsExcelExporter.build_workbook(
+        incidents=incidents,
+        meta=meta,
+        trends=trends,
+        detail_rows_per_sheet=detail_rows_per_sheet,
+        backend=backend,
+    )
+    try:
+        wb.save(path)
+    except BaseException:
+        # Don't leave a half-written workbook behind
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return len(incidents)
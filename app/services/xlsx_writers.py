@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import Any, List, Optional, Protocol
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+try:
+    import xlsxwriter
+except ImportError:  # optional backend
+    xlsxwriter = None
+
+
+BACKEND_OPENPYXL = "openpyxl"
+BACKEND_XLSXWRITER = "xlsxwriter"
+BACKEND_AUTO = "auto"
+
+# In "auto" mode, exports with at least this many rows use xlsxwriter (when installed)
+AUTO_XLSXWRITER_MIN_ROWS = 50_000
+
+
+class SheetWriter(Protocol):
+    def set_widths(self, widths: List[int]) -> None: ...
+
+    def append(self, row: List[Any]) -> None: ...
+
+
+class WorkbookWriter(Protocol):
+    backend: str
+
+    def add_sheet(self, title: str) -> SheetWriter: ...
+
+    def sheet_names(self) -> List[str]: ...
+
+    def save(self, path: str) -> None: ...
+
+    def discard(self) -> None: ...
+
+
+# -------------------------
+# openpyxl (write-only)
+# -------------------------
+class _OpenpyxlSheet:
+    def __init__(self, ws) -> None:
+        self._ws = ws
+
+    def set_widths(self, widths: List[int]) -> None:
+        # Write-only sheets need their widths before the first row is appended
+        for i, width in enumerate(widths, start=1):
+            self._ws.column_dimensions[get_column_letter(i)].width = width
+
+    def append(self, row: List[Any]) -> None:
+        self._ws.append(row)
+
+
+class OpenpyxlWorkbookWriter:
+    backend = BACKEND_OPENPYXL
+
+    def __init__(self) -> None:
+        self._wb = Workbook(write_only=True)
+
+    def add_sheet(self, title: str) -> SheetWriter:
+        return _OpenpyxlSheet(self._wb.create_sheet(title))
+
+    def sheet_names(self) -> List[str]:
+        return list(self._wb.sheetnames)
+
+    def save(self, path: str) -> None:
+        self._wb.save(path)
+
+    def discard(self) -> None:
+        # Write-only sheets stream into temp files that only save() (or process exit) removes
+        for ws in self._wb.worksheets:
+            writer = getattr(ws, "_writer", None)
+            if writer is None:
+                continue
+            try:
+                rows = getattr(ws, "_rows", None)
+                if rows is not None:
+                    rows.close()
+                writer.close()
+                writer.cleanup()
+            except Exception:
+                pass
+
+
+# -------------------------
+# xlsxwriter (constant_memory)
+# -------------------------
+class _XlsxWriterSheet:
+    def __init__(self, ws) -> None:
+        self._ws = ws
+        self._row = 0
+
+    def set_widths(self, widths: List[int]) -> None:
+        for i, width in enumerate(widths):
+            self._ws.set_column(i, i, width)
+
+    def append(self, row: List[Any]) -> None:
+        for col, value in enumerate(row):
+            if value is None or value == "":
+                continue
+            self._ws.write(self._row, col, value)
+        self._row += 1
+
+
+class XlsxWriterWorkbookWriter:
+    """
+    xlsxwriter needs its target file up front, so the workbook is written to a
+    temp file and moved into place on save().
+    """
+
+    backend = BACKEND_XLSXWRITER
+
+    def __init__(self) -> None:
+        if xlsxwriter is None:
+            raise RuntimeError("The xlsxwriter backend requires the XlsxWriter package.")
+
+        fd, self._tmp_path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        self._wb = xlsxwriter.Workbook(
+            self._tmp_path,
+            # Plain strings, as openpyxl writes them (no auto-hyperlinks, no per-sheet URL cap)
+            {"constant_memory": True, "strings_to_urls": False},
+        )
+        self._names: List[str] = []
+
+    def add_sheet(self, title: str) -> SheetWriter:
+        self._names.append(title)
+        return _XlsxWriterSheet(self._wb.add_worksheet(title))
+
+    def sheet_names(self) -> List[str]:
+        return list(self._names)
+
+    def save(self, path: str) -> None:
+        self._wb.close()
+        shutil.move(self._tmp_path, path)
+
+    def discard(self) -> None:
+        try:
+            self._wb.close()
+        except Exception:
+            pass
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def choose_backend(rows: int, preferred: Optional[str] = None) -> str:
+    """
+    preferred (or HRDOCS_XLSX_BACKEND) may be "openpyxl", "xlsxwriter" or "auto".
+    "auto" picks xlsxwriter for large exports when it is installed.
+    """
+    name = (preferred or os.getenv("HRDOCS_XLSX_BACKEND", "") or BACKEND_AUTO).strip().lower()
+
+    if name == BACKEND_OPENPYXL:
+        return BACKEND_OPENPYXL
+    if name == BACKEND_XLSXWRITER:
+        if xlsxwriter is None:
+            raise RuntimeError("The xlsxwriter backend requires the XlsxWriter package.")
+        return BACKEND_XLSXWRITER
+    if name != BACKEND_AUTO:
+        raise ValueError(f"Unknown xlsx backend: {name}")
+
+    if xlsxwriter is not None and rows >= AUTO_XLSXWRITER_MIN_ROWS:
+        return BACKEND_XLSXWRITER
+    return BACKEND_OPENPYXL
+
+
+def open_workbook_writer(backend: str) -> WorkbookWriter:
+    if backend == BACKEND_XLSXWRITER:
+        return XlsxWriterWorkbookWriter()
+    return OpenpyxlWorkbookWriter()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+
+from PySide6.QtCore import QObject, Signal, Slot
+from PySide6.QtWidgets import QLabel
+
+from app.db.instrumentation import bind_scope
+
+
+logger = logging.getLogger(__name__)
+
+# Page reads run here; a few at once is plenty (they mostly wait on the network)
+LOADER_THREADS = 4
+
+_pool = ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix="page-load")
+
+
+@dataclass
+class LoaderStats:
+    started: int = 0
+    completed: int = 0
+    failed: int = 0
+    stale_dropped: int = 0
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, LoaderStats] = {}
+
+
+def _count(name: str, field: str) -> None:
+    with _stats_lock:
+        st = _stats.setdefault(name, LoaderStats())
+        setattr(st, field, getattr(st, field) + 1)
+
+
+def stats_snapshot() -> Dict[str, Dict[str, int]]:
+    with _stats_lock:
+        return {k: asdict(v) for k, v in _stats.items()}
+
+
+class _Job:
+    __slots__ = ("channel", "generation", "fn", "on_done", "on_error", "result", "error")
+
+    def __init__(
+        self,
+        channel: str,
+        generation: int,
+        fn: Callable[[], Any],
+        on_done: Callable[[Any], None],
+        on_error: Optional[Callable[[Exception], None]],
+    ) -> None:
+        self.channel = channel
+        self.generation = generation
+        self.fn = fn
+        self.on_done = on_done
+        self.on_error = on_error
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+
+
+class BackgroundLoader(QObject):
+    """
+    Runs a page's blocking reads on a shared thread pool; results come back
+    on the GUI thread (queued signal).
+    - Loads go through named channels ("rows", "clients", ...). Starting a
+      load bumps its channel's generation, so a slow older response is dropped
+      instead of overwriting a newer filter's results.
+    - busy_changed(bool) drives the page's loading state.
+    - Owned by the page (QObject parent): once the page is gone, late results are dropped.
+    """
+
+    busy_changed = Signal(bool)
+    _finished = Signal(object)
+
+    def __init__(self, owner: QObject) -> None:
+        super().__init__(owner)
+        self._name = type(owner).__name__
+        self._generations: Dict[str, int] = {}
+        self._pending: Dict[str, _Job] = {}
+        # Emitted from pool threads; the receiver lives on the GUI thread, so delivery is queued
+        self._finished.connect(self._on_finished)
+
+    def load(
+        self,
+        channel: str,
+        fn: Callable[[], Any],
+        on_done: Callable[[Any], None],
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> None:
+        """Runs fn() in the background, then on_done(result) / on_error(e) here, unless superseded."""
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+        job = _Job(channel, generation, fn, on_done, on_error)
+
+        was_busy = bool(self._pending)
+        self._pending[channel] = job
+        _count(f"{self._name}.{channel}", "started")
+        _pool.submit(bind_scope(self._run), job)
+        if not was_busy:
+            self.busy_changed.emit(True)
+
+    def cancel(self, channel: str) -> None:
+        """Drops whatever `channel` has in flight."""
+        if self._pending.pop(channel, None) is None:
+            return
+        self._generations[channel] = self._generations.get(channel, 0) + 1
+        if not self._pending:
+            self.busy_changed.emit(False)
+
+    def reload_if_pending(self, channel: str) -> None:
+        """
+        The page just changed its model locally: a response already on its way
+        may predate that change, so ask again instead of applying it.
+        """
+        job = self._pending.get(channel)
+        if job is not None:
+            self.load(channel, job.fn, job.on_done, job.on_error)
+
+    def is_loading(self, channel: Optional[str] = None) -> bool:
+        return bool(self._pending) if channel is None else channel in self._pending
+
+    def _run(self, job: _Job) -> None:
+        try:
+            job.result = job.fn()
+        except Exception as e:
+            job.error = e
+        try:
+            self._finished.emit(job)
+        except RuntimeError:
+            # Owner (and this loader) already deleted
+            pass
+
+    @Slot(object)
+    def _on_finished(self, job: _Job) -> None:
+        name = f"{self._name}.{job.channel}"
+        if self._generations.get(job.channel) != job.generation:
+            _count(name, "stale_dropped")
+            return
+
+        del self._pending[job.channel]
+        if not self._pending:
+            self.busy_changed.emit(False)
+
+        if job.error is not None:
+            _count(name, "failed")
+            if job.on_error is None:
+                logger.warning("%s load failed: %s", name, job.error)
+            else:
+                job.on_error(job.error)
+            return
+
+        _count(name, "completed")
+        job.on_done(job.result)
+
+
+def loading_label(loader: BackgroundLoader) -> QLabel:
+    """Grey "Loading..." line shown while `loader` has loads in flight."""
+    label = QLabel("")
+    label.setStyleSheet("color: #666;")
+    loader.busy_changed.connect(lambda busy: label.setText("Loading..." if busy else ""))
+    return label
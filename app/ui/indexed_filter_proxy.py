@@ -0,0 +1,398 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from PySide6.QtCore import QAbstractProxyModel, QModelIndex, QObject, QPersistentModelIndex, Qt
+from PySide6.QtWidgets import QLineEdit, QTableView
+
+from app.ui.keyed_table_model import KeyedTableModel, descending_runs
+
+_TOKEN_RE = re.compile(r"\w+")
+_DISPLAY_ROLE = int(Qt.ItemDataRole.DisplayRole)
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class IndexedFilterProxyModel(QAbstractProxyModel):
+    """
+    Text filter + column sort over a KeyedTableModel, without calling data() per row.
+    - Each row's casefolded words (from the model's rendered columns) are
+      indexed once (on load / insert / change) into word -> row ids postings;
+      a query keeps rows where every query word is a prefix of one of the row's words.
+    - Sorting uses the model's precomputed sort-key column.
+    - Only the resulting id list (the row mapping) is pushed to the view.
+      Query / sort changes recompute it; source inserts, removes and changes
+      only touch the affected ids (binary search into the current order).
+    Filtering/sorting applies to the rows the source has loaded; fetchMore is forwarded.
+    """
+
+    def __init__(self, source: KeyedTableModel[Any], parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._src = source
+
+        self._row_tokens: Dict[str, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._vocab: List[str] = []
+        self._vocab_dirty = True
+
+        self._query: List[str] = []
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+
+        self._visible: List[str] = []
+        self._pos: Dict[str, int] = {}
+        # _pos is exact for proxy rows before this index
+        self._pos_from = 0
+
+        self.setSourceModel(source)
+        source.modelReset.connect(self._on_source_reset)
+        source.rowsInserted.connect(self._on_rows_inserted)
+        source.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        source.dataChanged.connect(self._on_data_changed)
+        source.layoutChanged.connect(self._on_source_layout_changed)
+        self._on_source_reset()
+
+    # -------------------------
+    # index
+    # -------------------------
+    def _index_rows(self, positions: Iterable[int]) -> None:
+        # Hot path on load: locals only (attribute access on Qt wrappers is slow)
+        src = self._src
+        columns = [src.column_values(c) for c in range(src.columnCount())]
+        id_at = src.id_at
+        findall = _TOKEN_RE.findall
+        postings = self._postings
+        row_tokens = self._row_tokens
+        new_words = False
+
+        for r in positions:
+            row_id = id_at(r)
+            if row_id in row_tokens:
+                self._unindex_row(row_id)
+            words = tuple(set(findall(" ".join([col[r] for col in columns]).casefold())))
+            row_tokens[row_id] = words
+            for w in words:
+                bucket = postings.get(w)
+                if bucket is None:
+                    postings[w] = {row_id}
+                    new_words = True
+                else:
+                    bucket.add(row_id)
+
+        if new_words:
+            self._vocab_dirty = True
+
+    def _unindex_row(self, row_id: str) -> None:
+        for w in self._row_tokens.pop(row_id, ()):
+            bucket = self._postings.get(w)
+            if bucket is None:
+                continue
+            bucket.discard(row_id)
+            if not bucket:
+                del self._postings[w]
+                self._vocab_dirty = True
+
+    def _vocabulary(self) -> List[str]:
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        return self._vocab
+
+    def _matching_ids(self) -> Optional[Set[str]]:
+        """None = no filter."""
+        if not self._query:
+            return None
+        vocab = self._vocabulary()
+        result: Optional[Set[str]] = None
+        for q in self._query:
+            ids: Set[str] = set()
+            i = bisect_left(vocab, q)
+            while i < len(vocab) and vocab[i].startswith(q):
+                ids |= self._postings[vocab[i]]
+                i += 1
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+    def _matches(self, row_id: str) -> bool:
+        """The query test for one indexed row (same rule as _matching_ids)."""
+        words = self._row_tokens.get(row_id, ())
+        return all(any(w.startswith(q) for w in words) for q in self._query)
+
+    def _sorted(self) -> bool:
+        return 0 <= self._sort_column < self._src.columnCount()
+
+    def _descending(self) -> bool:
+        return self._sort_order == Qt.SortOrder.DescendingOrder
+
+    def _compute_visible(self) -> List[str]:
+        matches = self._matching_ids()
+        ids = self._src.ids()
+        if matches is not None:
+            ids = [i for i in ids if i in matches]
+        if self._sorted():
+            keys = dict(zip(self._src.ids(), self._src.column_sort_keys(self._sort_column)))
+            ids.sort(key=keys.__getitem__, reverse=self._descending())
+        return ids
+
+    def _insert_pos(self, row_id: str) -> int:
+        """Where row_id belongs in _visible (which must not contain it): after equal keys."""
+        row_of = self._src.row_of
+        if self._sorted():
+            keys = self._src.column_sort_keys(self._sort_column)
+            key = keys[row_of(row_id)]
+            if self._descending():
+                def after(v: str) -> bool:
+                    return keys[row_of(v)] < key
+            else:
+                def after(v: str) -> bool:
+                    return keys[row_of(v)] > key
+        else:
+            row = row_of(row_id)
+
+            def after(v: str) -> bool:
+                return row_of(v) > row
+
+        visible = self._visible
+        lo, hi = 0, len(visible)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if after(visible[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    # -------------------------
+    # pushing the mapping
+    # -------------------------
+    def _set_positions(self) -> None:
+        self._pos = {row_id: i for i, row_id in enumerate(self._visible)}
+        self._pos_from = len(self._visible)
+
+    def _mark_stale(self, start: int) -> None:
+        self._pos_from = min(self._pos_from, start)
+
+    def _proxy_row(self, row_id: str) -> int:
+        p = self._pos.get(row_id)
+        if p is None:
+            return -1
+        if p >= self._pos_from:
+            visible = self._visible
+            for i in range(self._pos_from, len(visible)):
+                self._pos[visible[i]] = i
+            self._pos_from = len(visible)
+            p = self._pos[row_id]
+        return p
+
+    def _reset_to(self, ids: List[str]) -> None:
+        self.beginResetModel()
+        self._visible = ids
+        self._set_positions()
+        self.endResetModel()
+
+    def _relayout_to(self, ids: List[str]) -> None:
+        """Same rows, new order: keeps selection / current index."""
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        old_ids = [self._visible[i.row()] if 0 <= i.row() < len(self._visible) else "" for i in old]
+        self._visible = ids
+        self._set_positions()
+        self.changePersistentIndexList(
+            old,
+            [self.index(self._pos[i], p.column()) if i in self._pos else QModelIndex() for i, p in zip(old_ids, old)],
+        )
+        self.layoutChanged.emit()
+
+    def _remove_ids(self, ids: Iterable[str]) -> None:
+        """Hides the shown ones among ids, one rowsRemoved per contiguous run."""
+        for lo, hi in descending_runs(p for p in map(self._proxy_row, ids) if p >= 0):
+            self.beginRemoveRows(QModelIndex(), lo, hi)
+            for row_id in self._visible[lo:hi + 1]:
+                del self._pos[row_id]
+            del self._visible[lo:hi + 1]
+            self._mark_stale(lo)
+            self.endRemoveRows()
+
+    def _insert_ids(self, ids: List[str]) -> None:
+        """
+        Shows ids (matching, not shown yet; in source order) where the current
+        order puts them, one rowsInserted per run that lands on the same row.
+        """
+        if self._sorted():
+            keys = self._src.column_sort_keys(self._sort_column)
+            row_of = self._src.row_of
+            ids = sorted(ids, key=lambda i: keys[row_of(i)], reverse=self._descending())
+        # Non-decreasing, as ids are in the target order
+        places = [self._insert_pos(i) for i in ids]
+        end = len(ids)
+        while end > 0:
+            pos = places[end - 1]
+            start = end - 1
+            while start > 0 and places[start - 1] == pos:
+                start -= 1
+            self.beginInsertRows(QModelIndex(), pos, pos + end - start - 1)
+            self._visible[pos:pos] = ids[start:end]
+            for k in range(start, end):
+                self._pos[ids[k]] = pos + k - start
+            self._mark_stale(pos)
+            self.endInsertRows()
+            end = start
+
+    def _move_into_place(self, row_id: str) -> None:
+        """Moves a shown row whose sort key changed (rowsMoved keeps the selection on it)."""
+        p = self._proxy_row(row_id)
+        if p < 0:
+            return
+        del self._visible[p]
+        q = self._insert_pos(row_id)
+        self._visible.insert(p, row_id)
+        if q == p:
+            return
+        self.beginMoveRows(QModelIndex(), p, p, QModelIndex(), q if q < p else q + 1)
+        del self._visible[p]
+        self._visible.insert(q, row_id)
+        self._pos[row_id] = q
+        self._mark_stale(min(p, q))
+        self.endMoveRows()
+
+    # -------------------------
+    # public
+    # -------------------------
+    def set_query(self, text: str) -> None:
+        query = _tokens(text)
+        if query == self._query:
+            return
+        self._query = query
+        self._reset_to(self._compute_visible())
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:
+        self._sort_column = column
+        self._sort_order = order
+        self._relayout_to(self._compute_visible())
+
+    def source_row(self, proxy_row: int) -> int:
+        if proxy_row < 0 or proxy_row >= len(self._visible):
+            return -1
+        return self._src.row_of(self._visible[proxy_row])
+
+    # -------------------------
+    # source signals
+    # -------------------------
+    def _on_source_reset(self) -> None:
+        self._row_tokens.clear()
+        self._postings.clear()
+        self._vocab_dirty = True
+        self._index_rows(range(self._src.rowCount()))
+        self._reset_to(self._compute_visible())
+
+    def _on_rows_inserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        rows = range(first, last + 1)
+        self._index_rows(rows)
+        self._insert_ids([row_id for row_id in map(self._src.id_at, rows) if self._matches(row_id)])
+
+    def _on_rows_about_to_be_removed(self, parent: QModelIndex, first: int, last: int) -> None:
+        # Before the source drops them, so data() on the remaining rows stays valid
+        ids = [self._src.id_at(r) for r in range(first, last + 1)]
+        self._remove_ids(ids)
+        for row_id in ids:
+            self._unindex_row(row_id)
+
+    def _on_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex, roles: Any = None) -> None:
+        rows = range(top_left.row(), bottom_right.row() + 1)
+        changed = [self._src.id_at(r) for r in rows]
+        self._index_rows(rows)
+
+        self._remove_ids([i for i in changed if not self._matches(i)])
+        self._insert_ids([i for i in changed if self._proxy_row(i) < 0 and self._matches(i)])
+        if self._sorted():
+            for row_id in changed:
+                self._move_into_place(row_id)
+
+        for row_id in changed:
+            p = self._proxy_row(row_id)
+            if p >= 0:
+                self.dataChanged.emit(self.index(p, 0), self.index(p, self.columnCount() - 1))
+
+    def _on_source_layout_changed(self, *args: Any) -> None:
+        # Source rows reordered: only the unsorted order can change
+        self._relayout_to(self._compute_visible())
+
+    # -------------------------
+    # QAbstractProxyModel
+    # -------------------------
+    def index(self, row: int, column: int, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> QModelIndex:
+        if parent.isValid() or row < 0 or row >= len(self._visible) or column < 0 or column >= self.columnCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, child: Any = None) -> Any:
+        if child is None:
+            return super().parent()
+        return QModelIndex()
+
+    def rowCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._visible)
+
+    def columnCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._src.columnCount()
+
+    def mapToSource(self, proxy_index: QModelIndex | QPersistentModelIndex) -> QModelIndex:
+        if not proxy_index.isValid():
+            return QModelIndex()
+        r = self.source_row(proxy_index.row())
+        if r < 0:
+            return QModelIndex()
+        return self._src.index(r, proxy_index.column())
+
+    def mapFromSource(self, source_index: QModelIndex | QPersistentModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        p = self._proxy_row(self._src.id_at(source_index.row()))
+        if p < 0:
+            return QModelIndex()
+        return self.index(p, source_index.column())
+
+    def data(self, index: QModelIndex | QPersistentModelIndex, role: int = _DISPLAY_ROLE) -> Any:
+        # Straight to the source's display column (skips mapToSource + source.data())
+        if role != _DISPLAY_ROLE or not index.isValid():
+            return None
+        r = index.row()
+        if r >= len(self._visible):
+            return None
+        return self._src.column_values(index.column())[self._src.row_of(self._visible[r])]
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = int(Qt.ItemDataRole.DisplayRole)) -> Any:
+        if orientation == Qt.Orientation.Horizontal:
+            return self._src.headerData(section, orientation, role)
+        if role == int(Qt.ItemDataRole.DisplayRole):
+            return section + 1
+        return None
+
+    def canFetchMore(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._src.canFetchMore(QModelIndex())
+
+    def fetchMore(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> None:
+        if not parent.isValid():
+            self._src.fetchMore(QModelIndex())
+
+
+def install_filter_proxy(table: QTableView, model: KeyedTableModel[Any], search: QLineEdit) -> IndexedFilterProxyModel:
+    """Puts an IndexedFilterProxyModel between `model` and `table`, driven by `search` and header clicks."""
+    proxy = IndexedFilterProxyModel(model, table)
+    search.setPlaceholderText("Search...")
+    search.setClearButtonEnabled(True)
+    search.textChanged.connect(proxy.set_query)
+
+    table.setModel(proxy)
+    header = table.horizontalHeader()
+    # Unsorted (server order, newest first) until a header is clicked; a third click goes back to it
+    header.setSortIndicatorClearable(True)
+    header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+    table.setSortingEnabled(True)
+    return proxy
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Generic, Iterable, List, Mapping, Sequence, Tuple, TypeVar
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QPersistentModelIndex, Qt
+
+RowT = TypeVar("RowT", bound=Mapping[str, Any])
+
+_DISPLAY_ROLE = int(Qt.ItemDataRole.DisplayRole)
+
+
+def descending_runs(positions: Iterable[int]) -> List[Tuple[int, int]]:
+    """(first, last) of each contiguous run of positions, bottom run first (safe to delete in order)."""
+    runs: List[Tuple[int, int]] = []
+    for p in sorted(set(positions), reverse=True):
+        if runs and runs[-1][0] == p + 1:
+            runs[-1] = (p, runs[-1][1])
+        else:
+            runs.append((p, p))
+    return runs
+
+
+def cell_text(value: Any) -> str:
+    """Default rendering of a row value: None -> "", bools -> Yes / No."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    return str(value)
+
+
+class KeyedTableModel(QAbstractTableModel, Generic[RowT]):
+    """
+    Table model over rows keyed by their "id".
+    - load() resets the whole table (first load / filter change).
+    - upsert() / remove() / sync() touch only the affected rows, so the view
+      keeps its scroll position and selection.
+    - Subclasses only describe columns: HEADERS + COLUMNS (the row key shown in
+      each column), or column_text() when a column isn't a plain field; sort_key()
+      when the text doesn't sort naturally.
+    - Storage is per column: display strings and sort keys are rendered once
+      when rows arrive, so data() is a list lookup.
+    - id -> position is rebuilt lazily after removes/inserts (row_of() does it
+      on demand), so slots connected to row signals always see current positions.
+    """
+
+    HEADERS: List[str] = []
+    # Row key per header (used by the default column_text)
+    COLUMNS: List[str] = []
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._rows: List[RowT] = []
+        self._ids: List[str] = []
+        # [column][row]
+        self._display: List[List[str]] = [[] for _ in self.HEADERS]
+        self._sort_keys: List[List[Any]] = [[] for _ in self.HEADERS]
+        self._positions: Dict[str, int] = {}
+        # _positions is exact for rows before this index
+        self._stale_from = 0
+
+    def _reindex(self, start: int = 0) -> None:
+        positions = self._positions
+        ids = self._ids
+        for i in range(start, len(ids)):
+            positions[ids[i]] = i
+        self._stale_from = len(ids)
+
+    def _mark_stale(self, start: int) -> None:
+        self._stale_from = min(self._stale_from, start)
+
+    # -------------------------
+    # column storage
+    # -------------------------
+    def _render(self, rows: Sequence[RowT]) -> Tuple[List[List[str]], List[List[Any]]]:
+        text_of = self.column_text
+        key_of = self.sort_key
+        default_keys = type(self).sort_key is KeyedTableModel.sort_key
+        display: List[List[str]] = []
+        keys: List[List[Any]] = []
+        for c in range(len(self.HEADERS)):
+            texts = [text_of(row, c) for row in rows]
+            display.append(texts)
+            if default_keys:
+                keys.append([t.casefold() for t in texts])
+            else:
+                keys.append([key_of(row, c, t) for row, t in zip(rows, texts)])
+        return display, keys
+
+    def _store(self, start: int, end: int, rows: Sequence[RowT]) -> None:
+        """Replaces rows[start:end] (all columns) with `rows`."""
+        display, keys = self._render(rows)
+        self._rows[start:end] = rows
+        self._ids[start:end] = [str(r["id"]) for r in rows]
+        for c in range(len(self.HEADERS)):
+            self._display[c][start:end] = display[c]
+            self._sort_keys[c][start:end] = keys[c]
+
+    def _drop(self, start: int, end: int) -> None:
+        """Deletes rows[start:end] (all columns)."""
+        del self._rows[start:end]
+        del self._ids[start:end]
+        for c in range(len(self.HEADERS)):
+            del self._display[c][start:end]
+            del self._sort_keys[c][start:end]
+
+    def rowCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
+        return len(self._ids)
+
+    def columnCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
+        return len(self.HEADERS)
+
+    def column_text(self, row: RowT, column: int) -> str:
+        if column >= len(self.COLUMNS):
+            return ""
+        return cell_text(row.get(self.COLUMNS[column]))
+
+    def sort_key(self, row: RowT, column: int, text: str) -> Any:
+        """`text` is column_text(row, column), already rendered."""
+        return text.casefold()
+
+    def data(self, index: QModelIndex | QPersistentModelIndex, role: int = _DISPLAY_ROLE) -> Any:
+        if role != _DISPLAY_ROLE or not index.isValid():
+            return None
+        column = self._display[index.column()]
+        r = index.row()
+        return column[r] if r < len(column) else None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = int(Qt.ItemDataRole.DisplayRole)) -> Any:
+        if role == int(Qt.ItemDataRole.DisplayRole) and orientation == Qt.Orientation.Horizontal:
+            if 0 <= int(section) < len(self.HEADERS):
+                return self.HEADERS[int(section)]
+        return None
+
+    # -------------------------
+    # mutations
+    # -------------------------
+    def load(self, rows: Sequence[RowT]) -> None:
+        self.beginResetModel()
+        rows = list(rows)
+        self._rows = rows
+        self._ids = [str(r["id"]) for r in rows]
+        self._display, self._sort_keys = self._render(rows)
+        self._positions = {}
+        self._reindex()
+        self.endResetModel()
+
+    def upsert(self, rows: Iterable[RowT]) -> None:
+        """Replaces rows in place by id; new rows go on top (lists are newest first)."""
+        fresh: List[RowT] = []
+        for row in rows:
+            pos = self.row_of(str(row["id"]))
+            if pos < 0:
+                fresh.append(row)
+                continue
+            if self._rows[pos] != row:
+                self._store(pos, pos + 1, [row])
+                self.dataChanged.emit(self.index(pos, 0), self.index(pos, self.columnCount() - 1))
+
+        if fresh:
+            self.beginInsertRows(QModelIndex(), 0, len(fresh) - 1)
+            self._store(0, 0, fresh)
+            self._reindex()
+            self.endInsertRows()
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """Removes rows by id, one rowsRemoved per contiguous run (bottom run first)."""
+        for lo, hi in descending_runs(p for p in map(self.row_of, set(ids)) if p >= 0):
+            self.beginRemoveRows(QModelIndex(), lo, hi)
+            for row_id in self._ids[lo:hi + 1]:
+                del self._positions[row_id]
+            self._drop(lo, hi + 1)
+            self._mark_stale(lo)
+            self.endRemoveRows()
+
+    def sync(self, rows: Sequence[RowT]) -> None:
+        """Applies a fresh result as removes, inserts and in-place updates; resets only if rows moved."""
+        wanted = [str(r["id"]) for r in rows]
+        if len(set(wanted)) != len(wanted):
+            self.load(rows)
+            return
+        self.remove(set(self._positions) - set(wanted))
+
+        i = 0
+        while i < len(rows):
+            pos = self.row_of(wanted[i])
+            if pos == i:
+                if self._rows[i] != rows[i]:
+                    self._store(i, i + 1, [rows[i]])
+                    self.dataChanged.emit(self.index(i, 0), self.index(i, self.columnCount() - 1))
+                i += 1
+            elif pos < 0:
+                # Insert the whole run of new rows at once
+                end = i
+                while end < len(rows) and wanted[end] not in self._positions:
+                    end += 1
+                self.beginInsertRows(QModelIndex(), i, end - 1)
+                self._store(i, i, rows[i:end])
+                for j in range(i, end):
+                    self._positions[wanted[j]] = j
+                # Rows from i on moved down
+                self._mark_stale(i)
+                self.endInsertRows()
+                i = end
+            else:
+                # Reordered on the server side: fall back to a reset
+                self.load(rows)
+                return
+
+    # -------------------------
+    # lookups
+    # -------------------------
+    def rows(self) -> List[RowT]:
+        return list(self._rows)
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def column_values(self, column: int) -> Sequence[str]:
+        """Rendered display strings of one column, by row (read-only)."""
+        return self._display[column]
+
+    def column_sort_keys(self, column: int) -> Sequence[Any]:
+        """Sort keys of one column, by row (read-only)."""
+        return self._sort_keys[column]
+
+    def row_at(self, row: int) -> RowT:
+        return self._rows[row]
+
+    def row_of(self, row_id: str) -> int:
+        pos = self._positions.get(row_id)
+        if pos is None:
+            return -1
+        if pos >= self._stale_from:
+            self._reindex(self._stale_from)
+            pos = self._positions[row_id]
+        return pos
+
+    def id_at(self, row: int) -> str:
+        if row < 0 or row >= len(self._ids):
+            return ""
+        return self._ids[row]
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import logging
+import os
 from functools import partial
+from typing import Callable
 
-from PySide6.QtCore import Signal
+from PySide6.QtCore import QEvent, QObject, QTimer, Signal
 from PySide6.QtWidgets import (
+    QApplication,
     QWidget,
     QMainWindow,
     QVBoxLayout,
@@ -15,6 +19,7 @@ from PySide6.QtWidgets import (
 )
 
 from app.db.auth_service import sign_out
+from app.db.instrumentation import request_metrics, request_scope
 from app.modules.company_clients.page import CompanyClientsPage
 from app.modules.workers.page import WorkersPage
 from app.modules.incidents.page import IncidentsPage
@@ -22,6 +27,26 @@ from app.modules.templates.page import TemplatesPage
 from app.modules.generate_documents.page import GenerateDocumentsPage
 from app.modules.reports.page import ReportsPage
 from app.core.events import events
+from app.services.reference_data import reference_data
+
+
+logger = logging.getLogger(__name__)
+
+# After a page is shown, the next one in the menu is built (on the GUI thread; its
+# data loads in the background) once the user has left the UI alone this long
+PREFETCH_DELAY_MS = 1500
+
+# Input that pushes the prefetch back
+_USER_INPUT_EVENTS = {
+    QEvent.Type.KeyPress,
+    QEvent.Type.MouseButtonPress,
+    QEvent.Type.MouseMove,
+    QEvent.Type.Wheel,
+}
+
+
+def _prefetch_enabled() -> bool:
+    return os.getenv("HRDOCS_PREFETCH_PAGES", "1").strip().lower() not in ("0", "false", "no", "off")
 
 
 class Sidebar(QWidget):
@@ -126,7 +151,7 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         root_layout.addWidget(self.stack, stretch=1)
 
-        # Keep actual instances (not only indexes) so we can refresh them from events
+        # Keep actual instances (not only indexes)
         self.company_clients_page: CompanyClientsPage | None = None
         self.workers_page: WorkersPage | None = None
         self.templates_page: TemplatesPage | None = None
@@ -134,93 +159,101 @@ class MainWindow(QMainWindow):
         self.generate_documents_page: GenerateDocumentsPage | None = None
         self.reports_page: ReportsPage | None = None
 
-        self.pages: dict[str, int] = {}
-        self._build_pages()
+        # Pages are built (and load their data) on first navigation
+        self.pages: dict[str, QWidget] = {}
+        self._factories: dict[str, Callable[[], QWidget]] = {
+            "add_client": CompanyClientsPage,
+            "add_template": TemplatesPage,
+            "add_worker": WorkersPage,
+            "incidents": IncidentsPage,
+            "generate_documents": GenerateDocumentsPage,
+            "reports": ReportsPage,
+        }
+        self._attributes: dict[str, str] = {
+            "add_client": "company_clients_page",
+            "add_template": "templates_page",
+            "add_worker": "workers_page",
+            "incidents": "incidents_page",
+            "generate_documents": "generate_documents_page",
+            "reports": "reports_page",
+        }
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(PREFETCH_DELAY_MS)
+        self._prefetch_timer.timeout.connect(self._prefetch_next)
+        self._current_key = ""
+
+        # Subscribe the shared lookups before the pages so invalidation runs first
+        reference_data()
 
         # Navigation
         self.sidebar.navigate.connect(self.go_to)
         self.sidebar.request_logout.connect(self.on_logout)
 
-        # Global refresh wiring (scalable)
-        ev = events()
-        ev.company_clients_changed.connect(self._on_company_clients_changed)
-        ev.workers_changed.connect(self._on_workers_changed)
-        ev.incidents_changed.connect(self._on_incidents_changed)
-        ev.templates_changed.connect(self._on_templates_changed)
-
         self.go_to("add_client")
 
-    def _build_pages(self) -> None:
-        self.company_clients_page = CompanyClientsPage()
-        self.templates_page = TemplatesPage()
-        self.workers_page = WorkersPage()
-        self.incidents_page = IncidentsPage()
-        self.generate_documents_page = GenerateDocumentsPage()
-        self.reports_page = ReportsPage()
-
-        self._add_page("add_client", self.company_clients_page)
-        self._add_page("add_template", self.templates_page)
-        self._add_page("add_worker", self.workers_page)
-        self._add_page("incidents", self.incidents_page)
-        self._add_page("generate_documents", self.generate_documents_page)
-        self._add_page("reports", self.reports_page)
-
-    def _add_page(self, key: str, page: QWidget) -> None:
-        self.pages[key] = self.stack.addWidget(page)
+    def _page(self, key: str) -> QWidget:
+        page = self.pages.get(key)
+        if page is None:
+            page = self._factories[key]()
+            self.pages[key] = page
+            setattr(self, self._attributes[key], page)
+            self.stack.addWidget(page)
+        return page
 
     def go_to(self, key: str) -> None:
-        if key not in self.pages:
+        if key not in self._factories:
             return
-        self.stack.setCurrentIndex(self.pages[key])
+        request_metrics().set_active_page(key)
+        page = self._page(key)
+        self.stack.setCurrentWidget(page)
         self.sidebar.set_active(key)
+        self._current_key = key
+        # Pages subscribe to events themselves; catch up on what this one missed while hidden
+        events().deliver_deferred(page)
+
+        if _prefetch_enabled():
+            self._schedule_prefetch()
+
+    # -------------------------
+    # idle prefetch
+    # -------------------------
+    def _schedule_prefetch(self) -> None:
+        # The app-wide filter is only installed while a prefetch is pending
+        if not self._prefetch_timer.isActive():
+            QApplication.instance().installEventFilter(self)
+        self._prefetch_timer.start()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() in _USER_INPUT_EVENTS and self._prefetch_timer.isActive():
+            # Still in use: wait for the next quiet spell
+            self._prefetch_timer.start()
+        return False
+
+    def _prefetch_next(self) -> None:
+        if QApplication.activePopupWidget() is not None or QApplication.activeModalWidget() is not None:
+            # A menu / dialog is open: try again later
+            self._prefetch_timer.start()
+            return
+        QApplication.instance().removeEventFilter(self)
 
-    # -----------------------
-    # Event-driven refresh
-    # -----------------------
-    def _on_company_clients_changed(self) -> None:
-        # CompanyClients list itself
-        if self.company_clients_page:
-            self.company_clients_page.refresh()
-
-        # Company clients are used as dropdowns in these pages
-        if self.workers_page:
-            # implement reload_clients() on WorkersPage (or call _load_clients if you expose it)
-            if hasattr(self.workers_page, "reload_clients"):
-                self.workers_page.reload_clients()
-            self.workers_page.refresh()
-
-        if self.templates_page:
-            if hasattr(self.templates_page, "reload_clients"):
-                self.templates_page.reload_clients()
-            self.templates_page.refresh()
-
-        if self.generate_documents_page:
-            if hasattr(self.generate_documents_page, "reload_clients"):
-                self.generate_documents_page.reload_clients()
-
-        if self.reports_page:
-            if hasattr(self.reports_page, "reload_clients"):
-                self.reports_page.reload_clients()
-
-    def _on_workers_changed(self) -> None:
-        if self.workers_page:
-            self.workers_page.refresh()
-
-        # Incidents page needs workers list for the combo
-        if self.incidents_page:
-            if hasattr(self.incidents_page, "reload_workers"):
-                self.incidents_page.reload_workers()
-            self.incidents_page.refresh()
-
-    def _on_incidents_changed(self) -> None:
-        if self.incidents_page:
-            self.incidents_page.refresh()
-
-    def _on_templates_changed(self) -> None:
-        if self.templates_page:
-            self.templates_page.refresh()
+        keys = list(self._factories)
+        if self._current_key not in keys:
+            return
+        following = keys[keys.index(self._current_key) + 1:]
+        key = next((k for k in following if k not in self.pages), None)
+        if key is None:
+            return
+        with request_scope(page=key, action="prefetch"):
+            try:
+                self._page(key)
+            except Exception:
+                # Not registered; navigating there builds it again and surfaces the error
+                logger.exception("prefetch of page %s failed", key)
 
     def on_logout(self) -> None:
+        self._prefetch_timer.stop()
+        QApplication.instance().removeEventFilter(self)
         sign_out()
         self.logged_out.emit()
         self.close()
\ No newline at end of file
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from typing import List
+
+from PySide6.QtWidgets import QApplication, QLineEdit, QTableView
+
+from app.modules.incidents.model import IncidentsTableModel
+from app.repositories.incidents_repo import IncidentRow
+from app.ui.indexed_filter_proxy import install_filter_proxy
+
+
+def _rows(n: int) -> List[IncidentRow]:
+    return [
+        {
+            "id": f"inc-{i:07d}",
+            "code": f"INC-{i}",
+            "received_day": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "incident_date": f"2024-{1 + i % 12:02d}-{1 + i % 27:02d}",
+            "worker_name": f"Worker {i % 3000} Surname {i % 71}",
+            "incident_type": ("ABSENCE — Absence", "LATE_ARRIVAL — Late arrival")[i % 2],
+            "manual_handling": i % 3 == 0,
+            "observations": "",
+            "created_at": f"2024-01-01T00:00:00.{i:07d}",
+        }
+        for i in range(n)
+    ]
+
+
+def _summary(label: str, samples: List[float], unit: str = "ms") -> str:
+    return (
+        f"{label:<28} median {statistics.median(samples):7.2f} {unit}   "
+        f"min {min(samples):7.2f} {unit}   max {max(samples):7.2f} {unit}"
+    )
+
+
+def main() -> None:
+    """
+    Scripted scroll over the incidents table (model + filter proxy, as on the page):
+    - model load time for N synthetic rows
+    - per-frame time of scrolling top to bottom, each frame fully painted offscreen
+    - proxy data() cost per cell over the visible rows
+
+    Usage: python -m app.ui.measure_table_scroll [rows] [frames]
+    (QT_QPA_PLATFORM=offscreen runs it without a display)
+    """
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    rows = _rows(n)
+
+    model = IncidentsTableModel()
+    t0 = time.perf_counter()
+    model.load(rows)
+    load_ms = (time.perf_counter() - t0) * 1000.0
+
+    view = QTableView()
+    view.resize(1200, 900)
+    t0 = time.perf_counter()
+    proxy = install_filter_proxy(view, model, QLineEdit())
+    index_ms = (time.perf_counter() - t0) * 1000.0
+    view.show()
+    app.processEvents()
+
+    bar = view.verticalScrollBar()
+    frame_ms: List[float] = []
+    for k in range(frames):
+        t0 = time.perf_counter()
+        bar.setValue(int(bar.maximum() * k / max(1, frames - 1)))
+        view.viewport().grab()
+        frame_ms.append((time.perf_counter() - t0) * 1000.0)
+
+    visible = min(proxy.rowCount(), 40)
+    cells = [proxy.index(r, c) for r in range(visible) for c in range(proxy.columnCount())]
+    data_us: List[float] = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        for index in cells:
+            proxy.data(index)
+        data_us.append((time.perf_counter() - t0) * 1e6 / max(1, len(cells)))
+
+    print(f"rows: {n}   frames: {frames}")
+    print(f"model load                   {load_ms:7.1f} ms")
+    print(f"filter proxy index           {index_ms:7.1f} ms")
+    print(_summary("scroll frame (paint)", frame_ms))
+    print(_summary("proxy data() per cell", data_us, "us"))
+
+
+if __name__ == "__main__":
+    main()
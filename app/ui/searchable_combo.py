@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set
+
+from PySide6.QtCore import QModelIndex, QObject, QStringListModel, Qt, QTimer, Signal
+from PySide6.QtWidgets import QComboBox, QCompleter
+
+from app.ui.background_loader import BackgroundLoader
+
+# Popup size: only the best matches are ranked and shown
+MAX_MATCHES = 50
+
+# Server-side search: wait for a typing pause, remember this many queries
+SEARCH_DEBOUNCE_MS = 250
+SEARCH_CACHE_SIZE = 64
+
+Option = Mapping[str, Any]
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Word-substring search over item labels.
+    - Items are split into casefolded words once; the distinct words are
+      indexed by trigram, so a query word of 3+ characters only checks the
+      words holding all of its trigrams. Shorter query words match word
+      prefixes (bisect over the sorted words).
+    - A query word that extends one of the previous query's words only
+      re-checks that word's matches (typing narrows incrementally).
+    - Results are ranked: label prefix, then word prefix, then label substring;
+      shorter labels first.
+    """
+
+    def __init__(self, labels: Sequence[str]) -> None:
+        self._labels = [label.casefold() for label in labels]
+        self._lengths = [len(label) for label in self._labels]
+        self._exact: Dict[str, int] = {}
+        # word -> items containing it; trigram -> words containing it
+        self._items: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+
+        items_of = self._items
+        for i, label in enumerate(self._labels):
+            for w in label.split():
+                bucket = items_of.get(w)
+                if bucket is None:
+                    items_of[w] = {i}
+                else:
+                    bucket.add(i)
+            self._exact.setdefault(self._labels[i].strip(), i)
+
+        grams = self._grams
+        for w in items_of:
+            for g in _trigrams(w):
+                bucket = grams.get(g)
+                if bucket is None:
+                    grams[g] = {w}
+                else:
+                    bucket.add(w)
+        self._vocab = sorted(items_of)
+
+        # Previous query word -> index words containing it
+        self._last: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def exact(self, label: str) -> int:
+        return self._exact.get(label.strip().casefold(), -1)
+
+    def _words_matching(self, q: str) -> List[str]:
+        short = len(q) < 3
+        for prev, found in self._last.items():
+            if (len(prev) < 3) == short and (q.startswith(prev) if short else prev in q):
+                return [w for w in found if w.startswith(q)] if short else [w for w in found if q in w]
+        if short:
+            vocab = self._vocab
+            start = bisect_left(vocab, q)
+            return vocab[start:bisect_left(vocab, q + "\U0010ffff", start)]
+        grams = _trigrams(q)
+        buckets = sorted((self._grams.get(g, set()) for g in grams), key=len)
+        pool = set(buckets[0]).intersection(*buckets[1:])
+        return [w for w in pool if q in w]
+
+    def _rank(self, matches: Set[int], query: str, first: str, limit: int) -> List[int]:
+        labels = self._labels
+        word_start = f" {first}"
+        tiers = (
+            lambda i: labels[i].startswith(query),
+            lambda i: labels[i].startswith(first) or word_start in labels[i],
+            lambda i: first in labels[i],
+        )
+        # Later tiers are only scanned while the popup still has room
+        out: List[int] = []
+        rest = matches
+        for in_tier in tiers:
+            tier = [i for i in rest if in_tier(i)]
+            out += heapq.nsmallest(limit - len(out), tier, key=self._lengths.__getitem__)
+            if len(out) >= limit:
+                break
+            rest = rest.difference(tier)
+        return out
+
+    def search(self, text: str, limit: int = MAX_MATCHES) -> List[int]:
+        """Item positions where every word of `text` is found in some item word, best first."""
+        query_words = text.casefold().split()
+        if not query_words:
+            self._last = {}
+            return []
+
+        found = {q: self._words_matching(q) for q in query_words}
+        self._last = found
+
+        matches: Optional[Set[int]] = None
+        for q in sorted(query_words, key=lambda q: len(found[q])):
+            items = set().union(*(self._items[w] for w in found[q]))
+            matches = items if matches is None else matches & items
+            if not matches:
+                return []
+        assert matches is not None
+        return self._rank(matches, " ".join(query_words), query_words[0], limit)
+
+
+class SearchableCombo(QObject):
+    """
+    Editable QComboBox whose popup lists ranked TrigramIndex matches.
+    The index is rebuilt once the items stop changing (next idle loop turn),
+    or on the first keystroke if that comes sooner.
+    Typed text that doesn't name an item falls back to `fallback_index`.
+    """
+
+    def __init__(self, combo: QComboBox, fallback_index: int = -1, limit: int = MAX_MATCHES) -> None:
+        super().__init__(combo)
+        self.combo = combo
+        self.fallback_index = fallback_index
+        self.limit = limit
+        self._index: Optional[TrigramIndex] = None
+        self._shown: List[int] = []
+
+        self._rebuild = QTimer(self)
+        self._rebuild.setSingleShot(True)
+        self._rebuild.timeout.connect(self._ensure_index)
+
+        combo.setEditable(True)
+        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+
+        self._matches = QStringListModel(self)
+        self.completer = QCompleter(self._matches, combo)
+        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        # The list is already filtered and ranked here; Qt must not filter it again
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        combo.setCompleter(self.completer)
+        self.completer.activated[QModelIndex].connect(self._on_activated)
+
+        model = combo.model()
+        model.modelReset.connect(self._invalidate)
+        model.rowsInserted.connect(self._invalidate)
+        model.rowsRemoved.connect(self._invalidate)
+        model.dataChanged.connect(self._invalidate)
+
+        line_edit = combo.lineEdit()
+        line_edit.textEdited.connect(self._on_text_edited)
+        line_edit.editingFinished.connect(self._apply_text_to_selection)
+
+    def _invalidate(self, *args: object) -> None:
+        # addItem() in a loop: one rebuild after the last one
+        self._index = None
+        self._rebuild.start(0)
+
+    def _ensure_index(self) -> TrigramIndex:
+        if self._index is None:
+            combo = self.combo
+            self._index = TrigramIndex([combo.itemText(i) for i in range(combo.count())])
+        return self._index
+
+    def _on_text_edited(self, text: str) -> None:
+        self._shown = self._ensure_index().search(text, self.limit)
+        self._matches.setStringList([self.combo.itemText(i) for i in self._shown])
+        if self._shown:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def _on_activated(self, index: QModelIndex) -> None:
+        row = index.row()
+        if 0 <= row < len(self._shown):
+            self.combo.setCurrentIndex(self._shown[row])
+
+    def _apply_text_to_selection(self) -> None:
+        # Typed text must name an item
+        combo = self.combo
+        text = combo.currentText().strip()
+        if not text:
+            combo.setCurrentIndex(self.fallback_index)
+            return
+        current = combo.currentIndex()
+        if current >= 0 and combo.itemText(current).casefold() == text.casefold():
+            return
+        idx = self._ensure_index().exact(text)
+        combo.setCurrentIndex(idx if idx >= 0 else self.fallback_index)
+
+
+def setup_searchable_combo(combo: QComboBox, fallback_index: int = -1) -> SearchableCombo:
+    """Makes `combo` editable with an indexed, ranked search popup (owned by the combo)."""
+    return SearchableCombo(combo, fallback_index)
+
+
+class ServerSearchCombo(QObject):
+    """
+    Editable QComboBox that searches on the server as you type, for lists too
+    big to load (options are dicts with "id" and "label").
+    - A search runs in the background once typing pauses for SEARCH_DEBOUNCE_MS
+      and asks for at most `limit` options; an answer to older text is dropped.
+    - Results are cached per query. A query extending a cached one whose result
+      was complete (fewer than `limit` options) is answered by filtering that
+      result with `refine` (which must agree with the server's matching).
+    - The combo itself only holds its fixed items (e.g. "All") plus the option
+      picked last; its data is the option id.
+    """
+
+    search_failed = Signal(str)
+
+    def __init__(
+        self,
+        combo: QComboBox,
+        search: Callable[[str, int], Sequence[Option]],
+        limit: int,
+        refine: Optional[Callable[[str, Option], bool]] = None,
+        fallback_index: int = -1,
+    ) -> None:
+        super().__init__(combo)
+        self.combo = combo
+        self.search = search
+        self.limit = limit
+        self.refine = refine
+        self.fallback_index = fallback_index
+        self._cache: "OrderedDict[str, List[Option]]" = OrderedDict()
+        self._shown: List[Option] = []
+        self._fixed = combo.count()
+        self._loader = BackgroundLoader(self)
+
+        combo.setEditable(True)
+        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+
+        self._matches = QStringListModel(self)
+        self.completer = QCompleter(self._matches, combo)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        combo.setCompleter(self.completer)
+        self.completer.activated[QModelIndex].connect(self._on_activated)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(SEARCH_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._run_search)
+
+        line_edit = combo.lineEdit()
+        line_edit.textEdited.connect(self._on_text_edited)
+        line_edit.editingFinished.connect(self._apply_text_to_selection)
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return " ".join(text.casefold().split())
+
+    def clear_cache(self) -> None:
+        """The underlying list changed (e.g. workers_changed): search again next time."""
+        self._cache.clear()
+
+    # -------------------------
+    # searching
+    # -------------------------
+    def _cached(self, key: str) -> Optional[List[Option]]:
+        hit = self._cache.get(key)
+        if hit is not None:
+            self._cache.move_to_end(key)
+            return hit
+        if self.refine is None:
+            return None
+        refine = self.refine
+        for prev, options in reversed(self._cache.items()):
+            if len(options) < self.limit and key.startswith(prev):
+                return self._remember(key, [o for o in options if refine(key, o)])
+        return None
+
+    def _remember(self, key: str, options: List[Option]) -> List[Option]:
+        self._cache[key] = options
+        self._cache.move_to_end(key)
+        while len(self._cache) > SEARCH_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return options
+
+    def _on_text_edited(self, text: str) -> None:
+        key = self._key(text)
+        # Whatever is still in flight answers older text
+        self._loader.cancel("search")
+        if not key:
+            self._debounce.stop()
+            self._show([])
+            return
+        hit = self._cached(key)
+        if hit is not None:
+            self._debounce.stop()
+            self._show(hit)
+        else:
+            self._debounce.start()
+
+    def _run_search(self) -> None:
+        key = self._key(self.combo.currentText())
+        if not key:
+            return
+        hit = self._cached(key)
+        if hit is not None:
+            self._show(hit)
+            return
+        self._loader.load(
+            "search",
+            lambda: list(self.search(key, self.limit)),
+            lambda options: self._show(self._remember(key, options)),
+            lambda e: self.search_failed.emit(str(e)),
+        )
+
+    def _show(self, options: List[Option]) -> None:
+        self._shown = options
+        self._matches.setStringList([str(o["label"]) for o in options])
+        if options and self.combo.lineEdit().hasFocus():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    # -------------------------
+    # picking
+    # -------------------------
+    def select(self, option: Option) -> None:
+        combo = self.combo
+        idx = combo.findData(option["id"])
+        if idx < 0:
+            while combo.count() > self._fixed:
+                combo.removeItem(combo.count() - 1)
+            combo.addItem(str(option["label"]), option["id"])
+            idx = combo.count() - 1
+        combo.setCurrentIndex(idx)
+
+    def _on_activated(self, index: QModelIndex) -> None:
+        row = index.row()
+        if 0 <= row < len(self._shown):
+            self.select(self._shown[row])
+
+    def _apply_text_to_selection(self) -> None:
+        # Typed text must name the picked option, a fixed item or a shown match
+        combo = self.combo
+        text = combo.currentText().strip()
+        if not text:
+            combo.setCurrentIndex(self.fallback_index)
+            return
+        idx = combo.findText(text, Qt.MatchFlag.MatchFixedString)
+        if idx >= 0:
+            combo.setCurrentIndex(idx)
+            return
+        folded = text.casefold()
+        for option in self._shown:
+            if str(option["label"]).casefold() == folded:
+                self.select(option)
+                return
+        combo.setCurrentIndex(self.fallback_index)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from dataclasses import dataclass, asdict
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QTimer, Qt
+
+from app.db.instrumentation import request_metrics
+
+
+logger = logging.getLogger(__name__)
+
+# A heartbeat this late means the event loop was blocked
+STALL_MS = 100.0
+HEARTBEAT_MS = 25
+# Event-loop latency histogram: bucket upper bounds (ms), plus an open-ended last bucket
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+STALL_LOG_BYTES = 1_000_000
+STALL_LOG_BACKUPS = 3
+STACK_DEPTH = 40
+
+_APP_DIR = str(Path(__file__).resolve().parents[1])
+_ROOT_DIR = os.path.dirname(_APP_DIR)
+_MAIN_FILE = os.path.join(_APP_DIR, "main.py")
+
+
+@dataclass
+class StallCounter:
+    stalls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def add(self, ms: float) -> None:
+        self.stalls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+
+def _is_ui_code(code: Any) -> bool:
+    cls = getattr(code, "co_qualname", code.co_name).split(".")[0]
+    return cls.endswith("Page") or cls.endswith("Window")
+
+
+def _describe_stack(frame: FrameType) -> Tuple[str, List[str]]:
+    """
+    (action, stack) for the GUI thread's current frame.
+    action: the innermost page / window method on the stack, else the app
+    function Qt called into, else "-" (blocked inside Qt itself).
+    """
+    codes = []
+    f: Optional[FrameType] = frame
+    while f is not None:
+        codes.append(f.f_code)
+        f = f.f_back
+    app_codes = [c for c in codes if c.co_filename.startswith(_APP_DIR) and c.co_filename != _MAIN_FILE]
+
+    ui = next((c for c in app_codes if _is_ui_code(c)), None)
+    code = ui if ui is not None else (app_codes[-1] if app_codes else None)
+    action = getattr(code, "co_qualname", code.co_name) if code is not None else "-"
+
+    stack = [
+        f"{os.path.relpath(fs.filename, _ROOT_DIR)}:{fs.lineno} {fs.name}"
+        for fs in traceback.extract_stack(frame, limit=STACK_DEPTH)
+    ]
+    return action, stack
+
+
+class StallWatchdog:
+    """
+    Measures how late the Qt event loop runs a heartbeat timer.
+    - Every heartbeat's lateness goes into a latency histogram.
+    - A helper thread notices when the heartbeat is overdue by more than the
+      threshold and samples the GUI thread's Python stack while it is still blocked.
+    - When the loop comes back, the stall is written to a rolling JSON-lines log
+      with its duration, the active page, the action (e.g.
+      "GenerateDocumentsPage._on_generate") and the sampled stack.
+    On stop(), the histogram and per-action totals are appended as a last line.
+    """
+
+    def __init__(self, log_path: str, threshold_ms: Optional[float] = None) -> None:
+        self.threshold_ms = float(threshold_ms or os.getenv("HRDOCS_STALL_MS", "") or STALL_MS)
+        self._gui_thread = threading.get_ident()
+
+        self._lock = threading.Lock()
+        self._histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._by_action: Dict[str, StallCounter] = {}
+        self._beats = 0
+
+        self._last_beat = time.perf_counter()
+        # Written by the helper thread: (heartbeat the stall started after, action, stack)
+        self._sample: Optional[Tuple[float, str, List[str]]] = None
+
+        self._handler = RotatingFileHandler(
+            log_path, maxBytes=STALL_LOG_BYTES, backupCount=STALL_LOG_BACKUPS, encoding="utf-8"
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._log = logging.getLogger("hrdocs.stalls")
+        self._log.propagate = False
+        self._log.setLevel(logging.INFO)
+        self._log.addHandler(self._handler)
+
+        self._timer = QTimer()
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(HEARTBEAT_MS)
+        self._timer.timeout.connect(self._beat)
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+
+    def start(self) -> None:
+        self._last_beat = time.perf_counter()
+        self._timer.start()
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._timer.stop()
+        self._thread.join(timeout=1.0)
+        self._log.info(json.dumps({"summary": self.snapshot()}, ensure_ascii=False))
+        self._log.removeHandler(self._handler)
+        self._handler.close()
+
+    # -------------------------
+    # GUI thread
+    # -------------------------
+    def _beat(self) -> None:
+        now = time.perf_counter()
+        previous = self._last_beat
+        self._last_beat = now
+        latency_ms = max(0.0, (now - previous) * 1000.0 - HEARTBEAT_MS)
+
+        with self._lock:
+            self._beats += 1
+            self._histogram[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+        if latency_ms < self.threshold_ms:
+            return
+
+        sample = self._sample
+        if sample is not None and sample[0] == previous:
+            _, action, stack = sample
+        else:
+            # Came back before the helper thread got to sample it
+            action, stack = "-", []
+        self._record(latency_ms, action, stack)
+
+    def _record(self, ms: float, action: str, stack: List[str]) -> None:
+        page = request_metrics().active_page() or "-"
+        with self._lock:
+            self._by_action.setdefault(f"{page} / {action}", StallCounter()).add(ms)
+
+        logger.warning("UI stall %.0f ms (page=%s action=%s)", ms, page, action)
+        self._log.info(
+            json.dumps(
+                {"at": time.time(), "ms": round(ms, 1), "page": page, "action": action, "stack": stack},
+                ensure_ascii=False,
+            )
+        )
+
+    # -------------------------
+    # helper thread
+    # -------------------------
+    def _watch(self) -> None:
+        poll_s = self.threshold_ms / 4000.0
+        while not self._stop.wait(poll_s):
+            beat = self._last_beat
+            if (time.perf_counter() - beat) * 1000.0 < self.threshold_ms:
+                continue
+            sample = self._sample
+            if sample is not None and sample[0] == beat:
+                # This stall is already sampled
+                continue
+
+            frame = sys._current_frames().get(self._gui_thread)
+            if frame is None:
+                continue
+            try:
+                action, stack = _describe_stack(frame)
+            finally:
+                del frame
+            if self._last_beat == beat:
+                self._sample = (beat, action, stack)
+
+    # -------------------------
+    # stats
+    # -------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_ms,
+                "heartbeat_ms": HEARTBEAT_MS,
+                "heartbeats": self._beats,
+                "latency_histogram_ms": dict(zip(labels, self._histogram)),
+                "stalls_by_action": {k: asdict(v) for k, v in self._by_action.items()},
+            }
+
+
+_watchdog: Optional[StallWatchdog] = None
+
+
+def start_stall_watchdog(log_path: str) -> StallWatchdog:
+    """Starts the process-wide watchdog (call from the GUI thread, after QApplication exists)."""
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = StallWatchdog(log_path)
+        _watchdog.start()
+    return _watchdog
+
+
+def stats_snapshot() -> Dict[str, Any]:
+    return _watchdog.snapshot() if _watchdog is not None else {}
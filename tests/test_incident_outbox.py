@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+from postgrest.exceptions import APIError
+
+import app.services.incident_outbox as outbox_module
+from app.core.session import AppSession, SessionState
+from app.services.incident_outbox import FAILED_CODE, OP_DELETE, IncidentOutbox
+
+FIRM_ID = "firm-1"
+
+
+class FakeIncidentsRepo:
+    """Stands in for IncidentsRepo's batch writes; `error` (if set) decides what a batch raises."""
+
+    inserted: List[str] = []
+    deleted: List[str] = []
+    error: Optional[Callable[[List[Dict[str, Any]]], Optional[Exception]]] = None
+    on_insert: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+
+    @staticmethod
+    def insert_many(payloads: List[Dict[str, Any]]) -> None:
+        if FakeIncidentsRepo.on_insert is not None:
+            FakeIncidentsRepo.on_insert(payloads)
+        error = FakeIncidentsRepo.error(payloads) if FakeIncidentsRepo.error is not None else None
+        if error is not None:
+            raise error
+        FakeIncidentsRepo.inserted += [p["id"] for p in payloads]
+
+    @staticmethod
+    def delete_many(ids: List[str]) -> None:
+        FakeIncidentsRepo.deleted += ids
+
+
+@pytest.fixture
+def outbox(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> IncidentOutbox:
+    monkeypatch.setattr(AppSession, "current", SessionState("user-1", "user@example.com", "", "", FIRM_ID))
+    monkeypatch.setattr(outbox_module, "IncidentsRepo", FakeIncidentsRepo)
+    monkeypatch.setattr(FakeIncidentsRepo, "inserted", [])
+    monkeypatch.setattr(FakeIncidentsRepo, "deleted", [])
+    monkeypatch.setattr(FakeIncidentsRepo, "error", None)
+    monkeypatch.setattr(FakeIncidentsRepo, "on_insert", None)
+
+    box = IncidentOutbox(tmp_path / "outbox.sqlite3")
+    # Flushes run synchronously in the tests, not on the background thread
+    monkeypatch.setattr(box, "kick", lambda: None)
+    return box
+
+
+def _create(box: IncidentOutbox, worker_id: str = "worker-1") -> str:
+    return box.create(
+        worker_id=worker_id,
+        incident_type_id=1,
+        incident_date="2024-01-02",
+        received_day="2024-01-03",
+        observations=None,
+        manual_handling=False,
+    )
+
+
+def test_transient_error_keeps_the_batch_queued(outbox: IncidentOutbox) -> None:
+    ids = [_create(outbox) for _ in range(3)]
+    FakeIncidentsRepo.error = lambda payloads: APIError({"code": "503", "message": "Service Unavailable"})
+
+    with pytest.raises(APIError):
+        outbox.flush(FIRM_ID)
+    stats = outbox.stats()
+    assert (stats.pending, stats.failed) == (3, 0)
+    assert FakeIncidentsRepo.inserted == []
+
+    FakeIncidentsRepo.error = None
+    assert outbox.flush(FIRM_ID) == 3
+    assert FakeIncidentsRepo.inserted == ids
+    assert outbox.stats().pending == 0
+
+
+def test_rejected_row_is_isolated_and_marked_failed(outbox: IncidentOutbox) -> None:
+    good = [_create(outbox) for _ in range(4)]
+    bad = _create(outbox, worker_id="missing-worker")
+    good.append(_create(outbox))
+
+    def reject_missing_worker(payloads: List[Dict[str, Any]]) -> Optional[Exception]:
+        if any(p["worker_id"] == "missing-worker" for p in payloads):
+            return APIError({"code": "23503", "message": "violates foreign key constraint"})
+        return None
+
+    FakeIncidentsRepo.error = reject_missing_worker
+
+    assert outbox.flush(FIRM_ID) == 5
+    assert sorted(FakeIncidentsRepo.inserted) == sorted(good)
+    stats = outbox.stats()
+    assert (stats.pending, stats.failed) == (0, 1)
+    assert "foreign key" in stats.last_error
+
+    # Still visible (as failed) until deleted or retried
+    shown = outbox.overlay([])
+    assert [(r["id"], r["code"]) for r in shown] == [(bad, FAILED_CODE)]
+
+
+def test_delete_during_flush_becomes_a_queued_delete(outbox: IncidentOutbox) -> None:
+    incident_id = _create(outbox)
+    queued_deletes: List[str] = []
+
+    def delete_while_sending(payloads: List[Dict[str, Any]]) -> None:
+        # The user deletes the row while its create is on the wire
+        outbox.delete(incident_id)
+        queued_deletes.extend(e.incident_id for e in outbox._entries(FIRM_ID, op=OP_DELETE))
+
+    FakeIncidentsRepo.on_insert = delete_while_sending
+
+    outbox.flush(FIRM_ID)
+    assert queued_deletes == [incident_id]
+    # The create reached the server, so the delete has to follow it there
+    assert FakeIncidentsRepo.inserted == [incident_id]
+    assert FakeIncidentsRepo.deleted == [incident_id]
+    assert outbox.stats().pending == 0
+
+
+def test_delete_of_a_queued_create_just_drops_it(outbox: IncidentOutbox) -> None:
+    incident_id = _create(outbox)
+    outbox.delete(incident_id)
+
+    assert outbox.flush(FIRM_ID) == 0
+    assert FakeIncidentsRepo.inserted == FakeIncidentsRepo.deleted == []
+    assert outbox.overlay([]) == []
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import glob
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+import pytest
+from openpyxl import load_workbook
+
+from app.core.interning import IncidentTypeInfo, WorkerInfo
+from app.repositories.reports_repo import ReportIncidentRow
+from app.services.reports_excel_exporter import ReportsExcelExporter, ReportsMetadata
+from app.services.xlsx_writers import BACKEND_OPENPYXL, BACKEND_XLSXWRITER, open_workbook_writer, xlsxwriter
+
+pytestmark = pytest.mark.skipif(xlsxwriter is None, reason="XlsxWriter not installed")
+
+BACKENDS = (BACKEND_OPENPYXL, BACKEND_XLSXWRITER)
+
+
+def _read(path: Path) -> Dict[str, List[List[Any]]]:
+    """Sheet -> rows of (value, hyperlink target) per cell."""
+    wb = load_workbook(path)
+    return {
+        ws.title: [[(c.value, c.hyperlink.target if c.hyperlink else None) for c in row] for row in ws.iter_rows()]
+        for ws in wb.worksheets
+    }
+
+
+def _incidents() -> List[ReportIncidentRow]:
+    rows = []
+    for i in range(250):
+        rows.append(
+            ReportIncidentRow(
+                received_day=date(2024, 1 + i % 3, 1 + i % 28),
+                incident_type=IncidentTypeInfo(*(("ABSENCE", "Absence"), ("LATE_ARRIVAL", "Late arrival"))[i % 2]),
+                worker=WorkerInfo(f"Worker {i % 17} Ñúñez", str(10_000_000 + i), f"client-{i % 4}", f"Client {i % 4}"),
+            )
+        )
+    return rows
+
+
+def test_writers_produce_the_same_cells(tmp_path: Path) -> None:
+    rows: List[List[Any]] = [
+        ["Name", "Count", "Ratio", "Link", "Empty", "Missing"],
+        ["Ñandú — ü", 3, 0.25, "https://example.com/a", "", None],
+        ["mailto:someone@example.com", 0, -1.5, "ftp://example.com/file", "x", None],
+        ["0123", 10**12, 1e-9, "www.example.com", "", "tail"],
+    ]
+
+    cells = {}
+    for backend in BACKENDS:
+        wb = open_workbook_writer(backend)
+        sheet = wb.add_sheet("Data")
+        sheet.set_widths([20, 10, 10, 30, 5, 5])
+        for row in rows:
+            sheet.append(row)
+        wb.add_sheet("Second").append(["only", 1])
+        path = tmp_path / f"{backend}.xlsx"
+        wb.save(str(path))
+        cells[backend] = _read(path)
+
+    assert cells[BACKEND_OPENPYXL] == cells[BACKEND_XLSXWRITER]
+    # No cell became a hyperlink
+    assert all(link is None for sheet in cells[BACKEND_XLSXWRITER].values() for row in sheet for _, link in row)
+
+
+def test_report_workbook_is_the_same_with_both_backends(tmp_path: Path) -> None:
+    incidents = _incidents()
+    meta = ReportsMetadata(date_from=date(2024, 1, 1), date_to=date(2024, 3, 31), client_name="All")
+
+    cells = {}
+    for backend in BACKENDS:
+        wb = ReportsExcelExporter.build_workbook(
+            incidents=incidents,
+            meta=meta,
+            detail_rows_per_sheet=100,
+            backend=backend,
+        )
+        assert wb.backend == backend
+        path = tmp_path / f"{backend}.xlsx"
+        wb.save(str(path))
+        cells[backend] = _read(path)
+
+    assert list(cells[BACKEND_OPENPYXL]) == list(cells[BACKEND_XLSXWRITER])
+    for sheet, expected in cells[BACKEND_OPENPYXL].items():
+        assert cells[BACKEND_XLSXWRITER][sheet] == expected, sheet
+
+
+
+def _temp_files() -> Set[str]:
+    tmp = tempfile.gettempdir()
+    # openpyxl's write-only sheet streams, xlsxwriter's staged workbook
+    return set(glob.glob(os.path.join(tmp, "openpyxl.*"))) | set(glob.glob(os.path.join(tmp, "*.xlsx")))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_discard_removes_temp_files(backend: str) -> None:
+    before = _temp_files()
+    wb = open_workbook_writer(backend)
+    for title in ("One", "Two"):
+        sheet = wb.add_sheet(title)
+        for i in range(100):
+            sheet.append([i, "value"])
+    assert _temp_files() - before
+
+    wb.discard()
+    assert not _temp_files() - before